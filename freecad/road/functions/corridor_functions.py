@@ -0,0 +1,83 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides functions to build corridor surfaces from road templates."""
+
+import numpy
+
+
+def station_frames(alignment_model, profile, stations):
+    """Return centre points and right unit normals of stations.
+
+    Centre points are (x, y, z) in metres from the alignment and the
+    elevation profile, rows of stations off either of them are NaN.
+    Template offsets are positive to the right like section offsets.
+    """
+    points, normals = alignment_model.get_orthogonals_at_stations(stations, "right")
+    elevations = numpy.array([alignment_model.get_elevation_at_station(profile, sta)
+        for sta in stations], dtype=float)
+    return numpy.c_[points, elevations], normals
+
+def corridor_points(origins, normals, template):
+    """Place template points at all stations.
+
+    The template is an (N_points, 2) or per-station (N_stations,
+    N_points, 2) array of offsets and elevations. Offsets follow the
+    right station normals, so left points have negative offsets, and
+    elevations the vertical axis. Returns an (N_stations, N_points, 3)
+    array.
+    """
+    template = numpy.broadcast_to(numpy.asarray(template, dtype=numpy.float64),
+        (len(origins),) + numpy.shape(template)[-2:])
+    points = numpy.empty(template.shape[:2] + (3,))
+    points[:, :, :2] = origins[:, None, :2] + normals[:, None, :] * template[:, :, :1]
+    points[:, :, 2] = origins[:, None, 2] + template[:, :, 1]
+    return points
+
+def template_envelope(template, edges):
+    """Return the top of template edges at the template point offsets.
+
+    The template is an (N_stations, N_points, 2) array of offsets and
+    elevations. Returns an array of the same shape with offsets sorted
+    per station and the highest edge elevation at each offset, NaN where
+    a point could not be placed or no edge spans its offset.
+    """
+    offsets = numpy.sort(template[:, :, 0], axis=1)
+    if not len(edges):
+        return numpy.stack([offsets, numpy.full(offsets.shape, numpy.nan)], axis=-1)
+
+    # Edge ends per station, interpolated at every offset of the station
+    first, last = template[:, edges[:, 0]], template[:, edges[:, 1]]
+    low = numpy.minimum(first[:, :, 0], last[:, :, 0])[:, None, :]
+    high = numpy.maximum(first[:, :, 0], last[:, :, 0])[:, None, :]
+    x = offsets[:, :, None]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        t = (x - first[:, None, :, 0]) / (last[:, None, :, 0] - first[:, None, :, 0])
+        z = first[:, None, :, 1] + t * (last[:, None, :, 1] - first[:, None, :, 1])
+
+    # Vertical edges count with their upper end.
+    z = numpy.where(low == high, numpy.fmax(first[:, None, :, 1], last[:, None, :, 1]), z)
+    z = numpy.where((x >= low) & (x <= high), z, -numpy.inf).max(axis=2)
+    z[~numpy.isfinite(z)] = numpy.nan
+    return numpy.stack([offsets, z], axis=-1)
+
+def ruled_mesh(points, edges):
+    """Stitch template edges of consecutive stations into triangles.
+
+    Returns the used station points as a vertex array and faces
+    indexing it, two triangles per edge between each pair of stations.
+    """
+    stations, count = points.shape[:2]
+    vertices = points.reshape(-1, 3)
+    if stations < 2 or not len(edges):
+        return numpy.empty((0, 3)), numpy.empty((0, 3), dtype=numpy.int64)
+
+    first = numpy.arange(stations - 1)[:, None] * count
+    a, b = first + edges[:, 0], first + edges[:, 1]
+    c, d = b + count, a + count
+    faces = numpy.stack([numpy.stack([a, b, c], axis=-1), numpy.stack([a, c, d], axis=-1)], axis=-2)
+    faces = faces.reshape(-1, 3)
+
+    # Points that could not be placed leave holes.
+    faces = faces[numpy.isfinite(vertices[faces]).all(axis=(1, 2))]
+    used, inverse = numpy.unique(faces, return_inverse=True)
+    return vertices[used], inverse.reshape(-1, 3)
@@ -0,0 +1,279 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides functions to compute section areas and earthwork quantities."""
+
+import itertools
+import numpy
+
+
+def profile_table(profiles):
+    """Flatten the profiles of stations into arrays.
+
+    Profiles are (offset, elevation) polylines, one per station, possibly
+    empty. Returns station ids, offsets and elevations sorted by station
+    and offset.
+    """
+    arrays = [numpy.asarray(profile, dtype=numpy.float64).reshape(-1, 2) for profile in profiles]
+    station = numpy.repeat(numpy.arange(len(arrays)), [len(array) for array in arrays])
+    points = numpy.concatenate(arrays) if arrays else numpy.empty((0, 2))
+
+    order = numpy.lexsort((points[:, 0], station))
+    return station[order], points[order, 0], points[order, 1]
+
+def interpolate_table(table, count, station, offset, span):
+    """Interpolate flattened profiles at station offsets.
+
+    Stations are kept apart by shifting offsets by station times span,
+    which must exceed the offset range. Points outside the profile of
+    their station are NaN.
+    """
+    profile_station, profile_offset, elevation = table
+    result = numpy.full(len(offset), numpy.nan)
+    if not len(profile_offset):
+        return result
+
+    low = numpy.full(count, numpy.inf)
+    high = numpy.full(count, -numpy.inf)
+    numpy.minimum.at(low, profile_station, profile_offset)
+    numpy.maximum.at(high, profile_station, profile_offset)
+
+    inside = (offset >= low[station]) & (offset <= high[station])
+    result[inside] = numpy.interp(
+        station[inside] * span + offset[inside],
+        profile_station * span + profile_offset, elevation)
+    return result
+
+def merge_breakpoints(station, offset, tolerance=1e-9):
+    """Sort station offsets and remove duplicates."""
+    order = numpy.lexsort((offset, station))
+    station, offset = station[order], offset[order]
+    keep = numpy.r_[True, (station[1:] != station[:-1]) | (numpy.diff(offset) > tolerance)]
+    return station[keep], offset[keep]
+
+def positive_area(start, end, width):
+    """Integrate the positive part of linear functions over intervals."""
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        area = numpy.where((start >= 0) & (end >= 0), (start + end) / 2,
+            numpy.where(start * end < 0,
+                numpy.maximum(start, end) ** 2 / (2 * numpy.abs(start - end)), 0))
+    return numpy.nan_to_num(area * width)
+
+def positive_moment(start, end, offset, width):
+    """Integrate offset times the positive part of linear functions over intervals."""
+    end_offset = offset + width
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        full = width * (start * (2 * offset + end_offset) + end * (offset + 2 * end_offset)) / 6
+
+        # Only a triangle from the zero crossing to the positive end counts.
+        crossing = offset + width * start / (start - end)
+        tip = numpy.where(start > 0, offset, end_offset)
+        partial = positive_area(start, end, width) * (crossing + 2 * tip) / 3
+
+        moment = numpy.where((start >= 0) & (end >= 0), full,
+            numpy.where(start * end < 0, partial, 0))
+    return numpy.nan_to_num(moment)
+
+def section_areas(tops, bottoms, count):
+    """Compute areas between top and bottom section profiles.
+
+    Tops and bottoms are lists of surfaces, each a list of profiles per
+    station. Areas are measured between the lowest top and the highest
+    bottom, where all profiles of a station are defined. All profiles
+    are linear between merged breakpoints, which include their offsets
+    and mutual crossings, so areas are integrated exactly. Returns fill
+    (top above bottom) and cut (bottom above top) areas per station,
+    their first moments about the centre line and the breakpoints with
+    top and bottom elevations.
+    """
+    result = {
+        "Fill": numpy.zeros(count), "Cut": numpy.zeros(count),
+        "FillMoment": numpy.zeros(count), "CutMoment": numpy.zeros(count),
+        "Station": numpy.empty(0, dtype=numpy.int64),
+        "Offset": numpy.empty(0), "Top": numpy.empty(0), "Bottom": numpy.empty(0)}
+
+    tables = [profile_table(profiles) for profiles in tops + bottoms]
+    if not tops or not bottoms or not any(len(table[1]) for table in tables):
+        return result
+
+    station, offset = merge_breakpoints(
+        numpy.concatenate([table[0] for table in tables]),
+        numpy.concatenate([table[1] for table in tables]))
+    span = 2 * numpy.abs(offset).max() + 1
+
+    # Crossings of profile pairs become breakpoints.
+    values = numpy.stack([interpolate_table(table, count, station, offset, span)
+        for table in tables], axis=1)
+    same = station[1:] == station[:-1]
+    width = numpy.diff(offset)
+    stations, offsets = [station], [offset]
+    for a, b in itertools.combinations(range(len(tables)), 2):
+        gap = values[:, a] - values[:, b]
+        cross = same & (gap[:-1] * gap[1:] < 0)
+        stations.append(station[:-1][cross])
+        offsets.append(offset[:-1][cross] + width[cross]
+            * gap[:-1][cross] / (gap[:-1][cross] - gap[1:][cross]))
+
+    station, offset = merge_breakpoints(numpy.concatenate(stations), numpy.concatenate(offsets))
+    values = numpy.stack([interpolate_table(table, count, station, offset, span)
+        for table in tables], axis=1)
+    top = values[:, :len(tops)].min(axis=1)
+    bottom = values[:, len(tops):].max(axis=1)
+
+    # Integrate the difference over intervals within stations.
+    same = station[1:] == station[:-1]
+    difference = top - bottom
+    start, end = difference[:-1][same], difference[1:][same]
+    width = numpy.diff(offset)[same]
+    interval = station[:-1][same]
+    result["Fill"] = numpy.bincount(interval, positive_area(start, end, width), count)
+    result["Cut"] = numpy.bincount(interval, positive_area(-start, -end, width), count)
+    left = offset[:-1][same]
+    result["FillMoment"] = numpy.bincount(interval, positive_moment(start, end, left, width), count)
+    result["CutMoment"] = numpy.bincount(interval, positive_moment(-start, -end, left, width), count)
+    result.update(Station=station, Offset=offset, Top=top, Bottom=bottom)
+    return result
+
+def area_polygons(areas, count):
+    """Return polygons of fill areas per station for display.
+
+    Each polygon runs along the top from left to right and back along
+    the bottom, as (offset, elevation) points.
+    """
+    station, offset = areas["Station"], areas["Offset"]
+    difference = areas["Top"] - areas["Bottom"]
+    inside = (station[1:] == station[:-1]) & (difference[:-1] >= 0) & (difference[1:] >= 0) \
+        & ((difference[:-1] > 0) | (difference[1:] > 0))
+
+    polygons = [[] for _ in range(count)]
+    intervals = numpy.flatnonzero(inside)
+    runs = numpy.split(intervals, numpy.flatnonzero(numpy.diff(intervals) > 1) + 1)
+    for run in runs:
+        if not len(run): continue
+        points = numpy.arange(run[0], run[-1] + 2)
+        polygon = numpy.r_[
+            numpy.c_[offset[points], areas["Top"][points]],
+            numpy.c_[offset[points], areas["Bottom"][points]][::-1]]
+
+        # Ends where top and bottom meet give repeated points.
+        repeated = numpy.all(polygon == numpy.roll(polygon, 1, axis=0), axis=1)
+        polygons[station[run[0]]].append(polygon[~repeated])
+    return polygons
+
+def quadratic_coefficients(x, y):
+    """Return Newton coefficients of parabolas through three points.
+
+    Points are given as (n, 3) arrays of stations and values.
+    """
+    x0, x1, x2 = x.T
+    y0, y1, y2 = y.T
+    first = (y1 - y0) / (x1 - x0)
+    second = ((y2 - y1) / (x2 - x1) - first) / (x2 - x0)
+    return x0, x1, y0, first, second
+
+def quadratic_integral(x, y, a, b):
+    """Integrate parabolas through three points over intervals.
+
+    Points are given as (n, 3) arrays of stations and values.
+    """
+    x0, x1, y0, first, second = quadratic_coefficients(x, y)
+
+    def antiderivative(t):
+        return y0 * t + first * (t - x0) ** 2 / 2 \
+            + second * (t ** 3 / 3 - (x0 + x1) * t ** 2 / 2 + x0 * x1 * t)
+
+    return antiderivative(b) - antiderivative(a)
+
+def quadratic_range(x, y, a, b):
+    """Return the lowest and highest values of parabolas over intervals."""
+    x0, x1, y0, first, second = quadratic_coefficients(x, y)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        vertex = (x0 + x1) / 2 - first / (2 * second)
+    vertex = numpy.clip(numpy.nan_to_num(vertex, nan=a, posinf=b, neginf=a), a, b)
+
+    values = numpy.stack([y0 + first * (t - x0) + second * (t - x0) * (t - x1)
+        for t in [a, b, vertex]])
+    return values.min(axis=0), values.max(axis=0)
+
+def prismoidal_volumes(stations, areas):
+    """Return volumes between stations with areas varying quadratically.
+
+    Each interval is integrated over the parabolas through its
+    neighbouring stations, averaging both sides where available, which
+    reduces to the prismoidal formula for evenly spaced stations. A
+    parabola leaving the range from zero to the larger end area, as at
+    cut and fill transitions, is replaced by the average end area of its
+    interval. Fewer than three stations fall back to average end areas.
+    """
+    average = (areas[1:] + areas[:-1]) / 2 * numpy.diff(stations)
+    if len(stations) < 3:
+        return average
+
+    triples = numpy.lib.stride_tricks.sliding_window_view(numpy.arange(len(stations)), 3)
+    a, b = stations[:-1], stations[1:]
+    highest = numpy.maximum(areas[:-1], areas[1:])
+    tolerance = 1e-9 * numpy.abs(areas).max()
+    total = numpy.zeros(len(a))
+    weight = numpy.zeros(len(a))
+
+    # Parabolas through an interval and its right or left neighbour
+    for intervals in [slice(0, -1), slice(1, None)]:
+        x, y = stations[triples], areas[triples]
+        integral = quadratic_integral(x, y, a[intervals], b[intervals])
+        low, high = quadratic_range(x, y, a[intervals], b[intervals])
+        inside = (low >= -tolerance) & (high <= highest[intervals] + tolerance)
+        total[intervals] += numpy.where(inside, integral, average[intervals])
+        weight[intervals] += 1
+
+    return total / weight
+
+def station_curvatures(alignment_model, stations, step=0.5):
+    """Return signed curvatures of the alignment at stations.
+
+    Curvature is positive where the alignment turns left and comes from
+    the change of direction over a short step, so curves and spirals are
+    handled alike.
+    """
+    stations = numpy.asarray(stations, dtype=numpy.float64)
+    low, high = alignment_model.get_sta_start(), alignment_model.get_sta_end() - 1e-6
+    before = numpy.clip(stations - step, low, high)
+    after = numpy.clip(stations + step, low, high)
+
+    _, start = alignment_model.get_orthogonals_at_stations(before, "left")
+    _, end = alignment_model.get_orthogonals_at_stations(after, "left")
+    turn = numpy.arctan2(start[:, 0] * end[:, 1] - start[:, 1] * end[:, 0], (start * end).sum(axis=1))
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.nan_to_num(turn / (after - before))
+
+def earthwork(stations, areas, curvatures=None):
+    """Compute earthwork quantities along stations.
+
+    Areas hold fill and cut areas and their first moments per station,
+    see section_areas. Volumes belong to the interval ending at each
+    station, zero at the first one. Curvature corrections follow from
+    the centroid eccentricity by Pappus' theorem, with offsets positive
+    to the right. The mass haul ordinate accumulates corrected cut minus
+    corrected fill.
+    """
+    stations = numpy.asarray(stations, dtype=numpy.float64)
+    curvatures = numpy.zeros(len(stations)) if curvatures is None else curvatures
+    result = {"Stations": stations, "Length": numpy.r_[0, numpy.diff(stations)]}
+
+    corrected = {}
+    for kind in ["Fill", "Cut"]:
+        area = numpy.asarray(areas[kind], dtype=numpy.float64)
+        moment = numpy.asarray(areas[kind + "Moment"], dtype=numpy.float64)
+        if len(stations) < 2:
+            zero = numpy.zeros(len(stations))
+            result.update({kind + "Volume": zero, kind + "Prismoidal": zero, kind + "Curvature": zero})
+            corrected[kind] = zero
+            continue
+
+        # Area times the relative lengthening at the centroid
+        curved = moment * curvatures
+        result[kind + "Volume"] = numpy.r_[0, (area[1:] + area[:-1]) / 2 * numpy.diff(stations)]
+        result[kind + "Prismoidal"] = numpy.r_[0, prismoidal_volumes(stations, area)]
+        result[kind + "Curvature"] = numpy.r_[0, (curved[1:] + curved[:-1]) / 2 * numpy.diff(stations)]
+        corrected[kind] = result[kind + "Prismoidal"] + result[kind + "Curvature"]
+
+    result["MassHaul"] = numpy.cumsum(corrected["Cut"] - corrected["Fill"])
+    return result
@@ -0,0 +1,64 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides functions to create meshes and shapes from terrain and corridor arrays."""
+
+import FreeCAD
+import Part, Mesh
+
+import numpy
+
+
+def build_mesh(points, faces, origin):
+    """Create a mesh from vertex and face-index arrays in a single call."""
+    vertices = numpy.asarray(points, dtype=numpy.float64) - origin
+    mesh = Mesh.Mesh()
+    if len(faces):
+        mesh.addFacets((
+            list(map(tuple, vertices.tolist())),
+            list(map(tuple, numpy.asarray(faces).tolist()))))
+    return mesh
+
+def edit_mesh(mesh, op, origin):
+    """Apply a terrain edit operation to a mesh in local coordinates."""
+    kind = op.get("type")
+    idx = op.get("index")
+
+    if kind == "Add Point":
+        vector = numpy.asarray(op.get("vector"), dtype=numpy.float64) - origin
+        mesh.insertVertex(idx, FreeCAD.Vector(*vector.tolist()))
+
+    elif kind == "Delete Triangle":
+        mesh.removeFacets([idx])
+
+    elif kind == "Swap Edge":
+        mesh.swapEdge(idx, op.get("other"))
+
+def line_wires(points, counts):
+    """Create Part wires from flat polyline coordinate arrays."""
+    if not len(counts): return []
+    return [Part.makePolygon([FreeCAD.Vector(*p) for p in line.tolist()])
+        for line in numpy.split(points, numpy.cumsum(counts)[:-1])]
+
+def contour_wires(contours):
+    """Create a compound of major and minor contour wires for export."""
+    compounds = []
+    for name in ["Major", "Minor"]:
+        points, counts = contours.get(name, (numpy.empty((0, 3)), []))
+        compounds.append(Part.makeCompound(line_wires(points, counts)))
+    return Part.makeCompound(compounds)
+
+def boundary_wires(boundary):
+    """Create a compound of boundary wires for export."""
+    points, counts = boundary or (numpy.empty((0, 3)), [])
+    return Part.makeCompound(line_wires(points, counts))
+
+def loft_edges(points, edges):
+    """Loft template edges through all stations into ruled B-rep surfaces."""
+    shapes = []
+    for start, end in edges.tolist():
+        ends = points[:, [start, end]]
+        wires = [Part.makePolygon([FreeCAD.Vector(*first), FreeCAD.Vector(*last)])
+            for first, last in ends[numpy.isfinite(ends).all(axis=(1, 2))].tolist()]
+        if len(wires) > 1:
+            shapes.append(Part.makeLoft(wires, False, True))
+    return shapes
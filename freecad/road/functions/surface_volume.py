@@ -0,0 +1,144 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides functions to compute volumes between two Terrain surfaces."""
+
+import numpy
+
+from .triangle_index import TriangleIndex
+from ..utils.parallel import worker_count, map_shared
+
+# Grid cells above which surface volumes are computed in parallel tiles.
+PARALLEL_CELLS = 1000000
+
+
+def positive_volume(values, area):
+    """Return the volume of the positive part of linear functions over triangles.
+
+    Values are given at the three corners of each triangle, the volume
+    of the part above zero is integrated exactly.
+    """
+    values = -numpy.sort(-values, axis=1)
+    a, b, c = values.T
+    total = area * (a + b + c) / 3
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        one = area * a ** 3 / (3 * (a - b) * (a - c))
+        two = total - area * c ** 3 / (3 * (c - a) * (c - b))
+
+    return numpy.select(
+        [c >= 0, a <= 0, b <= 0],
+        [total, 0, one], two)
+
+def inside_polygon(points, polygon):
+    """Test points against a closed polygon with the even-odd rule."""
+    polygon = numpy.asarray(polygon, dtype=numpy.float64)[:, :2]
+    start, end = polygon, numpy.roll(polygon, -1, axis=0)
+    x, y = points[:, :1], points[:, 1:2]
+
+    crosses = (start[:, 1] > y) != (end[:, 1] > y)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        at = start[:, 0] + (y - start[:, 1]) * (end[:, 0] - start[:, 0]) / (end[:, 1] - start[:, 1])
+    return numpy.count_nonzero(crosses & (x < at), axis=1) % 2 == 1
+
+def surface_elevations(arrays, name, xy):
+    """Sample a shared terrain index at global coordinates in metres."""
+    index = TriangleIndex.from_arrays(
+        {key: arrays[f"{name}_{key}"] for key in ["vertices", "faces", "items", "cells", "starts", "grid"]})
+    z, _ = index.elevations_at(xy * 1000 - arrays[f"{name}_offset"])
+    return z / 1000
+
+def grid_nodes(grid, start, end):
+    """Return node x and y of the volume grid for rows start to end.
+
+    The last column and row end at the grid extent, so cells along the
+    upper edges may be narrower than the spacing.
+    """
+    x0, y0, spacing, columns, x1, y1 = grid
+    x = numpy.minimum(x0 + spacing * numpy.arange(int(columns) + 1), x1)
+    y = numpy.minimum(y0 + spacing * numpy.arange(start, end + 1), y1)
+    return x, y
+
+def volume_tile(arrays, rows):
+    """Compute cut and fill volumes of a band of grid cell rows.
+
+    Returns cut, fill, elevation differences of the band's node rows
+    and the valid cell mask of the band.
+    """
+    x, y = grid_nodes(arrays["grid"], *rows)
+    columns = len(x) - 1
+    xy = numpy.stack(numpy.meshgrid(x, y), axis=-1).reshape(-1, 2)
+    diff = surface_elevations(arrays, "design", xy) - surface_elevations(arrays, "existing", xy)
+    diff = diff.reshape(len(y), columns + 1)
+
+    corners = numpy.stack([diff[:-1, :-1], diff[:-1, 1:], diff[1:, 1:], diff[1:, :-1]], axis=-1)
+    valid = numpy.isfinite(corners).all(axis=-1)
+    if "boundary" in arrays:
+        centres = numpy.stack(numpy.meshgrid(
+            (x[:-1] + x[1:]) / 2, (y[:-1] + y[1:]) / 2), axis=-1).reshape(-1, 2)
+        valid &= inside_polygon(centres, arrays["boundary"]).reshape(valid.shape)
+
+    # Split each cell into two triangles and integrate them exactly.
+    cells = corners[valid]
+    triangles = numpy.concatenate([cells[:, [0, 1, 2]], cells[:, [0, 2, 3]]])
+    area = numpy.tile(numpy.outer(numpy.diff(y), numpy.diff(x))[valid] / 2, 2)
+    fill = positive_volume(triangles, area).sum()
+    cut = positive_volume(-triangles, area).sum()
+    return cut, fill, diff, valid
+
+def tin_volume(existing, design, spacing=1.0, boundary=None, workers=0):
+    """Compute cut, fill and net volumes between two Terrain objects.
+
+    Both surfaces are sampled on a common grid with the given spacing
+    in metres, and the piecewise linear difference is integrated exactly
+    over the grid triangles. An optional polygon in global metres limits
+    the area. Fill is where design is above existing. Returns volumes in
+    cubic metres and the isopach surface as grid points and faces.
+    """
+    surfaces = {"existing": existing.Proxy, "design": design.Proxy}
+    arrays, low, high = {}, [], []
+    for name, proxy in surfaces.items():
+        if not len(getattr(proxy, "triangles", [])):
+            return None
+
+        index = proxy.triangle_index()
+        for key, array in index.arrays().items():
+            arrays[f"{name}_{key}"] = array
+        arrays[f"{name}_offset"] = proxy.origin[:2]
+        local = index.vertices[:, :2]
+        low.append((local.min(axis=0) + proxy.origin[:2]) / 1000)
+        high.append((local.max(axis=0) + proxy.origin[:2]) / 1000)
+
+    low, high = numpy.max(low, axis=0), numpy.min(high, axis=0)
+    if boundary is not None:
+        arrays["boundary"] = numpy.asarray(boundary, dtype=numpy.float64)[:, :2]
+        low = numpy.maximum(low, arrays["boundary"].min(axis=0))
+        high = numpy.minimum(high, arrays["boundary"].max(axis=0))
+    if numpy.any(high <= low):
+        return None
+
+    # Partial cells along the upper edges are clipped to the extent.
+    columns, rows = numpy.ceil((high - low) / spacing - 1e-9).astype(int)
+    arrays["grid"] = numpy.r_[low, spacing, columns, high]
+
+    count = worker_count(workers)
+    tiles = count * 4 if count > 1 and rows * columns > PARALLEL_CELLS else 1
+    bounds = numpy.unique(numpy.linspace(0, rows, tiles + 1).astype(int))
+    results = map_shared(volume_tile, arrays,
+        list(zip(bounds[:-1].tolist(), bounds[1:].tolist())), count if tiles > 1 else 1)
+
+    cut = float(sum(result[0] for result in results))
+    fill = float(sum(result[1] for result in results))
+    diff = numpy.concatenate([result[2][:-1] for result in results] + [results[-1][2][-1:]])
+    valid = numpy.concatenate([result[3] for result in results])
+
+    # Isopach surface over valid cells.
+    x, y = grid_nodes(arrays["grid"], 0, rows)
+    grid = numpy.stack(numpy.meshgrid(x, y), axis=-1).reshape(-1, 2)
+    points = numpy.c_[grid, numpy.nan_to_num(diff.ravel())]
+
+    row, column = numpy.nonzero(valid)
+    first = row * (columns + 1) + column
+    corners = numpy.stack([first, first + 1, first + columns + 2, first + columns + 1], axis=1)
+    faces = numpy.concatenate([corners[:, [0, 1, 2]], corners[:, [0, 2, 3]]])
+
+    return {"Cut": cut, "Fill": fill, "Net": fill - cut, "Points": points, "Faces": faces}
@@ -0,0 +1,194 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides functions to compile road structures into template programs.
+
+A program lists the component points of a Structure in dependency order
+with their parameters, so the template can be evaluated for many
+stations at once with per-station parameter values.
+"""
+
+import numpy
+
+# Point types placed by intersecting the template with a terrain.
+TERRAIN_TYPES = ["Delta X on Terrain", "Slope to Terrain"]
+
+# Point parameters that can vary along stations.
+PARAMETERS = ["DeltaX", "DeltaY", "Angle", "Slope", "Distance"]
+
+# Longest slope in metres searched for terrain targets.
+TARGET_LENGTH = 200.0
+
+
+def displacement(kind, delta_x=0, delta_y=0, angle=0, slope=0, distance=0):
+    """Return the displacement of a point from its start point in metres.
+
+    Parameters may be scalars or arrays, e.g. one value per station.
+    The displacement is given before side and reverse are applied.
+    """
+    delta_x, delta_y, angle, slope, distance = numpy.broadcast_arrays(
+        *(numpy.asarray(value, dtype=numpy.float64) for value in
+            [delta_x, delta_y, angle, slope, distance]))
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        if kind == "Delta X and Delta Y":
+            return delta_x, delta_y
+
+        if kind == "Delta X and Angle":
+            angle = angle % 360
+            sign = numpy.where((angle > 90) & (angle < 270), -1.0, 1.0)
+            sign[(angle == 90) | (angle == 270)] = 0
+            dy = delta_x * numpy.tan(numpy.radians(angle))
+            return sign * delta_x, sign * dy
+
+        if kind == "Delta Y and Angle":
+            angle = angle % 360
+            sign = numpy.where((angle > 0) & (angle < 180), 1.0, -1.0)
+            sign[(angle == 0) | (angle == 180)] = 0
+            dx = numpy.where(angle != 0, delta_y / numpy.tan(numpy.radians(angle)), 0)
+            return sign * dx, sign * delta_y
+
+        if kind == "Delta X and Slope":
+            return delta_x, delta_x * slope / 100
+
+        if kind == "Delta Y and Slope":
+            return delta_y / (slope / 100), delta_y
+
+        if kind == "Distance and Angle":
+            rad = numpy.radians(angle)
+            return distance * numpy.cos(rad), distance * numpy.sin(rad)
+
+    nan = numpy.full(delta_x.shape, numpy.nan)
+    return nan, nan
+
+def compile_template(structure):
+    """Compile the component points and lines of a Structure.
+
+    Returns a program dictionary with point steps sorted so that every
+    point follows its start point, and template edges as step index pairs.
+    """
+    points, lines = {}, []
+    for component in structure.Group:
+        side = -1 if component.Side == "Left" else 1
+        for part in component.Group:
+            if part.Proxy.Type == "Road::ComponentPoint":
+                points[part.Name] = (part, side)
+            elif part.Proxy.Type == "Road::ComponentLine":
+                lines.append(part)
+
+    # Depth first ordering along start links
+    order, state = [], {}
+    def visit(name):
+        if state.get(name) == "done": return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Component point {points[name][0].Label} depends on itself")
+        state[name] = "visiting"
+        start = points[name][0].Start
+        if start and start.Name in points:
+            visit(start.Name)
+        state[name] = "done"
+        order.append(name)
+
+    for name in points:
+        visit(name)
+
+    index = {name: i for i, name in enumerate(order)}
+    steps = []
+    for name in order:
+        part, side = points[name]
+        steps.append({
+            "name": name,
+            "label": part.Label,
+            "type": part.Type,
+            "start": index[part.Start.Name] if part.Start and part.Start.Name in index else -1,
+            "side": side,
+            "reverse": bool(part.Reverse),
+            "parameters": {key: float(getattr(part, key)) for key in PARAMETERS},
+            "terrain": part.Terrain})
+
+    edges = [(index[line.Start.Name], index[line.End.Name]) for line in lines
+        if line.Start and line.End and line.Start.Name in index and line.End.Name in index]
+    edges = numpy.unique(numpy.sort(numpy.array(edges, dtype=numpy.int64).reshape(-1, 2), axis=1), axis=0)
+
+    return {"steps": steps, "edges": edges[edges[:, 0] != edges[:, 1]]}
+
+def evaluate_template(program, count, variables=None, ground=None):
+    """Evaluate a compiled template for a number of stations.
+
+    Variables map (point label, parameter) to per-station values that
+    override the point parameters. Terrain points are placed by the
+    ground function called with the step, start positions, outward
+    directions and parameters, and are NaN without it. Returns an
+    (count, points, 2) array of offsets and elevations in metres.
+    """
+    variables = variables or {}
+    steps = program["steps"]
+    positions = numpy.full((count, len(steps), 2), numpy.nan)
+
+    for i, step in enumerate(steps):
+        parameters = {key: numpy.broadcast_to(numpy.asarray(
+            variables.get((step["label"], key), value), dtype=numpy.float64), (count,))
+            for key, value in step["parameters"].items()}
+        start = positions[:, step["start"]] if step["start"] >= 0 else numpy.zeros((count, 2))
+        direction = -step["side"] if step["reverse"] else step["side"]
+
+        if step["type"] in TERRAIN_TYPES:
+            if ground is not None:
+                positions[:, i] = ground(step, start, direction, parameters)
+            continue
+
+        dx, dy = displacement(step["type"], parameters["DeltaX"], parameters["DeltaY"],
+            parameters["Angle"], parameters["Slope"], parameters["Distance"])
+        if step["reverse"]: dx, dy = -dx, -dy
+        positions[:, i] = start + numpy.stack([dx * step["side"], dy], axis=-1)
+
+    return positions
+
+def terrain_ground(origins, normals):
+    """Return a ground function placing terrain points of a template.
+
+    Stations are given by centre points (x, y, z) in global metres and
+    right unit normals, which template offsets follow. Terrain points of
+    all stations are resolved in one batched terrain query.
+    """
+    def ground(step, start, direction, parameters):
+        terrain = step["terrain"]
+        if terrain is None:
+            return numpy.full(start.shape, numpy.nan)
+
+        if step["type"] == "Delta X on Terrain":
+            offset = start[:, 0] + direction * parameters["DeltaX"]
+            z, _ = terrain.Proxy.elevations_at(terrain, origins[:, :2] + normals * offset[:, None])
+            return numpy.stack([offset, z - origins[:, 2]], axis=-1)
+
+        # Cut slopes rise and fill slopes fall from the hinge to the terrain.
+        result = numpy.full(start.shape, numpy.nan)
+        valid = numpy.isfinite(start).all(axis=1)
+        hinge = origins[valid, :2] + normals[valid] * start[valid, :1]
+        height = origins[valid, 2] + start[valid, 1]
+        z, _ = terrain.Proxy.elevations_at(terrain, hinge)
+        rise = numpy.abs(parameters["Slope"][valid]) / 100 * TARGET_LENGTH
+        rise = numpy.where(z > height, rise, -rise)
+
+        ends = hinge + normals[valid] * direction * TARGET_LENGTH
+        t, z = terrain.Proxy.line_crossings_at(terrain, hinge, ends, height, rise)
+        result[valid] = numpy.stack([
+            start[valid, 0] + direction * t * TARGET_LENGTH, z - origins[valid, 2]], axis=-1)
+        return result
+
+    return ground
+
+def station_variables(variables, stations):
+    """Interpolate variable tables at stations.
+
+    Variables map "Label.Parameter" names to (station, value) pairs,
+    e.g. superelevation slopes or widening offsets along the road.
+    """
+    result = {}
+    for name, table in (variables or {}).items():
+        label, _, key = name.rpartition(".")
+        table = numpy.asarray(table, dtype=numpy.float64).reshape(-1, 2)
+        if not label or key not in PARAMETERS or not len(table): continue
+
+        table = table[numpy.argsort(table[:, 0], kind="stable")]
+        result[(label, key)] = numpy.interp(stations, table[:, 0], table[:, 1])
+    return result
@@ -2,137 +2,478 @@
 
 """Provides functions to object and viewprovider classes of Terrain."""
 
-import FreeCAD
-import Part
+import numpy, colorsys
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree, Delaunay
+from ..utils.parallel import worker_count, map_shared
 
-import numpy, math, colorsys, copy
+# Triangle/level crossings above which contours are computed in parallel.
+PARALLEL_CROSSINGS = 500000
 
 
 def test_triangulation(tri, lmax, amax):
-    """Test triangulation for max length and max angle."""
-    index = []
-    for i in tri.simplices:
-        points = [tri.points[i[j]] for j in range(3)]
-        p1, p2, p3 = [FreeCAD.Vector(point[0], point[1], 0) for point in points]
-
-        #Test triangle
-        if max_length(lmax, p1, p2, p3)\
-            and max_angle(amax,  p1, p2, p3):
-            index.extend([i[j] for j in range(3)])
-    return index
-
-def max_length(lmax, p1, p2, p3):
-    """Calculation of the 2D length between triangle edges"""
-    for i, j in [(p1, p2), (p2, p3), (p3, p1)]:
-        if i.sub(j).Length > lmax:
-            return False
-    return True
-
-def max_angle(amax, p1, p2, p3):
-    """Calculation of the 2D angle between triangle edges"""
-    for j, k, l in [(p1, p2, p3), (p2, p3, p1), (p3, p1, p2)]:
-        angle = math.degrees(j.sub(k).getAngle(l.sub(k)))
-        if angle > amax:
-            return False
-    return True
-
-def get_contours(mesh, major, minor):
-    """Create triangulation contour lines"""
-    zmax, zmin = mesh.BoundBox.ZMax, mesh.BoundBox.ZMin
-    minor_contours, major_contours = [], []
-    delta = minor
-    while delta < zmax:
-        if minor == 0: break
-        cross_sections = mesh.crossSections([((0, 0, delta), (0, 0, 1))], 0.000001)
-        for point_list in cross_sections[0]:
-            if len(point_list) > 3:
-                wire = Part.makePolygon(point_list)
-                if delta % major == 0:
-                    major_contours.append(wire)
-                else:
-                    minor_contours.append(wire)
-        delta += minor
-    return Part.makeCompound(
-        [Part.makeCompound(major_contours), 
-        Part.makeCompound(minor_contours)])
-
-def get_boundary(mesh):
-    """Find boundary of triangulation"""
-    edges = []
-    facets = mesh.Facets
-    for facet in facets:
-        for i in range(3):
-            if facet.NeighbourIndices[i] != -1: continue
-            start = facet.Points[i]
-            end = facet.Points[(i + 1) % 3]
-            
-            if start == end: continue
-            line = Part.makeLine(
-                facet.Points[i], 
-                facet.Points[(i + 1) % 3])
-            edges.append(line)
-
-    wires = []
-    for opening in Part.sortEdges(edges):
-        wires.append(Part.Wire(opening))
-    return Part.makeCompound(wires)
-
-def wire_view(shape):
-    points = []
-    vertices = []
-    for i in shape.Wires:
-        vectors = []
-        for vertex in i.OrderedVertexes:
-            vectors.append(vertex.Point)
-        if i.isClosed():
-            vectors.append(i.OrderedVertexes[0].Point)
-        points.extend(vectors)
-        vertices.append(len(vectors))
-    return points, vertices
-
-def elevation_analysis(mesh, ranges):
-    max = mesh.BoundBox.ZMax
-    min = mesh.BoundBox.ZMin
-    colorlist = []
-    for facet in mesh.Facets:
-        z = facet.Points[0][2] + facet.Points[1][2] + facet.Points[2][2]
-        hue = 1
-        elevations = numpy.arange(min, max, (max-min)/ranges)
-        for i in elevations:
-            if z/3 < i: 
-                hue = i/(max-min)
-                break
-        colorlist.append(colorsys.hls_to_rgb(hue, 0.5, 0.5))
-    return colorlist
-
-def slope_analysis(mesh, ranges):
-    colorlist = []
-    for facet in mesh.Facets:
-        normal = facet.Normal
-        angle = math.degrees(normal.getAngle(FreeCAD.Vector(0, 0, 1))*2)
-        hue = 1
-        slopes = numpy.arange(0.0, 90.0, 90.0/ranges)
-        for i in slopes:
-            if angle < i: 
-                hue = i/90.0
-                break
-        colorlist.append(colorsys.hls_to_rgb(hue, 0.5, 0.5))
-    return colorlist
-
-def direction_analysis(mesh, ranges):
-    colorlist = []
-    for facet in mesh.Facets:
-        normal = copy.deepcopy(facet.Normal)
-        normal.z = 0
-        anglex = math.degrees(normal.getAngle(FreeCAD.Vector(1, 0, 0)))
-        angley = math.degrees(normal.getAngle(FreeCAD.Vector(0, 1, 0)))
-        if angley >= 90:
-            anglex = 360.0 - anglex
-        hue = 0.0
-        directions = numpy.arange(0.0, 360.0, 360.0/ranges)
-        for i in directions:
-            if anglex < i + directions[1]/2: 
-                hue = i/360.0
-                break
-        colorlist.append(colorsys.hls_to_rgb(hue, 0.5, 0.5))
-    return colorlist
\ No newline at end of file
+    """Test triangulation for max length and max angle.
+
+    Edge lengths and interior angles of every simplex are evaluated
+    at once on the 2D coordinates. Returns a boolean mask over
+    tri.simplices which is True for the triangles to keep.
+    """
+    corners = tri.points[tri.simplices][:, :, :2]
+
+    # Edge k runs from corner k to corner k+1.
+    edges = numpy.roll(corners, -1, axis=1) - corners
+    lengths = numpy.einsum("ijk,ijk->ij", edges, edges)
+
+    # Interior angle at corner k is between edge k and reversed edge k-1.
+    previous = numpy.roll(edges, 1, axis=1)
+    dots = -numpy.einsum("ijk,ijk->ij", edges, previous)
+    crosses = numpy.abs(
+        edges[:, :, 0] * previous[:, :, 1] - edges[:, :, 1] * previous[:, :, 0])
+    angles = numpy.degrees(numpy.arctan2(crosses, dots))
+
+    mask = numpy.all(lengths <= lmax * lmax, axis=1)
+    mask &= numpy.all(angles <= amax, axis=1)
+    mask &= numpy.all(lengths > 0, axis=1)
+    return mask
+
+def added_points(old, new):
+    """Find the rows of new that are missing in old.
+
+    Returns None when old has rows that are missing in new, which
+    means points were deleted or moved.
+    """
+    ids = numpy.unique(numpy.vstack([old, new]), axis=0, return_inverse=True)[1].ravel()
+    old_ids, new_ids = ids[:len(old)], ids[len(old):]
+    if not numpy.isin(old_ids, new_ids).all(): return None
+    return new[~numpy.isin(new_ids, old_ids)]
+
+def grid_thinning(points, size):
+    """Keep the point nearest to the centre of each grid cell."""
+    cells = numpy.floor(points[:, :2] / size)
+    distance = numpy.hypot(*(points[:, :2] - (cells + 0.5) * size).T)
+    _, keys = numpy.unique(cells, axis=0, return_inverse=True)
+    order = numpy.lexsort((distance, keys.ravel()))
+    first = numpy.r_[True, keys.ravel()[order][1:] != keys.ravel()[order][:-1]]
+    return points[numpy.sort(order[first])]
+
+def merge_duplicates(points, tolerance):
+    """Merge points closer than tolerance in plan into their average.
+
+    Each point joins a representative within tolerance, so dense data
+    does not chain into clusters larger than the tolerance. Points with
+    no lower unmerged neighbour become representatives in rounds, and
+    their unmerged neighbours join the lowest of them.
+    """
+    pairs = cKDTree(points[:, :2]).query_pairs(tolerance, output_type="ndarray")
+    first = numpy.r_[pairs[:, 0], pairs[:, 1]].astype(numpy.int64)
+    second = numpy.r_[pairs[:, 1], pairs[:, 0]].astype(numpy.int64)
+    ids = numpy.arange(len(points))
+    labels = numpy.full(len(points), -1)
+
+    while (labels < 0).any():
+        free = labels < 0
+        links = free[first] & free[second]
+        lowest = ids.copy()
+        numpy.minimum.at(lowest, first[links], second[links])
+        chosen = free & (lowest == ids)
+        labels[chosen] = ids[chosen]
+
+        joins = chosen[first] & (labels[second] < 0)
+        target = numpy.full(len(points), len(points))
+        numpy.minimum.at(target, second[joins], first[joins])
+        labels[target < len(points)] = target[target < len(points)]
+
+    _, labels = numpy.unique(labels, return_inverse=True)
+    sizes = numpy.bincount(labels)
+    return numpy.stack([numpy.bincount(labels, points[:, i]) / sizes
+        for i in range(3)], axis=1)
+
+def vertical_decimation(points, tolerance, passes=8):
+    """Remove points that a plane through their neighbours predicts within tolerance.
+
+    Each pass fits a least squares plane to the Delaunay neighbours of
+    every point and removes an independent set of the points with the
+    smallest vertical errors. Convex hull points are kept.
+    """
+    for _ in range(passes):
+        if len(points) < 4: break
+        tri = Delaunay(points[:, :2])
+        indptr, indices = tri.vertex_neighbor_vertices
+        counts = numpy.diff(indptr)
+        owner = numpy.repeat(numpy.arange(len(points)), counts)
+        x, y, z = (points[indices] - points[owner]).T
+
+        def total(values):
+            return numpy.bincount(owner, values, len(points))
+
+        # Normal equations of z = a * x + b * y + c around each point.
+        matrix = numpy.stack([
+            numpy.stack([total(x * x), total(x * y), total(x)], axis=-1),
+            numpy.stack([total(x * y), total(y * y), total(y)], axis=-1),
+            numpy.stack([total(x), total(y), counts.astype(float)], axis=-1)], axis=1)
+        vector = numpy.stack([total(x * z), total(y * z), total(z)], axis=-1)
+        solvable = numpy.abs(numpy.linalg.det(matrix)) > 1e-9 * numpy.abs(matrix).max()
+        error = numpy.full(len(points), numpy.inf)
+        error[solvable] = numpy.abs(numpy.linalg.solve(
+            matrix[solvable], vector[solvable][..., None])[:, 2, 0])
+        error[numpy.unique(tri.convex_hull)] = numpy.inf
+
+        # Remove points with the lowest error among their neighbours.
+        rank = numpy.empty(len(points), dtype=numpy.int64)
+        rank[numpy.lexsort((numpy.arange(len(points)), error))] = numpy.arange(len(points))
+        lowest = numpy.full(len(points), len(points))
+        numpy.minimum.at(lowest, owner, rank[indices])
+        remove = (error <= tolerance) & (rank < lowest)
+        if not remove.any(): break
+        points = points[~remove]
+    return points
+
+def thin_points(points, mode, tolerance):
+    """Thin points before triangulation with the given mode."""
+    if tolerance <= 0 or len(points) < 4: return points
+    if mode == "Grid": return grid_thinning(points, tolerance)
+    if mode == "Duplicates": return merge_duplicates(points, tolerance)
+    if mode == "Vertical Error": return vertical_decimation(points, tolerance)
+    return points
+
+def apply_operation(points, faces, op):
+    """Apply a terrain edit operation to vertex and face arrays.
+
+    Facets are ordered like the matching Mesh methods order them,
+    so face indices picked in the 3D view stay valid for both.
+    """
+    kind = op.get("type")
+    idx = op.get("index")
+
+    if kind == "Add Point":
+        a, b, c = faces[idx].tolist()
+        n = len(points)
+        points = numpy.vstack([points, op.get("vector")])
+        faces = numpy.vstack([faces, [[b, c, n], [c, a, n]]]).astype(numpy.int32)
+        faces[idx] = [a, b, n]
+
+    elif kind == "Delete Triangle":
+        faces = numpy.delete(faces, idx, axis=0)
+
+    elif kind == "Swap Edge":
+        other = op.get("other")
+        if other < 0 or other == idx:
+            raise ValueError("Triangle has no neighbour at this edge")
+
+        first, second = faces[idx].tolist(), faces[other].tolist()
+        shared = set(first) & set(second)
+        if len(shared) != 2:
+            raise ValueError("Triangles do not share an edge")
+
+        side = next(i for i in range(3) if {first[i], first[(i + 1) % 3]} == shared)
+        other_side = next(i for i in range(3) if {second[i], second[(i + 1) % 3]} == shared)
+        swapped_first, swapped_second = first.copy(), second.copy()
+        swapped_first[(side + 1) % 3] = second[(other_side + 2) % 3]
+        swapped_second[(other_side + 1) % 3] = first[(side + 2) % 3]
+
+        # Both new triangles must keep the orientation of the old ones.
+        corners = points[[first, swapped_first, swapped_second], :2]
+        edges = corners[:, 1:] - corners[:, :1]
+        areas = edges[:, 0, 0] * edges[:, 1, 1] - edges[:, 0, 1] * edges[:, 1, 0]
+        if not (areas[0] * areas[1] > 0 and areas[0] * areas[2] > 0):
+            raise ValueError("The edge between these triangles cannot be swapped")
+
+        faces = faces.copy()
+        faces[idx], faces[other] = swapped_first, swapped_second
+
+    return points, faces
+
+def signed_area(corners):
+    """Return twice the signed area of 2D triangles, positive if counterclockwise."""
+    sides = corners[:, 1:] - corners[:, :1]
+    return sides[:, 0, 0] * sides[:, 1, 1] - sides[:, 0, 1] * sides[:, 1, 0]
+
+def contour_levels(zmin, zmax, interval):
+    """Return contour levels between zmin and zmax at the given interval."""
+    if interval <= 0 or zmax < zmin:
+        return numpy.empty(0)
+    start = numpy.ceil(zmin / interval)
+    end = numpy.floor(zmax / interval)
+    return numpy.arange(start, end + 1) * interval
+
+def contour_lines(vertices, faces, levels):
+    """Compute contour polylines of a triangulation at all levels at once.
+
+    Triangle/level crossings are computed with NumPy and the segments
+    are stitched into polylines through their crossing edges. Returns
+    flat point coordinates, vertex counts and level of each polyline.
+    """
+    vertices = numpy.asarray(vertices, dtype=numpy.float64)
+    return chain_contours(vertices, *contour_segments(vertices, faces, levels))
+
+def contour_segments(vertices, faces, levels):
+    """Find contour segments crossing the triangles of a triangulation.
+
+    Returns the crossing edges where each segment starts and ends as
+    ascending vertex index pairs, shaped (segments, 2, 2), and the
+    level of each segment.
+    """
+    empty = (numpy.empty((0, 2, 2), dtype=numpy.int64), numpy.empty(0))
+    if not len(faces) or not len(levels): return empty
+
+    vertices = numpy.asarray(vertices, dtype=numpy.float64)
+    faces = numpy.asarray(faces, dtype=numpy.int64)
+    levels = numpy.sort(numpy.asarray(levels, dtype=numpy.float64))
+    z = vertices[faces, 2]
+
+    # Levels in (zmin, zmax] cross a triangle at exactly two edges.
+    first = numpy.searchsorted(levels, z.min(axis=1), side="right")
+    last = numpy.searchsorted(levels, z.max(axis=1), side="right")
+    count = last - first
+    total = count.sum()
+    if not total: return empty
+
+    tri = numpy.repeat(numpy.arange(len(faces)), count)
+    level = numpy.repeat(first - numpy.cumsum(count) + count, count) + numpy.arange(total)
+    above = z[tri] >= levels[level][:, None]
+    rising = numpy.argmax(~above & numpy.roll(above, -1, axis=1), axis=1)
+    falling = numpy.argmax(above & ~numpy.roll(above, -1, axis=1), axis=1)
+
+    # Segments run from the rising to the falling edge of counterclockwise
+    # triangles, so each crossing starts one segment and ends another.
+    clockwise = signed_area(vertices[faces[tri], :2]) < 0
+    edge = numpy.where(clockwise[:, None],
+        numpy.stack([falling, rising], axis=1),
+        numpy.stack([rising, falling], axis=1))
+
+    # Crossing edges with ordered vertex indices, shared by neighbours.
+    start = faces[tri[:, None], edge]
+    end = faces[tri[:, None], (edge + 1) % 3]
+    edges = numpy.stack([numpy.minimum(start, end), numpy.maximum(start, end)], axis=2)
+    return edges, levels[level]
+
+def chain_contours(vertices, edges, segment_levels):
+    """Stitch contour segments into polylines through their crossing edges.
+
+    Takes segments as returned by contour_segments, which may come from
+    several parts of one triangulation. Returns flat point coordinates,
+    vertex counts and level of each polyline.
+    """
+    if not len(edges):
+        return numpy.empty((0, 3)), numpy.empty(0, dtype=numpy.int64), numpy.empty(0)
+
+    levels, level = numpy.unique(segment_levels, return_inverse=True)
+    edges = numpy.asarray(edges, dtype=numpy.int64).reshape(-1, 2)
+    keys, edge_ids = numpy.unique(edges[:, 0] * len(vertices) + edges[:, 1], return_inverse=True)
+    key = edge_ids.reshape(-1, 2) * len(levels) + level.reshape(-1, 1)
+    nodes, ids = numpy.unique(key.ravel(), return_inverse=True)
+    ids = ids.reshape(-1, 2)
+
+    node_edge, node_level = numpy.divmod(nodes, len(levels))
+    low, high = numpy.divmod(keys[node_edge], len(vertices))
+    start, end = numpy.asarray(vertices[low]), numpy.asarray(vertices[high])
+    t = ((levels[node_level] - start[:, 2]) / (end[:, 2] - start[:, 2]))[:, None]
+    points = start + t * (end - start)
+
+    order, counts = chain_segments(ids[:, 0], ids[:, 1], len(nodes), level.ravel())
+    line_levels = levels[node_level[order[numpy.cumsum(counts) - counts]]]
+    return points[order], counts, line_levels
+
+def chain_segments(starts, ends, node_count, keys=None):
+    """Stitch directed segments into polylines.
+
+    Every node may start and end at most one segment. Returns node
+    indices of all polylines back to back and node count of each,
+    ordered by the optional segment keys. Closed polylines repeat
+    their first node at the end.
+    """
+    count = len(starts)
+    segments = numpy.arange(count)
+    outgoing = numpy.full(node_count, -1)
+    incoming = numpy.full(node_count, -1)
+    outgoing[starts] = segments
+    incoming[ends] = segments
+    succ, pred = outgoing[ends], incoming[starts]
+
+    # Keep mutual links only, nodes used more than once split polylines.
+    pred = numpy.where((pred >= 0) & (succ[pred] == segments), pred, -1)
+    succ = numpy.where((succ >= 0) & (pred[succ] == segments), succ, -1)
+
+    # Open closed polylines at their lowest segment.
+    linked = succ >= 0
+    graph = coo_matrix(
+        (numpy.ones(linked.sum()), (segments[linked], succ[linked])),
+        shape=(count, count))
+    label_count, labels = connected_components(graph, directed=True, connection="weak")
+    lowest = numpy.full(label_count, count)
+    numpy.minimum.at(lowest, labels, segments)
+    closed = numpy.ones(label_count, dtype=bool)
+    closed[labels[pred < 0]] = False
+    pred[lowest[closed]] = -1
+
+    # Rank segments along their polylines with pointer jumping.
+    head = numpy.where(pred >= 0, pred, segments)
+    rank = (pred >= 0).astype(numpy.int64)
+    while True:
+        jump = head[head]
+        if numpy.array_equal(jump, head): break
+        rank += rank[head]
+        head = jump
+
+    order = numpy.lexsort((rank, head) if keys is None else (rank, head, keys))
+    first = numpy.flatnonzero(numpy.r_[True, head[order][1:] != head[order][:-1]])
+    last = numpy.r_[first[1:], count]
+    nodes = numpy.insert(starts[order], last, ends[order[last - 1]])
+    return nodes, last - first + 1
+
+def contour_bands(low, high, levels, count):
+    """Split levels into bands with similar numbers of triangle crossings."""
+    first = numpy.searchsorted(levels, low, side="right")
+    last = numpy.searchsorted(levels, high, side="right")
+    load = numpy.cumsum(
+        numpy.bincount(first, minlength=len(levels) + 1)
+        - numpy.bincount(last, minlength=len(levels) + 1))[:-1]
+
+    total = numpy.cumsum(load)
+    if not len(total) or not total[-1]: return [], 0
+    splits = numpy.searchsorted(total, total[-1] * numpy.arange(1, count) / count)
+    bounds = numpy.unique(numpy.r_[0, splits, len(levels)])
+    return [(int(i), int(j)) for i, j in zip(bounds[:-1], bounds[1:]) if j > i], int(total[-1])
+
+def contour_band(arrays, band):
+    """Compute contour lines of one band of levels."""
+    levels = arrays["levels"][band[0]:band[1]]
+    mask = (arrays["low"] < levels[-1]) & (arrays["high"] >= levels[0])
+    return contour_lines(arrays["vertices"], arrays["faces"][mask], levels)
+
+def parallel_contour_lines(vertices, faces, levels, workers=0):
+    """Compute contour lines with elevation bands processed in parallel.
+
+    Bands are merged in level order, so the result is the same as
+    contour_lines for any number of workers.
+    """
+    vertices = numpy.asarray(vertices, dtype=numpy.float64)
+    faces = numpy.asarray(faces, dtype=numpy.int64)
+    levels = numpy.sort(numpy.asarray(levels, dtype=numpy.float64))
+    z = vertices[faces, 2]
+    low, high = z.min(axis=1), z.max(axis=1)
+
+    count = worker_count(workers)
+    bands, crossings = contour_bands(low, high, levels, count)
+    if count < 2 or len(bands) < 2 or crossings < PARALLEL_CROSSINGS:
+        return contour_lines(vertices, faces, levels)
+
+    arrays = {"vertices": vertices, "faces": faces, "levels": levels, "low": low, "high": high}
+    results = map_shared(contour_band, arrays, bands, count)
+    return tuple(numpy.concatenate(parts) for parts in zip(*results))
+
+def get_contours(vertices, faces, major, minor, workers=0):
+    """Create triangulation contour lines as flat coordinate arrays.
+
+    Returns a dictionary with (points, counts) of major and minor
+    contours, ready to be used for Coin coordinates and line sets.
+    """
+    vertices = numpy.asarray(vertices, dtype=numpy.float64)
+    if not len(faces) or minor <= 0:
+        return {}
+
+    levels = contour_levels(vertices[:, 2].min(), vertices[:, 2].max(), minor)
+    lines = parallel_contour_lines(vertices, faces, levels, workers)
+
+    # Skip tiny polylines like the section based generator did.
+    return split_contours(*lines, major, shortest=4)
+
+def split_contours(points, counts, line_levels, major, shortest=2):
+    """Split contour polylines into major and minor (points, counts)."""
+    ratio = line_levels / major if major > 0 else numpy.full(len(line_levels), 0.5)
+    is_major = numpy.abs(ratio - numpy.round(ratio)) < 1e-6
+    valid = counts >= shortest
+    point_lines = numpy.repeat(numpy.arange(len(counts)), counts)
+
+    contours = {}
+    for name, mask in [("Major", is_major & valid), ("Minor", ~is_major & valid)]:
+        contours[name] = (points[mask[point_lines]], counts[mask])
+    return contours
+
+def get_boundary(vertices, faces):
+    """Find boundary loops of triangulation as flat coordinate arrays.
+
+    Edges used by a single triangle are boundary edges. They are
+    oriented counterclockwise and chained into closed polylines.
+    Returns point coordinates and vertex count of each loop.
+    """
+    vertices = numpy.asarray(vertices, dtype=numpy.float64)
+    faces = numpy.asarray(faces, dtype=numpy.int64)
+    if not len(faces): return numpy.empty((0, 3)), numpy.empty(0, dtype=numpy.int64)
+
+    clockwise = signed_area(vertices[faces, :2]) < 0
+    faces = numpy.where(clockwise[:, None], faces[:, ::-1], faces)
+
+    edges = numpy.stack([faces, numpy.roll(faces, -1, axis=1)], axis=2).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    keys = numpy.minimum(edges[:, 0], edges[:, 1]) * len(vertices) + edges.max(axis=1)
+    _, inverse, occurrence = numpy.unique(keys, return_inverse=True, return_counts=True)
+    edges = edges[occurrence[inverse] == 1]
+
+    nodes, counts = chain_segments(edges[:, 0], edges[:, 1], len(vertices))
+    return vertices[nodes], counts
+
+def decimate(vertices, faces, ratio):
+    """Simplify a triangulation by clustering vertices on a 2D grid.
+
+    The cell size keeps about 1/ratio of the used vertices, clustered
+    vertices are averaged. Returns new vertices, remaining faces and
+    the source face index of each remaining face.
+    """
+    used, inverse = numpy.unique(faces, return_inverse=True)
+    xy = vertices[used, :2]
+    low = xy.min(axis=0)
+    extent = numpy.maximum(xy.max(axis=0) - low, 1e-9)
+    size = numpy.sqrt(extent.prod() * ratio / len(used))
+
+    cells = numpy.floor((xy - low) / size).astype(numpy.int64)
+    keys = cells[:, 0] * (int(extent[1] // size) + 1) + cells[:, 1]
+    _, cluster, counts = numpy.unique(keys, return_inverse=True, return_counts=True)
+    points = numpy.stack([numpy.bincount(cluster, vertices[used, i]) / counts
+        for i in range(3)], axis=1)
+
+    # Drop collapsed, folded and duplicate faces.
+    clustered = cluster[inverse.reshape(-1)].reshape(-1, 3)
+    a, b, c = clustered.T
+    source = numpy.flatnonzero((a != b) & (b != c) & (c != a))
+    folded = signed_area(points[clustered[source], :2]) * signed_area(vertices[faces[source], :2]) <= 0
+    source = source[~folded]
+    _, first = numpy.unique(numpy.sort(clustered[source], axis=1), axis=0, return_index=True)
+    source = source[numpy.sort(first)]
+    return points, clustered[source], source
+
+def color_table(ranges, offset=0):
+    """Return a float32 colour lookup table of evenly spaced hues."""
+    hues = (numpy.arange(ranges) + offset) / ranges
+    return numpy.array(
+        [colorsys.hls_to_rgb(hue, 0.5, 0.5) for hue in hues], dtype=numpy.float32)
+
+def face_normals(vertices, faces):
+    """Return upward facing normals of triangles."""
+    corners = vertices[faces]
+    normals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals[normals[:, 2] < 0] *= -1
+    return normals
+
+def elevation_analysis(vertices, faces, ranges):
+    """Colour faces by centroid elevation in equal elevation ranges."""
+    z = vertices[faces, 2].mean(axis=1)
+    zmin, zmax = vertices[:, 2].min(), vertices[:, 2].max()
+    limits = zmin + (zmax - zmin) * numpy.arange(1, ranges) / ranges
+    return color_table(ranges, 1)[numpy.searchsorted(limits, z, side="right")]
+
+def slope_analysis(vertices, faces, ranges):
+    """Colour faces by slope angle in equal ranges between 0 and 90 degrees."""
+    normals = face_normals(vertices, faces)
+    slope = numpy.degrees(numpy.arctan2(numpy.hypot(normals[:, 0], normals[:, 1]), normals[:, 2]))
+    limits = 90.0 * numpy.arange(1, ranges) / ranges
+    return color_table(ranges, 1)[numpy.searchsorted(limits, slope, side="right")]
+
+def direction_analysis(vertices, faces, ranges):
+    """Colour faces by aspect in equal sectors centred on the x axis."""
+    normals = face_normals(vertices, faces)
+    aspect = numpy.degrees(numpy.arctan2(normals[:, 1], normals[:, 0])) % 360
+    limits = 360.0 * (numpy.arange(ranges) + 0.5) / ranges
+    sectors = numpy.searchsorted(limits, aspect, side="right") % ranges
+    return color_table(ranges)[sectors]
@@ -0,0 +1,72 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides binary storage functions for Terrain arrays."""
+
+import os, hashlib, tempfile
+import numpy
+
+# Bytes of cached results kept next to a document.
+CACHE_BYTES = 256 * 1024 * 1024
+
+
+def content_hash(*arrays):
+    """Return a hex digest of the given arrays' shapes and contents."""
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = numpy.ascontiguousarray(array)
+        digest.update(str((array.dtype.str, array.shape)).encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+def write_arrays(name, **arrays):
+    """Write arrays to a temporary .npz file and return its path."""
+    path = os.path.join(tempfile.mkdtemp(), f"{name}.npz")
+    numpy.savez(path, **arrays)
+    return path
+
+def read_arrays(path):
+    """Read all arrays of an .npz file into a dictionary."""
+    if not path or not os.path.isfile(path):
+        return {}
+
+    with numpy.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+def save_arrays(path, **arrays):
+    """Write arrays to an .npz file at the given path."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    numpy.savez(path, **arrays)
+
+def cache_path(document, name, key):
+    """Return the path of a cached result next to the saved document."""
+    if not document.FileName:
+        return ""
+
+    folder = os.path.splitext(document.FileName)[0] + "_cache"
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(folder, f"{name}_{digest}.npz")
+
+def read_cached(path):
+    """Read a cached result and mark it as recently used."""
+    arrays = read_arrays(path)
+    if arrays:
+        os.utime(path)
+    return arrays
+
+def save_cached(path, limit=CACHE_BYTES, **arrays):
+    """Write a cached result and evict old results beyond the size limit."""
+    save_arrays(path, **arrays)
+    prune_cache(os.path.dirname(path), limit)
+
+def prune_cache(folder, limit=CACHE_BYTES):
+    """Remove least recently used results until the cache fits the limit."""
+    if not os.path.isdir(folder):
+        return
+
+    files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+        for entry in os.scandir(folder) if entry.is_file() and entry.name.endswith(".npz")]
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= limit: break
+        os.remove(path)
+        total -= size
@@ -0,0 +1,175 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides a tiled, memory-mapped cache of Terrain triangulations."""
+
+import os
+import numpy
+
+from .triangle_index import TriangleIndex, first_crossings, merge_crossings
+from .terrain_functions import chain_contours, contour_levels, contour_segments, split_contours
+
+# Number of tiles kept loaded with their cached results.
+TILE_CACHE = 16
+
+
+class TerrainTiles:
+    """Triangulation split into square tiles cached in memory-mapped files.
+
+    Tiles are written from the live triangulation, which stays loaded
+    with the Terrain object. Faces are grouped by the tile of their
+    centroid. Queries load only the tiles they touch, each with its own
+    vertex numbering, spatial index and contour segments, and report
+    face ids of the live triangulation.
+    """
+
+    def __init__(self, folder):
+        """Open tile files of a folder written by TerrainTiles.write."""
+        self.folder = folder
+
+        # Folders without the face order are rewritten.
+        ordered = os.path.isfile(os.path.join(folder, "order.npy"))
+        self.key = str(numpy.load(os.path.join(folder, "key.npy"))) if ordered else ""
+        if not ordered: return
+
+        self.order = numpy.load(os.path.join(folder, "order.npy"), mmap_mode="r")
+        self.vertices = numpy.load(os.path.join(folder, "vertices.npy"), mmap_mode="r")
+        self.faces = numpy.load(os.path.join(folder, "faces.npy"), mmap_mode="r")
+
+        # Face range and vertex bounding box of each tile.
+        self.table = numpy.load(os.path.join(folder, "tiles.npy"))
+        self.cache = {}
+
+    @classmethod
+    def write(cls, folder, vertices, faces, size, key=""):
+        """Partition a triangulation into tiles and write them to a folder."""
+        vertices = numpy.asarray(vertices, dtype=numpy.float64)
+        faces = numpy.asarray(faces, dtype=numpy.int64)
+        centroids = vertices[faces, :2].mean(axis=1)
+
+        cells = numpy.floor((centroids - centroids.min(axis=0)) / size).astype(numpy.int64)
+        keys = cells[:, 0] * (cells[:, 1].max() + 1) + cells[:, 1]
+        order = numpy.argsort(keys, kind="stable")
+        faces, keys = faces[order], keys[order]
+
+        first = numpy.flatnonzero(numpy.r_[True, keys[1:] != keys[:-1]])
+        last = numpy.r_[first[1:], len(faces)]
+        tile = numpy.repeat(numpy.arange(len(first)), last - first)
+        corners = vertices[faces, :2]
+        low = numpy.full((len(first), 2), numpy.inf)
+        high = numpy.full((len(first), 2), -numpy.inf)
+        numpy.minimum.at(low, tile, corners.min(axis=1))
+        numpy.maximum.at(high, tile, corners.max(axis=1))
+
+        os.makedirs(folder, exist_ok=True)
+        numpy.save(os.path.join(folder, "vertices.npy"), vertices)
+        numpy.save(os.path.join(folder, "faces.npy"), faces)
+        numpy.save(os.path.join(folder, "order.npy"), order)
+        numpy.save(os.path.join(folder, "tiles.npy"), numpy.c_[first, last, low, high])
+        numpy.save(os.path.join(folder, "key.npy"), numpy.array(key))
+        return cls(folder)
+
+    def tiles_in(self, low, high):
+        """Return tiles whose bounding box overlaps the given box."""
+        bounds = self.table[:, 2:]
+        overlap = numpy.all((bounds[:, :2] <= high) & (bounds[:, 2:] >= low), axis=1)
+        return numpy.flatnonzero(overlap)
+
+    def cached(self, tile, name, compute):
+        """Return a result of a tile, keeping recently used tiles loaded."""
+        results = self.cache.pop(tile, {})
+        self.cache[tile] = results
+        while len(self.cache) > TILE_CACHE:
+            self.cache.pop(next(iter(self.cache)))
+
+        if name not in results:
+            results[name] = compute()
+        return results[name]
+
+    def tile(self, tile):
+        """Return vertices and faces of a tile with compact numbering."""
+        def load():
+            first, last = self.table[tile, :2].astype(numpy.int64)
+            used, inverse = numpy.unique(self.faces[first:last], return_inverse=True)
+            return numpy.asarray(self.vertices[used]), inverse.reshape(-1, 3)
+        return self.cached(tile, "arrays", load)
+
+    def index(self, tile):
+        """Return the spatial index of a tile."""
+        return self.cached(tile, "index", lambda: TriangleIndex(*self.tile(tile)))
+
+    def elevations_at(self, xy):
+        """Interpolate elevations of points from the tiles under them.
+
+        Returns elevations, NaN outside the triangulation, and the
+        live triangle id of each point, -1 outside.
+        """
+        xy = numpy.asarray(xy, dtype=numpy.float64).reshape(-1, 2)
+        z = numpy.full(len(xy), numpy.nan)
+        ids = numpy.full(len(xy), -1, dtype=numpy.int64)
+        if not len(xy): return z, ids
+
+        for tile in self.tiles_in(xy.min(axis=0), xy.max(axis=0)):
+            bounds = self.table[tile, 2:]
+            todo = numpy.flatnonzero((ids < 0)
+                & numpy.all((xy >= bounds[:2]) & (xy <= bounds[2:]), axis=1))
+            if not len(todo): continue
+
+            values, found = self.index(tile).elevations_at(xy[todo])
+            hit = found >= 0
+            z[todo[hit]] = values[hit]
+            ids[todo[hit]] = self.order[found[hit] + int(self.table[tile, 0])]
+        return z, ids
+
+    def sections(self, starts, ends, tolerance=1e-9):
+        """Intersect 2D segments with the tiles they pass over.
+
+        Crossings on tile borders are found by both neighbours and
+        merged, so the result is the same as TriangleIndex.sections
+        on the live triangulation.
+        """
+        starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+        ends = numpy.asarray(ends, dtype=numpy.float64).reshape(-1, 2)
+        low, high = numpy.minimum(starts, ends), numpy.maximum(starts, ends)
+        parts = [(numpy.empty(0, dtype=numpy.int64), numpy.empty(0), numpy.empty(0))]
+        if not len(starts): return parts[0]
+
+        for tile in self.tiles_in(low.min(axis=0), high.max(axis=0)):
+            bounds = self.table[tile, 2:]
+            todo = numpy.flatnonzero(
+                numpy.all((low <= bounds[2:]) & (high >= bounds[:2]), axis=1))
+            if not len(todo): continue
+
+            segment, t, z = self.index(tile).sections(starts[todo], ends[todo], tolerance)
+            parts.append((todo[segment], t, z))
+        return merge_crossings(*(numpy.concatenate(arrays) for arrays in zip(*parts)), tolerance)
+
+    def line_crossings(self, starts, ends, heights, rises):
+        """Find where sloped lines first meet the tiles they pass over.
+
+        See TriangleIndex.line_crossings.
+        """
+        starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+        segment, t, z = self.sections(starts, ends)
+        return first_crossings(len(starts), segment, t, z, heights, rises)
+
+    def contours(self, major, minor, low=None, high=None):
+        """Return contours of tiles in the given box.
+
+        Contour segments are computed and cached per tile, then chained
+        across tile borders through their shared crossing edges, so the
+        lines are the same as get_contours finds on the live
+        triangulation. Short lines are skipped like get_contours skips
+        them.
+        """
+        def compute(tile):
+            first, last = self.table[tile, :2].astype(numpy.int64)
+            faces = numpy.asarray(self.faces[first:last])
+            z = self.vertices[faces.ravel(), 2]
+            return contour_segments(self.vertices, faces, contour_levels(z.min(), z.max(), minor))
+
+        tiles = range(len(self.table)) if low is None else self.tiles_in(low, high)
+        parts = [self.cached(tile, ("contours", minor), lambda: compute(tile)) for tile in tiles]
+        if not parts or minor <= 0: return {}
+
+        edges, levels = (numpy.concatenate(arrays) for arrays in zip(*parts))
+        return split_contours(*chain_contours(self.vertices, edges, levels), major, shortest=4)
@@ -0,0 +1,302 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides a 2D spatial index of triangulation faces."""
+
+import numpy
+
+from ..utils.parallel import worker_count, map_shared, SharedArrays
+
+# Segments above which sections are computed in parallel chunks.
+PARALLEL_SEGMENTS = 200
+
+# Grid cell entries per triangle the index may hold at most.
+CELLS_PER_TRIANGLE = 8
+
+
+class TriangleIndex:
+    """Uniform grid over triangle bounding boxes for batched point queries."""
+
+    def __init__(self, vertices, faces, key=""):
+        """Bucket triangles into the grid cells they overlap.
+
+        Only occupied cells are stored, so empty parts of long or sparse
+        surveys cost no memory.
+        """
+        self.key = key
+        self.vertices = numpy.asarray(vertices, dtype=numpy.float64).reshape(-1, 3)
+        self.faces = numpy.asarray(faces, dtype=numpy.int64).reshape(-1, 3)
+
+        corners = self.vertices[self.faces, :2]
+        low, high = corners.min(axis=1), corners.max(axis=1)
+        if not len(self.faces):
+            low = high = numpy.zeros((1, 2))
+
+        # Cells about the size of a typical triangle, grown until slivers
+        # like long hull triangles no longer fill too many cells.
+        self.origin = low.min(axis=0)
+        extent = high.max(axis=0) - self.origin
+        self.size = float(numpy.median((high - low).max(axis=1))) or float(extent.max()) or 1.0
+        limit = CELLS_PER_TRIANGLE * len(self.faces)
+        while True:
+            self.shape = (extent // self.size).astype(numpy.int64) + 1
+            first = self.cell(low)
+            spans = self.cell(high) - first + 1
+            counts = spans[:, 0] * spans[:, 1] if len(self.faces) else numpy.zeros(0, numpy.int64)
+            if counts.sum() <= limit: break
+            self.size *= 2
+
+        tri = numpy.repeat(numpy.arange(len(counts)), counts)
+        step = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        ix = first[tri, 0] + step % spans[tri, 0]
+        iy = first[tri, 1] + step // spans[tri, 0]
+        cells = iy * self.shape[0] + ix
+
+        order = numpy.argsort(cells, kind="stable")
+        self.items = tri[order]
+        self.cells, first = numpy.unique(cells[order], return_index=True)
+        self.starts = numpy.r_[first, len(cells)]
+
+    def arrays(self):
+        """Return index arrays, e.g. to share them with worker processes."""
+        return {
+            "vertices": self.vertices, "faces": self.faces,
+            "items": self.items, "cells": self.cells, "starts": self.starts,
+            "grid": numpy.r_[self.origin, self.size, self.shape]}
+
+    def shared(self):
+        """Return the index arrays kept in shared memory for worker processes."""
+        if getattr(self, "shared_arrays", None) is None:
+            self.shared_arrays = SharedArrays(self.arrays())
+        return self.shared_arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, key=""):
+        """Create an index from arrays returned by arrays()."""
+        index = cls.__new__(cls)
+        index.key = key
+        index.vertices, index.faces = arrays["vertices"], arrays["faces"]
+        index.items, index.cells, index.starts = arrays["items"], arrays["cells"], arrays["starts"]
+        grid = arrays["grid"]
+        index.origin, index.size = grid[:2], float(grid[2])
+        index.shape = grid[3:].astype(numpy.int64)
+        return index
+
+    def cell(self, xy):
+        """Return grid column and row of points, clipped to the grid."""
+        index = numpy.floor((xy - self.origin) / self.size).astype(numpy.int64)
+        return numpy.clip(index, 0, self.shape - 1)
+
+    def slots(self, cells):
+        """Return positions of grid cells among the occupied cells, -1 if empty."""
+        if not len(self.cells): return numpy.full(len(cells), -1)
+        slot = numpy.minimum(numpy.searchsorted(self.cells, cells), len(self.cells) - 1)
+        return numpy.where(self.cells[slot] == cells, slot, -1)
+
+    def candidates(self, xy):
+        """Return point and triangle index pairs sharing a grid cell."""
+        xy = numpy.asarray(xy, dtype=numpy.float64).reshape(-1, 2)
+        index = numpy.floor((xy - self.origin) / self.size).astype(numpy.int64)
+        inside = numpy.all((index >= 0) & (index < self.shape), axis=1)
+
+        slot = self.slots(index[:, 1] * self.shape[0] + index[:, 0])
+        slot = numpy.where(inside, slot, -1)
+        first = self.starts[slot]
+        counts = numpy.where(slot >= 0, self.starts[slot + 1] - first, 0)
+
+        point = numpy.repeat(numpy.arange(len(xy)), counts)
+        step = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        return point, self.items[first[point] + step]
+
+    def locate(self, xy, tolerance=1e-9):
+        """Find the triangle under each point.
+
+        Returns triangle ids, -1 for points outside the triangulation,
+        and barycentric weights of the triangle vertices.
+        """
+        xy = numpy.asarray(xy, dtype=numpy.float64).reshape(-1, 2)
+        point, tri = self.candidates(xy)
+
+        a, b, c = (self.vertices[self.faces[tri, i], :2] for i in range(3))
+        ab, ac, ap = b - a, c - a, xy[point] - a
+        det = ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0]
+        valid = det != 0
+        det = numpy.where(valid, det, 1)
+        v = (ap[:, 0] * ac[:, 1] - ap[:, 1] * ac[:, 0]) / det
+        w = (ab[:, 0] * ap[:, 1] - ab[:, 1] * ap[:, 0]) / det
+        u = 1 - v - w
+
+        hit = valid & (u >= -tolerance) & (v >= -tolerance) & (w >= -tolerance)
+        found, first = numpy.unique(point[hit], return_index=True)
+        hits = numpy.flatnonzero(hit)[first]
+
+        ids = numpy.full(len(xy), -1, dtype=numpy.int64)
+        weights = numpy.zeros((len(xy), 3))
+        ids[found] = tri[hits]
+        weights[found] = numpy.stack([u[hits], v[hits], w[hits]], axis=1)
+        return ids, weights
+
+    def elevations_at(self, xy):
+        """Interpolate elevations of points on the triangulation.
+
+        Returns elevations, NaN for points outside the triangulation,
+        and the triangle id of each point.
+        """
+        ids, weights = self.locate(xy)
+        if not len(self.faces): return numpy.full(len(ids), numpy.nan), ids
+
+        z = numpy.einsum("ij,ij->i", weights, self.vertices[self.faces[ids], 2])
+        z[ids < 0] = numpy.nan
+        return z, ids
+
+    def segment_candidates(self, starts, ends):
+        """Return segment and triangle index pairs near 2D segments.
+
+        Segments are sampled at half cell steps and the cells around
+        the samples are collected, so no crossed cell is missed.
+        """
+        starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+        ends = numpy.asarray(ends, dtype=numpy.float64).reshape(-1, 2)
+        length = numpy.hypot(*(ends - starts).T)
+        steps = numpy.ceil(length / self.size * 2).astype(numpy.int64) + 1
+
+        segment = numpy.repeat(numpy.arange(len(starts)), steps)
+        step = numpy.arange(steps.sum()) - numpy.repeat(numpy.cumsum(steps) - steps, steps)
+        fraction = step / numpy.maximum(steps - 1, 1)[segment]
+        points = starts[segment] + fraction[:, None] * (ends - starts)[segment]
+
+        around = numpy.array([[i, j] for i in (-1, 0, 1) for j in (-1, 0, 1)])
+        index = numpy.floor((points - self.origin) / self.size).astype(numpy.int64)
+        index = (index[:, None] + around).reshape(-1, 2)
+        segment = numpy.repeat(segment, len(around))
+        inside = numpy.all((index >= 0) & (index < self.shape), axis=1)
+        slot = self.slots(index[inside, 1] * self.shape[0] + index[inside, 0])
+        occupied = slot >= 0
+
+        pairs = numpy.unique(segment[inside][occupied] * len(self.cells) + slot[occupied])
+        segment, slot = numpy.divmod(pairs, max(len(self.cells), 1))
+        first = self.starts[slot]
+        counts = self.starts[slot + 1] - first
+        segment = numpy.repeat(segment, counts)
+        step = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        tri = self.items[numpy.repeat(first, counts) + step]
+
+        pairs = numpy.unique(segment * len(self.faces) + tri)
+        return numpy.divmod(pairs, len(self.faces))
+
+    def sections(self, starts, ends, tolerance=1e-9):
+        """Intersect 2D segments with the triangulation.
+
+        Returns segment ids, parameters along the segments (0 at start,
+        1 at end) and elevations of all triangle edge crossings and
+        segment ends on the triangulation, sorted by segment and
+        parameter.
+        """
+        starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+        ends = numpy.asarray(ends, dtype=numpy.float64).reshape(-1, 2)
+        segment, tri = self.segment_candidates(starts, ends)
+
+        # Crossings with the three edges of every candidate triangle.
+        segment = numpy.repeat(segment, 3)
+        corner = numpy.tile(numpy.arange(3), len(tri))
+        tri = numpy.repeat(tri, 3)
+        a = self.vertices[self.faces[tri, corner]]
+        b = self.vertices[self.faces[tri, (corner + 1) % 3]]
+
+        direction = (ends - starts)[segment]
+        edge = b[:, :2] - a[:, :2]
+        offset = a[:, :2] - starts[segment]
+        denominator = direction[:, 0] * edge[:, 1] - direction[:, 1] * edge[:, 0]
+        valid = denominator != 0
+        denominator = numpy.where(valid, denominator, 1)
+        t = (offset[:, 0] * edge[:, 1] - offset[:, 1] * edge[:, 0]) / denominator
+        u = (offset[:, 0] * direction[:, 1] - offset[:, 1] * direction[:, 0]) / denominator
+        hit = valid & (t >= -tolerance) & (t <= 1 + tolerance) & (u >= 0) & (u <= 1)
+        z = a[hit, 2] + u[hit] * (b[hit, 2] - a[hit, 2])
+
+        # Segment ends lying on the triangulation.
+        ends_z, ends_id = self.elevations_at(numpy.r_[starts, ends])
+        found = ends_id >= 0
+        end_segment = numpy.tile(numpy.arange(len(starts)), 2)[found]
+        end_t = numpy.repeat([0.0, 1.0], len(starts))[found]
+
+        segment = numpy.r_[segment[hit], end_segment]
+        t = numpy.clip(numpy.r_[t[hit], end_t], 0, 1)
+        z = numpy.r_[z, ends_z[found]]
+
+        # Shared edges and vertices give the same crossing more than once.
+        return merge_crossings(segment, t, z, tolerance)
+
+    def line_crossings(self, starts, ends, heights, rises):
+        """Find where sloped lines over 2D segments first meet the triangulation.
+
+        Each line starts at the given height over its segment start and
+        rises linearly by the given amount until the segment end. Returns
+        the segment parameters and elevations of the first crossings,
+        NaN for lines that do not meet the triangulation.
+        """
+        starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+        segment, t, z = self.sections(starts, ends)
+        return first_crossings(len(starts), segment, t, z, heights, rises)
+
+    def parallel_sections(self, starts, ends, workers=0):
+        """Intersect segments with the triangulation in parallel chunks.
+
+        Results are merged in segment order and equal to sections(). The
+        index arrays are shared with worker processes once per index.
+        """
+        starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+        ends = numpy.asarray(ends, dtype=numpy.float64).reshape(-1, 2)
+        count = worker_count(workers)
+        if count < 2 or len(starts) < PARALLEL_SEGMENTS:
+            return self.sections(starts, ends)
+
+        bounds = numpy.unique(numpy.linspace(0, len(starts), count * 4 + 1).astype(int))
+        arrays = {"first_points": starts, "last_points": ends}
+        results = map_shared(section_chunk, arrays,
+            list(zip(bounds[:-1].tolist(), bounds[1:].tolist())), count, self.shared())
+        return tuple(numpy.concatenate(parts) for parts in zip(*results))
+
+
+def section_chunk(arrays, bounds):
+    """Intersect a chunk of shared segments with a shared index."""
+    first, last = bounds
+    index = TriangleIndex.from_arrays(arrays)
+    segment, t, z = index.sections(
+        arrays["first_points"][first:last], arrays["last_points"][first:last])
+    return segment + first, t, z
+
+
+def merge_crossings(segment, t, z, tolerance=1e-9):
+    """Sort section crossings by segment and parameter, dropping repeats."""
+    order = numpy.lexsort((t, segment))
+    segment, t, z = segment[order], t[order], z[order]
+    keep = numpy.ones(len(segment), dtype=bool)
+    keep[1:] = (segment[1:] != segment[:-1]) | (numpy.diff(t) > tolerance)
+    return segment[keep], t[keep], z[keep]
+
+def first_crossings(count, segment, t, z, heights, rises):
+    """Find where sloped lines over sectioned segments first meet the surface.
+
+    Takes sorted sections of count segments and the height and rise of
+    the line over each, see TriangleIndex.line_crossings.
+    """
+    heights = numpy.broadcast_to(numpy.asarray(heights, dtype=numpy.float64), (count,))
+    rises = numpy.broadcast_to(numpy.asarray(rises, dtype=numpy.float64), (count,))
+
+    # Surface height above the line, which changes sign at a crossing.
+    above = z - heights[segment] - rises[segment] * t
+    first = numpy.searchsorted(segment, segment)
+    crossed = (above == 0) | (numpy.sign(above) != numpy.sign(above[first]))
+    found, index = numpy.unique(segment[crossed], return_index=True)
+    index = numpy.flatnonzero(crossed)[index]
+
+    # Interpolate between the samples around the sign change.
+    previous = numpy.maximum(index - 1, 0)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        weight = numpy.where(above[index] == 0, 1.0,
+            above[previous] / (above[previous] - above[index]))
+    at = t[previous] + weight * (t[index] - t[previous])
+
+    result = numpy.full(count, numpy.nan)
+    result[found] = at
+    return result, heights + rises * result
@@ -4,6 +4,9 @@
 
 import FreeCAD
 import Part
+import numpy
+
+from .earthwork_functions import section_areas, area_polygons, station_curvatures
 
 
 class VolumeFunctions:
@@ -13,79 +16,57 @@ class VolumeFunctions:
     def __init__(self):
         pass
 
-    def area_between(self, tops, bottoms, i):
+    def get_profiles(self, sections, stations):
         """
-        Calculate the areas above lower and below upper
+        Collect profiles of section objects per surface and station
         """
-        bb_ymins = []
-        bb_ymaxs = []
-        bb_xmins = []
-        bb_xmaxs = []
-        for sec in tops + bottoms:
-            sec_wire = sec.Shape.Wires[i]
-            bb_ymins.append(sec_wire.BoundBox.YMin)
-            bb_ymaxs.append(sec_wire.BoundBox.YMax)
-            bb_xmins.append(sec_wire.BoundBox.XMin)
-            bb_xmaxs.append(sec_wire.BoundBox.XMax)
-
-        # Find the coords for the 'limits' box:
-        area_minY = min(bb_ymins) - 1.0
-        area_maxY = max(bb_ymaxs) + 1.0
-        area_minX = min(bb_xmins) - 1.0
-        area_maxX = max(bb_xmaxs) + 1.0
-
-        ## Determine 4 edges for the 'limits' box:
-        limit = [Part.makeLine((area_minX, area_minY, 0.0), (area_maxX, area_minY, 0.0)),
-                Part.makeLine((area_maxX, area_minY, 0.0), (area_maxX, area_maxY, 0.0)),
-                Part.makeLine((area_maxX, area_maxY, 0.0), (area_minX, area_maxY, 0.0)),
-                Part.makeLine((area_minX, area_maxY, 0.0), (area_minX, area_minY, 0.0))]
-
-        dellim = [Part.makeLine((area_minX, area_minY, 0.0), (area_minX+1, area_minY, 0.0)),
-                Part.makeLine((area_minX+1, area_minY, 0.0), (area_minX+1, area_minY+1, 0.0)),
-                Part.makeLine((area_minX+1, area_minY+1, 0.0), (area_minX, area_minY+1, 0.0)),
-                Part.makeLine((area_minX, area_minY+1, 0.0), (area_minX, area_minY, 0.0))]
-
-        face_area = Part.Face(Part.Wire(limit))
-        del_area = Part.Face(Part.Wire(dellim))
-
-        for top in tops:
-            top_wire = top.Shape.Wires[i]
-            fp_upper = top_wire.Vertexes[0].Point
-            lp_upper = top_wire.Vertexes[-1].Point
-
-            if fp_upper.x == lp_upper.x:
-                return face_area.common(del_area)
-
-            ## Add 3 edges to B to get a closed boundary:
-            edges_top = top_wire.Edges + [Part.makeLine(fp_upper, (fp_upper[0], area_minY, 0.0)),
-                                        Part.makeLine((fp_upper[0], area_minY, 0.0), (lp_upper[0], area_minY, 0.0)),
-                                        Part.makeLine((lp_upper[0], area_minY, 0.0), lp_upper)]
-
-            face_upper = Part.Face(Part.Wire(edges_top))
-            face_area  = face_area.common(face_upper)
-
-        for bottom in bottoms:
-            bottom_wire = bottom.Shape.Wires[i]
-            fp_lower = bottom_wire.Vertexes[0].Point
-            lp_lower = bottom_wire.Vertexes[-1].Point
-
-            if fp_lower.x == lp_lower.x:
-                return face_area.common(del_area)
-
-            ## Add 3 edges to A to get a closed boundary:
-            edges_bottom = bottom_wire.Edges + [Part.makeLine(fp_lower, (fp_lower[0], area_maxY, 0.0)),
-                                        Part.makeLine((fp_lower[0], area_maxY, 0.0), (lp_lower[0], area_maxY, 0.0)),
-                                        Part.makeLine((lp_lower[0], area_maxY, 0.0), lp_lower)]
-
-            face_lower = Part.Face(Part.Wire(edges_bottom))
-            face_area  = face_area.common(face_lower)
-
-        return face_area
+        surfaces = []
+        for section in sections:
+            labels = {label for data in section.Model.values() for label in data['sections']}
+            for label in sorted(labels):
+                surfaces.append([section.Model.get(sta, {}).get('sections', {}).get(label, [])
+                    for sta in stations])
+        return surfaces
+
+    def get_areas(self, tops, bottoms):
+        """
+        Calculate the areas below tops and above bottoms for region stations
+        """
+        stations = [sta for sta in tops[0].Model]
+        areas = section_areas(
+            self.get_profiles(tops, stations),
+            self.get_profiles(bottoms, stations), len(stations))
+        areas["Stations"] = numpy.array(stations, dtype=float)
+        return areas
+
+    def get_curvatures(self, obj, stations):
+        """
+        Get signed alignment curvatures at stations of the volume region
+        """
+        volumes = obj.getParentGroup()
+        region = volumes.getParentGroup() if volumes else None
+        regions = region.getParentGroup() if region else None
+        alignment = regions.getParentGroup() if regions else None
+        alignment_model = getattr(alignment, "Model", None)
 
-    def get_areas(self, gl, tops, bottoms):
-        shapes = []
-        for i in range(len(gl.Shape.Wires)):
-            result = self.area_between(tops, bottoms, i)
-            shapes.append(result)
+        if not hasattr(alignment_model, "get_orthogonals_at_stations"):
+            return None
+        return station_curvatures(alignment_model, stations)
 
-        return Part.makeCompound(shapes)
+    def get_shape(self, section, areas):
+        """
+        Build display faces of fill areas on the frames of a section
+        """
+        stations = areas["Stations"].tolist()
+        faces = []
+        for i, polygons in enumerate(area_polygons(areas, len(stations))):
+            origin = section.Proxy.frame_origin(section, i, len(stations))
+            horizon = section.Model.get(stations[i], {}).get("horizon", 0)
+            for polygon in polygons:
+                points = [origin.add(FreeCAD.Vector(x, y - horizon, 0).multiply(1000))
+                    for x, y in polygon.tolist()]
+                faces.append(Part.Face(Part.makePolygon(points + points[:1])))
+
+        shape = Part.makeCompound(faces)
+        shape.Placement = section.Placement
+        return shape
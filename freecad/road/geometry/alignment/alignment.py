@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
 import math
+import numpy
 from typing import Dict, List, Tuple, Optional, Union
 from ...functions.coordinate_system import CoordinateSystem
 from ..profile.profiles import Profiles
@@ -558,6 +559,59 @@ class Alignment:
         
         raise ValueError(f"No element found at station {station}")
 
+    def get_orthogonals_at_stations(
+        self,
+        stations: List[float],
+        side: str = 'left'
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Get points and orthogonal vectors at several displayed stations.
+        
+        Elements are looked up for all stations at once and each element
+        evaluates all of its stations in one array call.
+        
+        Args:
+            stations: Displayed station values to query
+            side: Direction of orthogonals - 'left' or 'right'
+            
+        Returns:
+            Tuple containing:
+            - Point coordinates as (n, 2) array
+            - Unit orthogonal vectors as (n, 2) array
+            Rows of stations outside the alignment are NaN.
+        """
+        
+        if side not in ['left', 'right']:
+            raise ValueError("side must be 'left' or 'right'")
+        
+        points = numpy.full((len(stations), 2), numpy.nan)
+        vectors = numpy.full((len(stations), 2), numpy.nan)
+        if not self.elements:
+            return points, vectors
+        
+        # Internal start and end stations of elements
+        starts = numpy.array([self.station_to_internal(element.sta_start)
+            for element in self.elements])
+        ends = starts + [element.get_length() for element in self.elements]
+        
+        internal = numpy.array([self.station_to_internal(sta) for sta in stations])
+        found = numpy.searchsorted(ends, internal, side='left')
+        valid = found < len(self.elements)
+        valid[valid] &= starts[found[valid]] <= internal[valid]
+        
+        # Evaluate each element once for all of its stations
+        for index in numpy.unique(found[valid]).tolist():
+            rows = numpy.flatnonzero(valid & (found == index))
+            global_points, global_vectors = self.elements[index].get_orthogonals(
+                internal[rows] - starts[index], side)
+            
+            points[rows] = numpy.column_stack(
+                self.coordinate_system.transform_to_system(global_points.T))
+            vectors[rows] = numpy.column_stack(
+                self.coordinate_system.transform_vector_to_system(global_vectors.T))
+        
+        return points, vectors
+
     def get_station_offset(self, point: Tuple[float, float], 
                           input_system: str = 'current') -> Optional[Tuple[float, float]]:
         """
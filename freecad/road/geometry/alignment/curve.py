@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
 import math
+import numpy
 from typing import Dict, Tuple, Optional, List
 from .geometry import Geometry
 
@@ -320,6 +321,52 @@ class Curve(Geometry):
         
         return point, orthogonal
 
+    def get_orthogonals(self, s: numpy.ndarray, side: str = 'left') -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Get points and orthogonal vectors at several distances along the arc.
+        
+        Args:
+            s: Distances along the arc from start point
+            side: Direction of orthogonal vectors - 'left' or 'right'
+            
+        Returns:
+            Tuple containing:
+            - Point coordinates as (n, 2) array
+            - Unit orthogonal vectors as (n, 2) array
+        """
+
+        if side not in ['left', 'right']:
+            raise ValueError("side must be 'left' or 'right'")
+        
+        s = numpy.clip(numpy.asarray(s, dtype=float), 0, self.length)
+        
+        # Angles from center, same as get_orthogonal
+        start_angle = math.atan2(
+            self.start_point[1] - self.center_point[1],
+            self.start_point[0] - self.center_point[0]
+        )
+        
+        if self.rotation == 'ccw':
+            current_angle = start_angle - s / self.radius
+            tangent_direction = current_angle - math.pi / 2
+        else:
+            current_angle = start_angle + s / self.radius
+            tangent_direction = current_angle + math.pi / 2
+        
+        points = numpy.column_stack([
+            self.center_point[0] + self.radius * numpy.cos(current_angle),
+            self.center_point[1] + self.radius * numpy.sin(current_angle)])
+        
+        if side == 'left':
+            orthogonal_direction = tangent_direction + math.pi / 2
+        else:
+            orthogonal_direction = tangent_direction - math.pi / 2
+        
+        orthogonals = numpy.column_stack([
+            numpy.cos(orthogonal_direction), numpy.sin(orthogonal_direction)])
+        
+        return points, orthogonals
+
     def project_point(self, point: Tuple[float, float]) -> Optional[float]:
         """
         Project point onto curve and return distance along curve from start.
@@ -1,5 +1,6 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
+import numpy
 from abc import ABC, abstractmethod
 from typing import Dict, Tuple, List, Optional, Union
 
@@ -71,6 +72,11 @@ class Geometry(ABC):
         """Get both the point and orthogonal vector at distance s along the geometry."""
         pass
 
+    @abstractmethod
+    def get_orthogonals(self, s: numpy.ndarray, side: str = 'left') -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Get points and orthogonal vectors at several distances along the geometry."""
+        pass
+
     @abstractmethod
     def project_point(self, point: Tuple[float, float]) -> Optional[float]:
         """Project point onto line and return distance along geometry from start."""
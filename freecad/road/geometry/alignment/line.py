@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
 import math
+import numpy
 from typing import Dict, Tuple, Optional
 from .geometry import Geometry
 
@@ -118,6 +119,32 @@ class Line(Geometry):
         
         return point, orthogonal
 
+    def get_orthogonals(self, s: numpy.ndarray, side: str = 'left') -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Get points and orthogonal vectors at several distances along the line.
+        
+        Args:
+            s: Distances along the line from start point
+            side: Direction of orthogonal vectors - 'left' or 'right'
+            
+        Returns:
+            Tuple containing:
+            - Point coordinates as (n, 2) array
+            - Unit orthogonal vectors as (n, 2) array
+        """
+
+        if side not in ['left', 'right']:
+            raise ValueError("side must be 'left' or 'right'")
+        
+        s = numpy.clip(numpy.asarray(s, dtype=float), 0, self.length)
+        points = numpy.column_stack([
+            self.start_point[0] + s * math.cos(self.direction),
+            self.start_point[1] + s * math.sin(self.direction)])
+        
+        _, orthogonal = self.get_orthogonal(0, side)
+        
+        return points, numpy.tile(orthogonal, (len(s), 1))
+
     def project_point(self, point: Tuple[float, float]) -> Optional[float]:
         """
         Project point onto line and return distance along line from start.
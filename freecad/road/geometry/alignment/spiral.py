@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
 import math
+import numpy
 from scipy.special import fresnel
 from typing import Dict, Tuple, Optional, List
 from .geometry import Geometry
@@ -352,6 +353,77 @@ class Spiral(Geometry):
 
         return point, orthogonal
 
+    def get_orthogonals(self, s: numpy.ndarray, side: str = 'left') -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Get points and orthogonal vectors at several distances along the spiral.
+        Evaluates the clothoid for all distances at once.
+        
+        Args:
+            s: Distances along the spiral from alignment start point
+            side: Direction of orthogonal vectors - 'left' or 'right'
+            
+        Returns:
+            Tuple containing:
+            - Point coordinates as (n, 2) array in global coordinate system
+            - Unit orthogonal vectors as (n, 2) array
+            Rows where the tangent direction cannot be determined are NaN.
+        """
+        if side not in ['left', 'right']:
+            raise ValueError("side must be 'left' or 'right'")
+        
+        s = numpy.clip(numpy.asarray(s, dtype=float), 0, self.length)
+        
+        is_reversed = self._is_reversed()
+        s_local = self.length - s if is_reversed else s
+        
+        start = self.end_point if is_reversed else self.start_point
+        dir_angle = self.dir_end + math.pi if is_reversed else self.dir_start
+        sign = -1 if is_reversed else 1
+        
+        cos_a = math.cos(dir_angle)
+        sin_a = math.sin(dir_angle)
+        
+        if self.radius_start != float('inf') and self.radius_end != float('inf'):
+            local_point = self._compound_clothoid_point
+        else:
+            local_point = self._clothoid_point
+        
+        xl, yl = local_point(s_local)
+        points = numpy.column_stack([
+            start[0] + xl * cos_a - yl * sin_a,
+            start[1] + xl * sin_a + yl * cos_a])
+        
+        # Numerical tangent, one sided at the spiral ends
+        delta = 1e-6
+        before = numpy.where(s_local - delta >= 0, s_local - delta, s_local)
+        after = numpy.where(s_local + delta <= self.length, s_local + delta, s_local)
+        
+        xl_before, yl_before = local_point(before)
+        xl_after, yl_after = local_point(after)
+        
+        dx_local = xl_after - xl_before
+        dy_local = yl_after - yl_before
+        
+        tangent_length = numpy.hypot(dx_local, dy_local)
+        
+        # Rows without a tangent direction are NaN, the rest are kept
+        degenerate = tangent_length < 1e-10
+        tangent_length = numpy.where(degenerate, numpy.nan, tangent_length)
+        points[degenerate] = numpy.nan
+        
+        tangent_x_local = dx_local / tangent_length
+        tangent_y_local = dy_local / tangent_length
+        
+        tangent_x_global = tangent_x_local * cos_a - tangent_y_local * sin_a
+        tangent_y_global = tangent_x_local * sin_a + tangent_y_local * cos_a
+        
+        if side == 'left':
+            orthogonals = numpy.column_stack([-tangent_y_global * sign, tangent_x_global * sign])
+        else:
+            orthogonals = numpy.column_stack([tangent_y_global * sign, -tangent_x_global * sign])
+
+        return points, orthogonals
+
     def project_point(self, point: Tuple[float, float]) -> Optional[float]:
         """
         Project a point onto the spiral and return distance along spiral.
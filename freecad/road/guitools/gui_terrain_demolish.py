@@ -6,6 +6,7 @@ import FreeCAD, FreeCADGui
 import Part, Mesh
 import os
 from .. import ICONPATH
+from ..functions.shape_functions import contour_wires, boundary_wires
 
 
 class TerrainExtractPoints:
@@ -69,7 +70,9 @@ class TerrainExtractBoundary:
 
     def Activated(self):
         terrain = FreeCADGui.Selection.getSelection()[0]
-        Part.show(terrain.Boundary)
+        shape = boundary_wires(terrain.Boundary)
+        shape.Placement = terrain.Placement
+        Part.show(shape)
 
 
 class TerrainExtractContours:
@@ -84,7 +87,9 @@ class TerrainExtractContours:
 
     def Activated(self):
         terrain = FreeCADGui.Selection.getSelection()[0]
-        Part.show(terrain.Contour)
+        shape = contour_wires(terrain.Contour)
+        shape.Placement = terrain.Placement
+        Part.show(shape)
 
 
 class TerrainDemolishGroup:
@@ -3,7 +3,6 @@
 """Provides GUI tools to edit Terrain objects."""
 
 import FreeCAD, FreeCADGui
-from pivy import coin
 import os
 from .. import ICONPATH
 from ..utils.trackers import ViewTracker
@@ -29,11 +28,8 @@ class TerrainAddPoint:
         """Add a point to the selected triangle"""
         picked_point = callback.getPickedPoint()
         if picked_point:
-            detail = picked_point.getDetail()
-            if detail.isOfType(coin.SoFaceDetail.getClassTypeId()):
-                face_detail = coin.cast(detail, str(detail.getTypeId().getName()))
-                index = face_detail.getFaceIndex()
-
+            index = self.terrain.ViewObject.Proxy.picked_face(self.terrain, picked_point)
+            if index is not None:
                 point = picked_point.getPoint().getValue()
                 vector = FreeCAD.Vector(*point)
 
@@ -64,11 +60,8 @@ class TerrainDeleteTriangle:
         """Delete selected triangle"""
         picked_point = callback.getPickedPoint()
         if picked_point:
-            detail = picked_point.getDetail()
-            if detail.isOfType(coin.SoFaceDetail.getClassTypeId()):
-                face_detail = coin.cast(detail, str(detail.getTypeId().getName()))
-                index = face_detail.getFaceIndex()
-
+            index = self.terrain.ViewObject.Proxy.picked_face(self.terrain, picked_point)
+            if index is not None:
                 operations = self.terrain.Operations
                 operations.append({"type":"Delete Triangle", "index":index})
                 self.terrain.Operations = operations
@@ -94,11 +87,8 @@ class TerrainSwapEdge:
         """Swap edge between two triangles"""
         picked_point = callback.getPickedPoint()
         if picked_point:
-            detail = picked_point.getDetail()
-            if detail.isOfType(coin.SoFaceDetail.getClassTypeId()):
-                face_detail = coin.cast(detail, str(detail.getTypeId().getName()))
-                index = face_detail.getFaceIndex()
-
+            index = self.terrain.ViewObject.Proxy.picked_face(self.terrain, picked_point)
+            if index is not None:
                 point = picked_point.getPoint().getValue()
                 vector = FreeCAD.Vector(*point)
 
@@ -4,8 +4,8 @@
 import FreeCAD
 import Part
 
-import math
 from .geo_object import GeoObject
+from ..functions.template_program import displacement
 
 
 class ComponentPoint(GeoObject):
@@ -71,41 +71,18 @@ class ComponentPoint(GeoObject):
 
     def execute(self, obj):
         """Do something when doing a recomputation."""
-        if obj.Type == "Delta X and Delta Y":
-            displacement = FreeCAD.Vector(obj.DeltaX*1000, obj.DeltaY*1000)
-    
-        elif obj.Type == "Delta X and Angle":
-            angle = obj.Angle % 360
-            dir = -1 if 90 < angle < 270 else 1
-            if angle in [90, 270]: dir = 0
-            dy = obj.DeltaX * math.tan(math.radians(angle))
-            displacement = FreeCAD.Vector(dir*obj.DeltaX * 1000, dir*dy * 1000)
-
-        elif obj.Type == "Delta Y and Angle":
-            angle = obj.Angle % 360
-            dir = 1 if 0 < angle < 180 else -1
-            if angle in [0, 180]: dir = 0
-            dx = obj.DeltaY / math.tan(math.radians(angle)) if angle else 0
-            displacement = FreeCAD.Vector(dir * dx * 1000, dir * obj.DeltaY * 1000)
-
-        elif obj.Type == "Delta X and Slope":
-            dy = obj.DeltaX * (obj.Slope / 100)
-            displacement = FreeCAD.Vector(obj.DeltaX*1000, dy*1000)
-
-        elif obj.Type == "Delta Y and Slope":
-            dx = obj.DeltaY / (obj.Slope / 100)
-            displacement = FreeCAD.Vector(dx*1000, obj.DeltaY*1000)
-
-        elif obj.Type == "Delta X on Terrain":pass
-        elif obj.Type == "Slope to Terrain":pass
-
-        elif obj.Type == "Distance and Angle":
-            rad = math.radians(obj.Angle)
-            dx = obj.Distance * math.cos(rad)
-            dy = obj.Distance * math.sin(rad)
-            displacement = FreeCAD.Vector(dx*1000, dy*1000)
-
-        if obj.Reverse: displacement = displacement.negative()
+        # Terrain targets are resolved per station by the road,
+        # the template shows them at a nominal position.
+        if obj.Type == "Delta X on Terrain":
+            dx, dy = obj.DeltaX, 0
+        elif obj.Type == "Slope to Terrain":
+            dx, dy = displacement("Delta X and Slope", 1, slope=-abs(obj.Slope))
+        else:
+            dx, dy = displacement(obj.Type, obj.DeltaX, obj.DeltaY,
+                float(obj.Angle), obj.Slope, obj.Distance)
+        displacement_vector = FreeCAD.Vector(float(dx) * 1000, float(dy) * 1000)
+
+        if obj.Reverse: displacement_vector = displacement_vector.negative()
 
         component = obj.getParentGroup()
         structure = component.getParentGroup() 
@@ -113,8 +90,8 @@ class ComponentPoint(GeoObject):
         placement = base.Placement.copy()
         
         side = -1 if component.Side == "Left" else 1
-        displacement.x *= side
-        placement.move(displacement)
+        displacement_vector.x *= side
+        placement.move(displacement_vector)
         obj.Placement = placement
 
     def onChanged(self, obj, prop):
@@ -3,7 +3,7 @@
 """Provides the object code for Region objects."""
 import FreeCAD, Part
 from .geo_object import GeoObject
-from ..utils.support import  zero_referance
+import numpy
 
 
 class Region(GeoObject):
@@ -59,6 +59,8 @@ class Region(GeoObject):
             "App::PropertyFloat", "LeftOffset", "Offset",
             "Length of left offset").LeftOffset = 20
 
+        self.add_guidelines(obj)
+
         obj.setEditorMode('StartStation', 1)
         obj.setEditorMode('EndStation', 1)
 
@@ -67,6 +69,42 @@ class Region(GeoObject):
 
         obj.Proxy = self
 
+    def add_guidelines(self, obj):
+        """Add guideline array property."""
+        obj.addProperty(
+            "App::PropertyPythonObject", "Guidelines", "Base",
+            "Left, center and right points of guidelines per station", 2).Guidelines = numpy.empty((0, 3, 2))
+
+    def onDocumentRestored(self, obj):
+        """Restore guidelines, which are not saved with the document."""
+        if "Guidelines" not in obj.PropertiesList:
+            self.add_guidelines(obj)
+        self.update_guidelines(obj)
+
+    def update_guidelines(self, obj):
+        """Compute guideline points of all stations in one batch.
+
+        Guidelines are stored as an (n, 3, 2) array of left, center and
+        right points in global metres, NaN for stations off the alignment.
+        """
+        regions = obj.getParentGroup()
+        alignment = regions.getParentGroup() if regions else None
+        alignment_model = getattr(alignment, "Model", None)
+        stations = numpy.array(obj.Stations, dtype=float)
+        if not hasattr(alignment_model, "get_orthogonals_at_stations") or not len(stations):
+            obj.Guidelines = numpy.empty((0, 3, 2))
+            return
+
+        # Clamp stations to alignment range with a small tolerance
+        clamped = numpy.clip(stations, alignment_model.get_sta_start(),
+            alignment_model.get_sta_end() - 1e-6)
+        points, vectors = alignment_model.get_orthogonals_at_stations(clamped, "left")
+
+        obj.Guidelines = numpy.stack([
+            points + vectors * obj.LeftOffset,
+            points,
+            points - vectors * obj.RightOffset], axis=1)
+
     def execute(self, obj):
         """
         Do something when doing a recomputation.
@@ -110,41 +148,19 @@ class Region(GeoObject):
             )
             return
         
-        lines = []
-        # Computing coordinates and orthogonals for guidelines
-        for sta in obj.Stations:
-            try:
-                # Small tolerance for floating point errors
-                tolerance = 1e-6
-                
-                # Clamp station to alignment range
-                align_start = alignment_model.get_sta_start()
-                align_end = alignment_model.get_sta_end()
-                
-                clamped_sta = max(align_start, min(sta, align_end - tolerance))
-                
-                # Get point and orthogonal vector using new model API
-                tuple_coord, tuple_vec = alignment_model.get_orthogonal_at_station(
-                    clamped_sta, "left"
-                )
-                
-                coord = zero_referance(alignment_model.get_start_point(), [tuple_coord])
-                left_vec = FreeCAD.Vector(*tuple_vec)
-                right_vec = FreeCAD.Vector(*tuple_vec).negative()
-                
-                # Calculate offset points
-                left_side = coord[0].add(left_vec.multiply(obj.LeftOffset * 1000))
-                right_side = coord[0].add(right_vec.multiply(obj.RightOffset * 1000))
-                
-                lines.append(Part.makePolygon([left_side, coord, right_side]))
-                
-            except (ValueError, AttributeError) as e:
-                # Skip stations that cause errors (outside alignment range, etc.)
-                FreeCAD.Console.PrintWarning(
-                    f"Warning: Could not generate guideline at station {sta}: {str(e)}\n"
-                )
-                continue
-        
+        self.update_guidelines(obj)
+        guidelines = obj.Guidelines
+        valid = numpy.isfinite(guidelines).all(axis=(1, 2))
+        for sta in numpy.array(obj.Stations)[~valid].tolist():
+            FreeCAD.Console.PrintWarning(
+                f"Warning: Could not generate guideline at station {sta}\n")
+
+        # Polygons are only built for the display compound
+        start = numpy.array(alignment_model.get_start_point())
+        local = (guidelines[valid] - start) * 1000
+        lines = [Part.makePolygon([FreeCAD.Vector(x, y, 0) for x, y in line])
+            for line in local.tolist()]
+
         if lines:
             obj.Shape = Part.makeCompound(lines)
         else:
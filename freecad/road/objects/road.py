@@ -2,10 +2,15 @@
 
 """Provides the object code for Road objects."""
 
-import FreeCAD
+import FreeCAD, Mesh
 import Part
-import math
+import numpy
 from .geo_object import GeoObject
+from ..functions.shape_functions import build_mesh, loft_edges
+from ..functions.corridor_functions import (
+    station_frames, corridor_points, ruled_mesh)
+from ..functions.template_program import (
+    compile_template, evaluate_template, station_variables, terrain_ground)
 
 
 class Road(GeoObject):
@@ -28,63 +33,78 @@ class Road(GeoObject):
             "App::PropertyLink", "Structure", "Model",
             "Road structure").Structure = None
 
+        self.add_mesh(obj)
+        self.add_variables(obj)
+
         obj.Proxy = self
-            
+
+    def add_mesh(self, obj):
+        """Add corridor surface properties."""
+        obj.addProperty(
+            "Mesh::PropertyMeshKernel", "Mesh", "Base",
+            "Corridor surface mesh")
+
+        obj.addProperty(
+            "App::PropertyBool", "Loft", "Export",
+            "Build B-rep lofts of template edges into Shape for export").Loft = False
+
+        obj.setEditorMode("Mesh", 2)
+
+    def add_variables(self, obj):
+        """Add station dependent template parameters."""
+        obj.addProperty(
+            "App::PropertyPythonObject", "Variables", "Model",
+            "Template parameters along stations as {'Point.Parameter': [(station, value)]}").Variables = {}
+
+    def onDocumentRestored(self, obj):
+        """Add properties missing in older documents."""
+        if "Mesh" not in obj.PropertiesList:
+            self.add_mesh(obj)
+        if "Variables" not in obj.PropertiesList:
+            self.add_variables(obj)
+
     def execute(self, obj):
         """Do something when doing a recomputation."""
-        com_list = []
-        for component in obj.Structure.Group:
-            for part in component.Group:
-                if part.Proxy.Type == "Road::ComponentPoint": continue
-                part_copy = part.Shape.copy()
-                part_copy.Placement.move(obj.Structure.Placement.Base.negative())
-                com_list.append(part_copy)
-
-        sec_list = []
-        base_shp = Part.makeCompound(com_list)
-        stations = obj.Alignment.Model.generate_stations()
-
-        for sta in stations:
-            try:
-                # Get the 3D position and the orthogonal (normal) vector from alignment
-                point = obj.Alignment.Model.get_3d_point_at_station(obj.Profile, sta)
-                p, normal_vec = obj.Alignment.Model.get_orthogonal_at_station(sta)
-                
-                # normal_vec is (x, y), we need it in 3D
-                norm = FreeCAD.Vector(normal_vec[0], normal_vec[1], 0)
-                # Tangent vector is perpendicular to the normal in 2D
-                tangent = FreeCAD.Vector(-normal_vec[1], normal_vec[0], 0)
-                # Vertical axis
-                up = FreeCAD.Vector(0, 0, 1)
-
-                # Create a rotation matrix where:
-                # X-axis of cross-section follows the Normal (sideways)
-                # Y-axis of cross-section follows the Up vector (elevation)
-                # Z-axis of cross-section follows the Tangent (forward)
-                matrix = FreeCAD.Matrix(
-                    norm.x, tangent.x, up.x, 0,
-                    norm.y, tangent.y, up.y, 0,
-                    norm.z, tangent.z, up.z, 0,
-                    0, 0, 0, 1
-                )
-
-                new_placement = FreeCAD.Placement(matrix)
-                # FreeCAD uses mm, ensure scale is consistent with your data
-                new_placement.Base = FreeCAD.Vector(*point).multiply(1000)
-
-                section = base_shp.copy()
-                section.Placement = new_placement
-                sec_list.append(section)
-            except: 
-                continue
-        
-        shp_list = []
-        for i in range(len(base_shp.Edges)):
-            l = [sec.Edges[i] for sec in sec_list]
-            shp = Part.makeLoft(l)
-            shp_list.append(shp)
-        
-        obj.Shape = Part.makeCompound(shp_list)
+        alignment_model = obj.Alignment.Model
+        program = compile_template(obj.Structure)
+        stations = numpy.array(alignment_model.generate_stations(), dtype=float)
+
+        valid, origins, normals, template = self.templates_at(obj, program, stations)
+        for sta in stations[~valid].tolist():
+            FreeCAD.Console.PrintWarning(
+                f"Warning: Could not place road template at station {sta}\n")
+
+        # Template points of all stations relative to the alignment start
+        start = numpy.array(alignment_model.get_start_point())
+        origins = (origins - numpy.r_[start, 0]) * 1000
+        points = corridor_points(origins, normals, template * 1000)
+
+        edges = program["edges"]
+        vertices, faces = ruled_mesh(points, edges)
+        obj.Mesh = build_mesh(vertices, faces, numpy.zeros(3))
+
+        if obj.Loft:
+            shape = Part.makeCompound(loft_edges(points, edges))
+            shape.Placement = obj.Placement
+            obj.Shape = shape
+        else:
+            obj.Shape = Part.Shape()
+
+    def templates_at(self, obj, program, stations):
+        """Evaluate the compiled road template at stations in metres.
+
+        Returns the mask of stations on the alignment and profile, and
+        centre points, right normals and templates of those stations.
+        """
+        origins, normals = station_frames(obj.Alignment.Model, obj.Profile, stations)
+        valid = numpy.isfinite(origins).all(axis=1) & numpy.isfinite(normals).all(axis=1)
+        origins, normals = origins[valid], normals[valid]
+
+        # Template of all stations in one evaluation
+        variables = station_variables(obj.Variables, stations[valid])
+        template = evaluate_template(program, len(origins), variables,
+            terrain_ground(origins, normals))
+        return valid, origins, normals, template
 
     def onChanged(self, obj, prop):
         """Update Object when a property changed."""
@@ -2,9 +2,13 @@
 
 """Provides the object code for Section objects."""
 
-import FreeCAD, Part, MeshPart
+import FreeCAD, Part
 from .geo_object import GeoObject
 import math
+import numpy
+from ..functions.corridor_functions import template_envelope
+from ..functions.template_program import compile_template
+from ..functions.earthwork_functions import section_areas
 
 
 class Section(GeoObject):
@@ -40,94 +44,184 @@ class Section(GeoObject):
             "App::PropertyFloat", "Horizontal", "Distances",
             "Horizontal distance between section frame placements").Horizontal = 50
 
+        self.add_workers(obj)
+        self.add_road(obj)
+
         obj.Proxy = self
 
+    def add_workers(self, obj):
+        """Add parallel computation properties."""
+        obj.addProperty(
+            "App::PropertyInteger", "Workers", "Computation",
+            "Number of workers for sections, 1 computes them serially, 0 uses all cores").Workers = 1
+
+    def add_road(self, obj):
+        """Add design road properties."""
+        obj.addProperty(
+            "App::PropertyLink", "Road", "Base",
+            "Design road compared to the first terrain").Road = None
+
+    def onDocumentRestored(self, obj):
+        """Add properties missing in older documents."""
+        if "Workers" not in obj.PropertiesList:
+            self.add_workers(obj)
+        if "Road" not in obj.PropertiesList:
+            self.add_road(obj)
+
     def execute(self, obj):
         """Do something when doing a recomputation."""
 
         sections = obj.getParentGroup()
         region = sections.getParentGroup()
-        regions = region.getParentGroup()
-        alignment = regions.getParentGroup()
-
-        # Clear existing model
-        obj.Model = {}
-        
-        for idx, sta in enumerate(region.Stations):
-            obj.Model[sta] = {'sections': {}}
-            horizon = math.inf
-            for terrain in obj.Terrains:
-                flat_points = []
-                for edge in region.Shape.Wires[idx].Edges:
-                    params = MeshPart.findSectionParameters(
-                        edge, terrain.Mesh, FreeCAD.Vector(0, 0, 1))
-                    params.insert(0, edge.FirstParameter+1)
-                    params.append(edge.LastParameter-1)
-
-                    values = [edge.valueAt(glp) for glp in params]
-                    flat_points.extend(values)
-
-                projected_points = MeshPart.projectPointsOnMesh(
-                    flat_points, terrain.Mesh, FreeCAD.Vector(0, 0, 1))
-                
-                offset_elevation = []
-                for point in projected_points:
-                    point = point.sub(alignment.Placement.Base).multiply(0.001)
-                    station, offset = alignment.Model.get_station_offset([*point])
-                    if offset: offset_elevation.append([offset, point.z])
-                    if point.z < horizon: horizon = point.z
-
-                # Sort by offset
-                offset_elevation.sort(key=lambda x: x[0])
-                obj.Model[sta]['sections'][terrain.Label] = offset_elevation
-
-            # Set horizon for this station
-            obj.Model[sta]["horizon"] = math.floor(horizon / 5) * 5 if horizon != math.inf else 0
-
-        # Calculate grid dimensions
-        total_items = len(obj.Model)
-        grid_size = math.ceil(math.sqrt(total_items))
-
-        current_col = 0
-        current_row = 0
+        width = region.LeftOffset + region.RightOffset
+
+        # Guideline ends in global coordinates, left to right.
+        guidelines = region.Guidelines
+        if len(guidelines) != len(region.Stations):
+            region.Proxy.update_guidelines(region)
+            guidelines = region.Guidelines
+
+        valid = numpy.isfinite(guidelines).all(axis=(1, 2))
+        stations = numpy.array(region.Stations, dtype=float)[valid].tolist()
+        starts = guidelines[valid, 0]
+        ends = guidelines[valid, 2]
+
+        # Stations are only resampled when their guideline or a terrain changed.
+        cache = getattr(self, "cache", None) or {"terrains": {}, "stations": {}}
+        previous = cache["stations"]
+        keys = [guide.tobytes() for guide in numpy.round(numpy.c_[starts, ends], 6)]
+        moved = numpy.array([previous.get(sta, {}).get("key") != key
+            for sta, key in zip(stations, keys)], dtype=bool)
+
+        model = {sta: {'sections': {}} for sta in stations}
+        versions = {}
+        for terrain in obj.Terrains:
+            versions[terrain.Label] = terrain.Proxy.mesh_key()
+            if cache["terrains"].get(terrain.Label) != versions[terrain.Label]:
+                stale = numpy.ones(len(stations), dtype=bool)
+            else:
+                stale = moved
+
+            for i in numpy.flatnonzero(~stale).tolist():
+                model[stations[i]]['sections'][terrain.Label] = \
+                    previous[stations[i]]['sections'][terrain.Label]
+
+            todo = numpy.flatnonzero(stale)
+            if not len(todo): continue
+
+            segment, t, z = terrain.Proxy.sections_at(terrain, starts[todo], ends[todo], obj.Workers)
+            bounds = numpy.searchsorted(segment, numpy.arange(len(todo) + 1))
+            offset_elevation = numpy.c_[t * width - region.LeftOffset, z]
+            for j, i in enumerate(todo.tolist()):
+                model[stations[i]]['sections'][terrain.Label] = \
+                    offset_elevation[bounds[j]:bounds[j + 1]].tolist()
+
+        if obj.Road and obj.Road.Structure and obj.Terrains:
+            self.add_design(obj, model, stations)
+
+        # Set horizon of stations
+        for sta, data in model.items():
+            old = previous.get(sta)
+            if old and old["sections"] == data["sections"]:
+                data["horizon"] = old["horizon"]
+                continue
+
+            horizon = min((elevation for values in data["sections"].values()
+                for _, elevation in values), default=math.inf)
+            data["horizon"] = math.floor(horizon / 5) * 5 if horizon != math.inf else 0
+        obj.Model = model
 
         frames = []
         crosssections = []
-        for sta, data in obj.Model.items():
-            # Calculate grid position origin
-            origin = FreeCAD.Vector(
-                current_col * obj.Horizontal * 1000, 
-                current_row * obj.Vertical * 1000, 
-                0)
-            
-            p2 = origin.add(FreeCAD.Vector(-obj.Width * 1000 / 2, 0, 0))
-            p3 = origin.add(FreeCAD.Vector(-obj.Width * 1000 / 2, obj.Height * 1000, 0))
-            p4 = origin.add(FreeCAD.Vector(obj.Width * 1000 / 2, obj.Height * 1000, 0))
-            p5 = origin.add(FreeCAD.Vector(obj.Width * 1000 / 2, 0, 0))
-            frame = Part.makePolygon([origin, p2, p3, p4, p5, origin])
+        entries = {}
+        for i, (sta, key) in enumerate(zip(stations, keys)):
+            data = model[sta]
+            origin = self.frame_origin(obj, i, len(stations))
+
+            # Reuse unchanged station shapes, moving them to the new origin.
+            old = previous.get(sta)
+            if old and old["sections"] == data["sections"] \
+                    and old["size"] == (obj.Width, obj.Height):
+                delta = origin.sub(old["origin"])
+                frame, wires = old["frame"], old["wires"]
+                if delta.Length:
+                    frame = frame.translated(delta)
+                    wires = [wire.translated(delta) for wire in wires]
+            else:
+                frame, wires = self.station_shapes(obj, origin, data)
+
             frames.append(frame)
-            
-            horizon = data.get("horizon", 0)
-            for terrain, values in data['sections'].items():
-                point_list = []
-                for offset, elevation in values:
-                    if offset is None or elevation is None: continue
-                    pt = FreeCAD.Vector(offset, elevation - horizon, 0).multiply(1000)
-                    point_list.append(origin.add(pt))
-                
-                if len(point_list) > 1:
-                    section = Part.makePolygon(point_list)
-                    crosssections.append(section)
-            
-            # Update grid position
-            current_row += 1
-            if current_row >= grid_size:
-                current_row = 0
-                current_col += 1
-            
+            crosssections.extend(wires)
+            entries[sta] = dict(data, key=key, origin=origin,
+                size=(obj.Width, obj.Height), frame=frame, wires=wires)
+
+        self.cache = {"terrains": versions, "stations": entries}
+
         shp_frame = Part.Compound(frames)
         shp_section = Part.Compound(crosssections)
         obj.Shape = Part.Compound([shp_frame, shp_section])
         
         # Force Model property update notification
-        obj.Model = obj.Model
\ No newline at end of file
+        obj.Model = obj.Model
+
+    def add_design(self, obj, model, stations):
+        """Add design road profiles and cut and fill areas to stations.
+
+        The road template is evaluated for all stations at once and its top
+        compared with the first terrain, so no intermediate shapes are built.
+        """
+        road, terrain = obj.Road, obj.Terrains[0]
+        program = compile_template(road.Structure)
+        valid, origins, _, template = road.Proxy.templates_at(
+            road, program, numpy.array(stations, dtype=float))
+
+        # Template and section offsets both go right, sorted left to right.
+        envelope = template_envelope(template, program["edges"])
+        envelope = envelope + numpy.c_[numpy.zeros(len(origins)), origins[:, 2]][:, None]
+        designs = [[] for _ in stations]
+        for i, profile in zip(numpy.flatnonzero(valid).tolist(), envelope):
+            profile = profile[numpy.isfinite(profile).all(axis=1)]
+            keep = numpy.r_[True, (numpy.diff(profile, axis=0) != 0).any(axis=1)]
+            designs[i] = profile[keep].tolist()
+
+        grounds = [model[sta]['sections'].get(terrain.Label, []) for sta in stations]
+        areas = section_areas([designs], [grounds], len(stations))
+        for i, sta in enumerate(stations):
+            model[sta]['sections'][road.Label] = designs[i]
+            model[sta]['cut'] = float(areas["Cut"][i])
+            model[sta]['fill'] = float(areas["Fill"][i])
+
+    def frame_origin(self, obj, index, count):
+        """Return the origin of a station frame in the section grid."""
+        grid_size = math.ceil(math.sqrt(count))
+        column, row = divmod(index, grid_size)
+        return FreeCAD.Vector(column * obj.Horizontal * 1000, row * obj.Vertical * 1000, 0)
+
+    def station_shapes(self, obj, origin, data):
+        """Build the frame and section lines of a station at the given origin."""
+        p2 = origin.add(FreeCAD.Vector(-obj.Width * 1000 / 2, 0, 0))
+        p3 = origin.add(FreeCAD.Vector(-obj.Width * 1000 / 2, obj.Height * 1000, 0))
+        p4 = origin.add(FreeCAD.Vector(obj.Width * 1000 / 2, obj.Height * 1000, 0))
+        p5 = origin.add(FreeCAD.Vector(obj.Width * 1000 / 2, 0, 0))
+        frame = Part.makePolygon([origin, p2, p3, p4, p5, origin])
+
+        wires = []
+        horizon = data.get("horizon", 0)
+        for terrain, values in data['sections'].items():
+            point_list = []
+            for offset, elevation in values:
+                if offset is None or elevation is None: continue
+                pt = FreeCAD.Vector(offset, elevation - horizon, 0).multiply(1000)
+                point_list.append(origin.add(pt))
+
+            if len(point_list) > 1:
+                wires.append(Part.makePolygon(point_list))
+        return frame, wires
+
+    def dumps(self):
+        """Called during document saving."""
+        return {"Type": self.Type}
+
+    def loads(self, state):
+        """Called during document restore."""
+        self.Type = state["Type"]
@@ -3,6 +3,7 @@
 """Provides the object code for Table objects."""
 
 import FreeCAD
+import numpy
 
 
 class Table:
@@ -29,8 +30,25 @@ class Table:
             'App::PropertyLink', "VolumeAreas", "Base",
             "Volume Areas").VolumeAreas = None
 
+        self.add_quantities(obj)
+
         obj.Proxy = self
 
+    def add_quantities(self, obj):
+        '''
+        Add table column properties.
+        '''
+        obj.addProperty(
+            "App::PropertyPythonObject", "Quantities", "Base",
+            "Table columns as titles with values").Quantities = []
+
+    def onDocumentRestored(self, obj):
+        '''
+        Add properties missing in older documents.
+        '''
+        if "Quantities" not in obj.PropertiesList:
+            self.add_quantities(obj)
+
     def onChanged(self, obj, prop):
         '''
         Do something when a data property has changed.
@@ -41,4 +59,20 @@ class Table:
         '''
         Do something when doing a recomputation. 
         '''
-        return
\ No newline at end of file
+        volume = obj.getPropertyByName("VolumeAreas")
+        quantities = getattr(volume, "Earthwork", None)
+        if not quantities:
+            obj.Quantities = []
+            return
+
+        # Prismoidal volumes with curvature corrections
+        volumes = {kind: numpy.add(quantities[kind + "Prismoidal"], quantities[kind + "Curvature"])
+            for kind in ["Cut", "Fill"]}
+
+        obj.Quantities = [
+            ["KM", quantities["Stations"]],
+            ["Cut Area", volume.Areas["Cut"]],
+            ["Fill Area", volume.Areas["Fill"]],
+            ["Cut Volume", volumes["Cut"].tolist()],
+            ["Fill Volume", volumes["Fill"].tolist()],
+            ["Mass Haul", quantities["MassHaul"]]]
\ No newline at end of file
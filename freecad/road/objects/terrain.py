@@ -2,16 +2,33 @@
 
 """Provides the object code for Terrain objects."""
 
-import FreeCAD, Mesh, Part, MeshGui
+import FreeCAD, Mesh, MeshGui
 from.geo_object import GeoObject
 from ..functions.terrain_functions import (
     test_triangulation, 
+    thin_points,
+    added_points,
+    apply_operation,
     get_contours, 
     get_boundary)
-
+from ..functions.shape_functions import build_mesh, edit_mesh
+from ..functions.triangle_index import TriangleIndex
+from ..functions.terrain_tiles import TerrainTiles
+from ..functions.terrain_storage import (
+    content_hash,
+    write_arrays,
+    read_arrays,
+    read_cached,
+    save_cached,
+    cache_path)
+
+import os, shutil
 import numpy
 from scipy.spatial import Delaunay
 
+# Number of contour and boundary results kept in memory per terrain.
+CACHE_SIZE = 8
+
 
 class Terrain(GeoObject):
     """This class is about Terrain Object data features."""
@@ -26,18 +43,16 @@ class Terrain(GeoObject):
             "App::PropertyLinkList", "Clusters", "Base",
             "Clusters added to the Delaunay triangulation").Clusters = []
 
-        obj.addProperty(
-            "App::PropertyPythonObject", "Points", "Triangulation",
-            "Points of triangulation").Points = {}
-
-        obj.addProperty(
-            "App::PropertyPythonObject", "Faces", "Triangulation",
-            "Faces of triangulation").Faces = {"Visible":[], "Invisible":[]}
+        self.add_storage(obj)
 
         obj.addProperty(
             "App::PropertyPythonObject", "Operations", "Triangulation",
             "Terrain edit operations").Operations = []
 
+        obj.addProperty(
+            "App::PropertyInteger", "CompactInterval", "Triangulation",
+            "Number of edit operations merged into triangulation at once").CompactInterval = 50
+
         obj.addProperty(
             "App::PropertyFloat", "MaxLength", "Constraint",
             "Maximum length of triangle edge").MaxLength = 500
@@ -46,8 +61,10 @@ class Terrain(GeoObject):
             "App::PropertyAngle","MaxAngle","Constraint",
             "Maximum angle of triangle edge").MaxAngle = 180
 
-        obj.addProperty("Part::PropertyPartShape", "Boundary", "Triangulation",
-            "Boundary Shapes").Boundary = Part.Shape()
+        self.add_thinning(obj)
+
+        obj.addProperty("App::PropertyPythonObject", "Boundary", "Triangulation",
+            "Boundary line coordinates", 2).Boundary = ()
 
         # Analysis properties.
         obj.addProperty(
@@ -59,8 +76,8 @@ class Terrain(GeoObject):
             "Ranges").Ranges = 5
 
         # Contour properties.
-        obj.addProperty("Part::PropertyPartShape", "Contour", "Contour",
-            "Contour Shapes").Contour = Part.Shape()
+        obj.addProperty("App::PropertyPythonObject", "Contour", "Contour",
+            "Contour line coordinates", 2).Contour = {}
 
         obj.addProperty(
             "App::PropertyFloat", "MajorInterval", "Contour",
@@ -70,77 +87,438 @@ class Terrain(GeoObject):
             "App::PropertyFloat", "MinorInterval", "Contour",
             "Minor contour interval").MinorInterval = 1
 
+        self.add_cache(obj)
+        self.add_tiles(obj)
+
         obj.Proxy = self
 
     def execute(self, obj):
         if not obj.Clusters: return
-        points = {}
-        idx = 0
-        for geopoints in obj.Clusters:
-            for point in geopoints.Model.values():
-                points[str(idx)] = [point['Easting']*1000, point['Northing']*1000, point['Elevation']*1000]
-                idx += 1
+        points = numpy.array([
+            [point['Easting'], point['Northing'], point['Elevation']]
+            for geopoints in obj.Clusters
+            for point in geopoints.Model.values()], dtype=numpy.float64) * 1000
 
         if len(points) < 3:
             obj.Mesh = Mesh.Mesh()
-            obj.Contour = Part.Shape()
-            obj.Boundary = Part.Shape()
+            obj.Contour = {}
+            obj.Boundary = ()
+            return
+
+        source = content_hash(points,
+            numpy.array([obj.MaxLength, float(obj.MaxAngle), obj.ThinningTolerance]),
+            numpy.array(obj.ThinningMode))
+        if source == getattr(self, "source", None): return
+
+        count = len(points)
+        points = thin_points(points, obj.ThinningMode, obj.ThinningTolerance * 1000)
+        if obj.RemovedPoints != count - len(points):
+            obj.RemovedPoints = count - len(points)
+        if obj.ThinningMode != "None":
+            FreeCAD.Console.PrintMessage(
+                f"{obj.Label}: {count - len(points)} of {count} points removed by thinning\n")
+
+        # New points are inserted into the live triangulation. It is
+        # rebuilt only when points are deleted or after a restore.
+        tri = getattr(self, "tri", None)
+        added = added_points(self.tri_points, points) if tri is not None else None
+
+        if added is None:
+            tri = Delaunay(points[:, :-1], incremental=True)
+            self.tri, self.tri_points = tri, points
+
+        elif len(added):
+            tri.add_points(added[:, :-1])
+            self.tri_points = numpy.vstack([self.tri_points, added])
+
+        mask = test_triangulation(tri, obj.MaxLength * 1000, float(obj.MaxAngle))
+
+        self.applied = None
+        self.set_triangulation(obj, self.tri_points, tri.simplices[mask], source=source)
+
+    def add_storage(self, obj):
+        """Add binary triangulation storage properties."""
+        obj.addProperty(
+            "App::PropertyFileIncluded", "Data", "Triangulation",
+            "Binary vertex and face arrays of triangulation")
+
+        obj.addProperty(
+            "App::PropertyString", "Hash", "Triangulation",
+            "Content hash of triangulation arrays").Hash = ""
+
+        obj.setEditorMode("Data", 2)
+        obj.setEditorMode("Hash", 1)
+
+    def add_cache(self, obj):
+        """Add contour cache property."""
+        obj.addProperty(
+            "App::PropertyBool", "ContourCache", "Contour",
+            "Keep contour results in a cache folder next to the document").ContourCache = False
+
+    def add_thinning(self, obj):
+        """Add point thinning properties."""
+        obj.addProperty(
+            "App::PropertyEnumeration", "ThinningMode", "Thinning",
+            "Point thinning before triangulation").ThinningMode = [
+                "None", "Grid", "Duplicates", "Vertical Error"]
+
+        obj.addProperty(
+            "App::PropertyFloat", "ThinningTolerance", "Thinning",
+            "Grid size, merge distance or vertical error of thinning").ThinningTolerance = 0.1
+
+        obj.addProperty(
+            "App::PropertyInteger", "RemovedPoints", "Thinning",
+            "Number of points removed by thinning").RemovedPoints = 0
+
+        obj.setEditorMode("RemovedPoints", 1)
+
+    def add_tiles(self, obj):
+        """Add tiled triangulation properties."""
+        obj.addProperty(
+            "App::PropertyBool", "Tiled", "Triangulation",
+            "Cache triangulation tiles in memory-mapped files next to the document").Tiled = False
+
+        obj.addProperty(
+            "App::PropertyFloat", "TileSize", "Triangulation",
+            "Size of triangulation tiles").TileSize = 500
+
+    def set_triangulation(self, obj, points, faces, invisible=None, source=""):
+        """Store triangulation arrays in the binary Data property."""
+        self.points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+        self.faces = numpy.asarray(faces, dtype=numpy.int32).reshape(-1, 3)
+        self.invisible = numpy.asarray(
+            [] if invisible is None else invisible, dtype=numpy.int32).reshape(-1, 3)
+        self.source = source
+
+        path = write_arrays(obj.Name,
+            points=self.points, faces=self.faces,
+            invisible=self.invisible, source=numpy.array(source))
+
+        self.writing = True
+        obj.Hash = content_hash(self.points, self.faces, self.invisible)
+        obj.Data = path
+        self.writing = False
+
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    def load_triangulation(self, obj):
+        """Load triangulation arrays from the binary Data property."""
+        data = read_arrays(obj.Data)
+        self.points = data.get("points", numpy.empty((0, 3), dtype=numpy.float64))
+        self.faces = data.get("faces", numpy.empty((0, 3), dtype=numpy.int32))
+        self.invisible = data.get("invisible", numpy.empty((0, 3), dtype=numpy.int32))
+        self.source = str(data.get("source", ""))
+
+    def update_mesh(self, obj):
+        """Apply new edit operations to the live mesh.
+
+        Operations appended since the last update are applied to the
+        current mesh and arrays. Any other change of the operation log,
+        like an undo, replays it on the base triangulation.
+        """
+        if not len(getattr(self, "faces", [])): return
+        operations = obj.Operations
+        applied = getattr(self, "applied", None)
+
+        if applied is not None and operations[:len(applied)] == applied:
+            if len(operations) == len(applied): return
+            self.applied = list(applied)
+            mesh = obj.Mesh.copy()
+            self.apply_operations(operations[len(applied):], mesh)
+
+        else:
+            self.reset_operations()
+            mesh = build_mesh(self.points, self.faces, self.origin)
+            self.apply_operations(operations, mesh)
+
+        if mesh.CountFacets > 0:
+            obj.Geolocation.Base = FreeCAD.Vector(*self.origin.tolist())
+            mesh.Placement = obj.Placement
+            obj.Mesh = mesh
+
+        if len(self.applied) >= obj.CompactInterval > 0:
+            self.compact(obj)
+
+    def reset_operations(self):
+        """Set live arrays back to the base triangulation."""
+        self.applied = []
+        self.vertices, self.triangles = self.points, self.faces
+        self.origin = self.points[self.faces[0, 0]] * [1, 1, 0]
+
+    def apply_operations(self, operations, mesh=None):
+        """Apply edit operations to the live arrays and mesh.
+
+        Live arrays only take an operation after the mesh took it too,
+        so failed operations leave both unchanged.
+        """
+        for op in operations:
+            try:
+                vertices, triangles = apply_operation(self.vertices, self.triangles, op)
+                if mesh is not None:
+                    edit_mesh(mesh, op, self.origin)
+                self.vertices, self.triangles = vertices, triangles
+
+            except Exception as error:
+                FreeCAD.Console.PrintWarning(f"{op.get('type')}: {error}\n")
+            self.applied.append(op)
+
+    def compact(self, obj):
+        """Merge applied edit operations into a new base triangulation."""
+        self.applied = []
+        self.set_triangulation(
+            obj, self.vertices, self.triangles, self.invisible, self.source)
+        obj.Operations = []
+
+    def onDocumentRestored(self, obj):
+        """Load triangulation arrays after the document is restored."""
+        if "Points" in obj.PropertiesList:
+            points, faces = obj.Points, obj.Faces
+            if isinstance(points, dict):
+                points = [points[str(i)] for i in range(len(points))]
+
+            obj.removeProperty("Points")
+            obj.removeProperty("Faces")
+            self.add_storage(obj)
+
+            visible = [[int(i) for i in face] for face in faces["Visible"]]
+            invisible = [[int(i) for i in face] for face in faces["Invisible"]]
+            self.set_triangulation(obj, points, visible, invisible)
+
+        if "CompactInterval" not in obj.PropertiesList:
+            obj.addProperty(
+                "App::PropertyInteger", "CompactInterval", "Triangulation",
+                "Number of edit operations merged into triangulation at once").CompactInterval = 50
+
+        if "ContourCache" not in obj.PropertiesList:
+            self.add_cache(obj)
+
+        if "ThinningMode" not in obj.PropertiesList:
+            self.add_thinning(obj)
+
+        if "Tiled" not in obj.PropertiesList:
+            self.add_tiles(obj)
+
+        if obj.getTypeIdOfProperty("Contour") != "App::PropertyPythonObject":
+            obj.removeProperty("Contour")
+            obj.addProperty("App::PropertyPythonObject", "Contour", "Contour",
+                "Contour line coordinates", 2)
+
+        if obj.getTypeIdOfProperty("Boundary") != "App::PropertyPythonObject":
+            obj.removeProperty("Boundary")
+            obj.addProperty("App::PropertyPythonObject", "Boundary", "Triangulation",
+                "Boundary line coordinates", 2)
+
+        self.load_triangulation(obj)
+        if len(self.faces):
+            self.reset_operations()
+            self.apply_operations(obj.Operations)
+        self.update_contours(obj)
+        self.update_boundary(obj)
+
+    def mesh_arrays(self, obj=None):
+        """Return live vertices relative to the origin and triangles.
+
+        Until live arrays are loaded, arrays of the given object's mesh
+        are returned.
+        """
+        empty = numpy.empty((0, 3)), numpy.empty((0, 3), dtype=numpy.int32)
+        if obj is not None and not obj.Mesh.CountFacets:
+            return empty
+
+        if len(getattr(self, "triangles", [])):
+            return self.vertices - self.origin, self.triangles
+
+        if obj is None:
+            return empty
+
+        points, facets = obj.Mesh.Topology
+        return (numpy.array([tuple(p) for p in points], dtype=numpy.float64),
+            numpy.array(facets, dtype=numpy.int32))
+
+    def mesh_key(self):
+        """Return the content hash of the live triangulation, empty without one."""
+        if not len(getattr(self, "triangles", [])): return ""
+        keyed = getattr(self, "keyed", None)
+        if not keyed or keyed[0] is not self.vertices or keyed[1] is not self.triangles:
+            keyed = self.keyed = (
+                self.vertices, self.triangles, content_hash(self.vertices, self.triangles))
+        return keyed[2]
+
+    def triangle_index(self):
+        """Return the spatial index of the live triangulation.
+
+        The index is built on first use and rebuilt after the
+        triangulation changes.
+        """
+        key = self.mesh_key()
+        index = getattr(self, "index", None)
+        if index is None or index.key != key:
+            index = self.index = TriangleIndex(*self.mesh_arrays(), key)
+        return index
+
+    def tiles(self, obj):
+        """Return the tile cache of the live triangulation for tiled terrains.
+
+        Tiles are written next to the saved document and rewritten
+        after the triangulation changes. All elevation, section and
+        crossing queries and contours then load only the tiles they
+        need, and the spatial index of the whole triangulation is not
+        kept in memory.
+        """
+        if not obj.Tiled or not obj.Document.FileName: return None
+        if not len(getattr(self, "triangles", [])): return None
+
+        key = f"{self.mesh_key()}-{obj.TileSize:g}"
+        tiles = getattr(self, "tile_store", None)
+        if tiles is None or tiles.key != key:
+            folder = os.path.join(
+                os.path.splitext(obj.Document.FileName)[0] + "_tiles", obj.Name)
+            if os.path.isfile(os.path.join(folder, "key.npy")):
+                tiles = TerrainTiles(folder)
+
+            if tiles is None or tiles.key != key:
+                self.tile_store = tiles = None
+                tiles = TerrainTiles.write(
+                    folder, *self.mesh_arrays(), obj.TileSize * 1000, key)
+            self.tile_store = tiles
+            self.index = None
+        return tiles
+
+    def elevations_at(self, obj, xy):
+        """Return elevations and triangle ids at global coordinates in metres."""
+        xy = numpy.asarray(xy, dtype=numpy.float64).reshape(-1, 2)
+        if not len(getattr(self, "triangles", [])):
+            return numpy.full(len(xy), numpy.nan), numpy.full(len(xy), -1)
+
+        source = self.tiles(obj) or self.triangle_index()
+        z, ids = source.elevations_at(xy * 1000 - self.origin[:2])
+        return z / 1000, ids
+
+    def sections_at(self, obj, starts, ends, workers=1):
+        """Intersect segments given in global metres with the triangulation.
+
+        Returns segment ids, parameters along the segments and
+        elevations in metres of all crossings, see TriangleIndex.sections.
+        Long segment lists are split over the given number of workers,
+        tiled terrains section the tiles under the segments instead.
+        """
+        starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+        ends = numpy.asarray(ends, dtype=numpy.float64).reshape(-1, 2)
+        if not len(getattr(self, "triangles", [])):
+            return numpy.empty(0, dtype=numpy.int64), numpy.empty(0), numpy.empty(0)
+
+        starts, ends = starts * 1000 - self.origin[:2], ends * 1000 - self.origin[:2]
+        tiles = self.tiles(obj)
+        segment, t, z = tiles.sections(starts, ends) if tiles else \
+            self.triangle_index().parallel_sections(starts, ends, workers)
+        return segment, t, z / 1000
+
+    def line_crossings_at(self, obj, starts, ends, heights, rises):
+        """Find first crossings of sloped lines with the triangulation.
+
+        Segments, heights and rises are given in global metres, see
+        TriangleIndex.line_crossings.
+        """
+        starts = numpy.asarray(starts, dtype=numpy.float64).reshape(-1, 2)
+        ends = numpy.asarray(ends, dtype=numpy.float64).reshape(-1, 2)
+        if not len(getattr(self, "triangles", [])):
+            return numpy.full(len(starts), numpy.nan), numpy.full(len(starts), numpy.nan)
+
+        source = self.tiles(obj) or self.triangle_index()
+        t, z = source.line_crossings(
+            starts * 1000 - self.origin[:2], ends * 1000 - self.origin[:2],
+            numpy.asarray(heights) * 1000, numpy.asarray(rises) * 1000)
+        return t, z / 1000
+
+    def remember(self, key, result):
+        """Keep a result in the memory cache."""
+        cache = self.__dict__.setdefault("cache", {})
+        cache.pop(key, None)
+        cache[key] = result
+        while len(cache) > CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+
+    def cached(self, obj, name, key, compute):
+        """Return result arrays from cache or compute them.
+
+        Results are cached in memory and optionally on disk, keyed on
+        the triangulation hash and the given key.
+        """
+        key = f"{self.mesh_key()}-{key}"
+        arrays = getattr(self, "cache", {}).get((name, key))
+        path = cache_path(obj.Document, f"{obj.Name}_{name}", key) if obj.ContourCache else ""
+
+        if arrays is None and path:
+            arrays = read_cached(path) or None
+
+        if arrays is None:
+            arrays = compute()
+
+        if path and not os.path.isfile(path):
+            save_cached(path, **arrays)
+
+        self.remember((name, key), arrays)
+        return arrays
+
+    def update_contours(self, obj):
+        """Set contour lines of the live triangulation."""
+        if not obj.Mesh.CountFacets or not len(getattr(self, "triangles", [])):
+            obj.Contour = {}
             return
 
-        if obj.Points == points: return
+        def compute():
+            major, minor = obj.MajorInterval * 1000, obj.MinorInterval * 1000
+            tiles = self.tiles(obj)
+            contours = tiles.contours(major, minor) if tiles else get_contours(
+                *self.mesh_arrays(), major, minor)
+            return {name + kind: array
+                for name, lines in contours.items()
+                for kind, array in zip(["Points", "Counts"], lines)}
+
+        arrays = self.cached(obj, "Contour",
+            f"{obj.MajorInterval:g}-{obj.MinorInterval:g}", compute)
+        obj.Contour = {name: (arrays[name + "Points"], arrays[name + "Counts"])
+            for name in ["Major", "Minor"] if name + "Points" in arrays}
+
+    def update_boundary(self, obj):
+        """Set boundary lines of the live triangulation."""
+        if not obj.Mesh.CountFacets or not len(getattr(self, "triangles", [])):
+            obj.Boundary = ()
+            return
 
-        tri = Delaunay(numpy.array(list(points.values()))[:, :-1])
-        tested_tri = test_triangulation(tri, obj.MaxLength, obj.MaxAngle)
+        arrays = self.cached(obj, "Boundary", "", lambda: dict(zip(
+            ["Points", "Counts"], get_boundary(*self.mesh_arrays()))))
+        obj.Boundary = (arrays["Points"], arrays["Counts"])
 
-        faces = [[str(x) for x in f] for f in tri.simplices.tolist()]
+    def dumps(self):
+        """Called during document saving."""
+        return {"Type": self.Type}
 
-        obj.Points = points
-        obj.Faces = {"Visible": faces, "Invisible": []}
+    def loads(self, state):
+        """Called during document restore."""
+        self.Type = state["Type"]
 
     def onChanged(self, obj, prop):
         """Do something when a data property has changed."""
         super().onChanged(obj, prop)
 
-        if prop in ["Points", "Faces", "Operations"]:
-            mesh = Mesh.Mesh()
-            origin = None
-
-            for face in obj.Faces["Visible"]:
-                if origin is None:
-                    origin = FreeCAD.Vector(obj.Points[face[0]])
-                    origin.z = 0
-                c1 = FreeCAD.Vector(obj.Points[face[0]]).sub(origin)
-                c2 = FreeCAD.Vector(obj.Points[face[1]]).sub(origin)
-                c3 = FreeCAD.Vector(obj.Points[face[2]]).sub(origin)
-                mesh.addFacet(c1, c2, c3)
-
-            for op in obj.Operations:
-                if op.get("type") == "Add Point":
-                    idx = op.get("index")
-                    vec = FreeCAD.Vector(op.get("vector")).sub(obj.Geolocation.Base)
-                    mesh.insertVertex(idx, vec)
-
-                if op.get("type") == "Delete Triangle":
-                    idx = op.get("index")
-                    mesh.removeFacets([idx])
-
-                if op.get("type") == "Swap Edge":
-                    idx = op.get("index")
-                    other = op.get("other")
-                    try:
-                        mesh.swapEdge(idx, other)
-
-                    except Exception:
-                        print("The edge between these triangles cannot be swappable")
-
-            if mesh.CountFacets > 0:
-                obj.Geolocation.Base = origin
-                mesh.Placement = obj.Placement
-                obj.Mesh = mesh
-        
-        elif prop in ["Mesh","MajorInterval"]:
-            obj.Contour = get_contours(obj.Mesh, obj.MajorInterval*1000, obj.MinorInterval*1000)
-            obj.Boundary = get_boundary(obj.Mesh)
+        if prop == "Data" and not obj.Document.Restoring:
+            if not getattr(self, "writing", False):
+                self.load_triangulation(obj)
+                self.applied = None
+
+            if getattr(self, "applied", None) is None:
+                self.update_mesh(obj)
+
+        elif prop == "Operations" and not obj.Document.Restoring:
+            self.update_mesh(obj)
+
+        elif prop == "Mesh" and not obj.Document.Restoring:
+            self.update_contours(obj)
+            self.update_boundary(obj)
+
+        elif prop == "MajorInterval" and not obj.Document.Restoring:
+            self.update_contours(obj)
 
         elif prop == "MinorInterval":
             obj.MajorInterval = obj.getPropertyByName(prop) * 5
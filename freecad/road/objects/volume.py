@@ -3,8 +3,13 @@
 """Provides the object code for Table objects."""
 
 import Part
+import numpy
 
 from ..functions.volume_functions import VolumeFunctions
+from ..functions.earthwork_functions import earthwork
+from ..functions.surface_volume import tin_volume
+from ..functions.shape_functions import build_mesh
+from ..utils.get_group import create_project
 
 
 class Volume(VolumeFunctions):
@@ -30,8 +35,79 @@ class Volume(VolumeFunctions):
             "Part::PropertyPartShape", "Shape", "Base",
             "Volume areas shape").Shape = Part.Shape()
 
+        self.add_areas(obj)
+        self.add_earthwork(obj)
+        self.add_surfaces(obj)
+
         obj.Proxy = self
 
+    def add_areas(self, obj):
+        '''
+        Add section area properties.
+        '''
+        obj.addProperty(
+            "App::PropertyPythonObject", "Areas", "Base",
+            "Stations with fill and cut areas in square metres").Areas = {}
+
+    def add_earthwork(self, obj):
+        '''
+        Add earthwork quantity properties.
+        '''
+        obj.addProperty(
+            "App::PropertyBool", "CurvatureCorrection", "Earthwork",
+            "Correct volumes for the alignment curvature").CurvatureCorrection = True
+
+        obj.addProperty(
+            "App::PropertyPythonObject", "Earthwork", "Earthwork",
+            "Volumes in cubic metres and mass haul ordinates per station").Earthwork = {}
+
+    def add_surfaces(self, obj):
+        '''
+        Add surface to surface volume properties.
+        '''
+        obj.addProperty(
+            'App::PropertyLink', "ExistingTerrain", "Surface",
+            "Existing terrain of the surface volume").ExistingTerrain = None
+
+        obj.addProperty(
+            'App::PropertyLink', "DesignTerrain", "Surface",
+            "Design terrain of the surface volume").DesignTerrain = None
+
+        obj.addProperty(
+            "App::PropertyFloat", "GridSpacing", "Surface",
+            "Spacing of the volume grid in metres").GridSpacing = 1
+
+        self.add_isopach(obj)
+
+        obj.addProperty(
+            "App::PropertyPythonObject", "SurfaceVolume", "Surface",
+            "Cut, fill and net volumes in cubic metres between the terrains").SurfaceVolume = {}
+
+    def add_isopach(self, obj):
+        '''
+        Add isopach and boundary properties of the surface volume.
+        '''
+        obj.addProperty(
+            'App::PropertyLink', "VolumeBoundary", "Surface",
+            "Closed wire limiting the surface volume area").VolumeBoundary = None
+
+        obj.addProperty(
+            "Mesh::PropertyMeshKernel", "Isopach", "Surface",
+            "Design minus existing elevations over the volume grid")
+
+    def onDocumentRestored(self, obj):
+        '''
+        Add properties missing in older documents.
+        '''
+        if "Areas" not in obj.PropertiesList:
+            self.add_areas(obj)
+        if "Earthwork" not in obj.PropertiesList:
+            self.add_earthwork(obj)
+        if "SurfaceVolume" not in obj.PropertiesList:
+            self.add_surfaces(obj)
+        if "Isopach" not in obj.PropertiesList:
+            self.add_isopach(obj)
+
     def onChanged(self, obj, prop):
         '''
         Do something when a data property has changed.
@@ -42,10 +118,42 @@ class Volume(VolumeFunctions):
         '''
         Do something when doing a recomputation. 
         '''
-        volumes = obj.getParentGroup()
-        region = volumes.getParentGroup()
         tops = obj.getPropertyByName("TopSections")
         bottoms = obj.getPropertyByName("BottomSections")
 
         if tops and bottoms:
-            obj.Shape = self.get_areas(region, tops, bottoms)
\ No newline at end of file
+            areas = self.get_areas(tops, bottoms)
+            obj.Areas = {key: areas[key].tolist() for key in ["Stations", "Fill", "Cut"]}
+            obj.Shape = self.get_shape(tops[0], areas)
+
+            curvatures = self.get_curvatures(obj, areas["Stations"]) \
+                if obj.CurvatureCorrection else None
+            quantities = earthwork(areas["Stations"], areas, curvatures)
+            obj.Earthwork = {key: value.tolist() for key, value in quantities.items()}
+
+        existing = obj.getPropertyByName("ExistingTerrain")
+        design = obj.getPropertyByName("DesignTerrain")
+        result = tin_volume(existing, design, obj.GridSpacing, self.boundary_polygon(obj)) \
+            if existing and design and obj.GridSpacing > 0 else None
+        obj.SurfaceVolume = {key: result[key] for key in ["Cut", "Fill", "Net"]} if result else {}
+
+        # Isopach in the local coordinates of the existing terrain
+        if result:
+            mesh = build_mesh(result["Points"] * 1000, result["Faces"], existing.Proxy.origin)
+            mesh.Placement = existing.Placement
+            obj.Isopach = mesh
+        else:
+            obj.Isopach = build_mesh(numpy.empty((0, 3)), [], numpy.zeros(3))
+
+    def boundary_polygon(self, obj):
+        '''
+        Return the boundary wire as a polygon in global metres.
+        '''
+        boundary = obj.getPropertyByName("VolumeBoundary")
+        if not boundary or not boundary.Shape.Wires:
+            return None
+
+        shape = boundary.Shape.copy()
+        shape.translate(create_project(boundary.Placement.Base).Base)
+        points = shape.Wires[0].discretize(Deflection=10)
+        return numpy.array([[point.x, point.y] for point in points]) / 1000
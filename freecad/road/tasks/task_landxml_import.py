@@ -805,8 +805,8 @@ class TaskLandXMLImport(TaskPanel):
                     
                     # Create Terrain object using the make_terrain API
                     terrain = make_terrain.create(label=surface_name)
-                    terrain.Points = terrain_points
-                    terrain.Faces = {"Visible":visible_faces, "Invisible":invisible_faces}
+                    terrain.Proxy.set_triangulation(
+                        terrain, terrain_points, visible_faces, invisible_faces)
                     
                     surface_created += 1
                     print(f"Created terrain '{surface_name}' with {len(visible_faces)} visible faces, {len(invisible_faces)} invisible faces and {len(terrain_points)} points")
@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Provides functions to run array tasks on worker processes."""
+
+import os, sys, weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy
+
+
+def worker_count(workers=0):
+    """Return the number of workers to use, 0 means all cores."""
+    if workers and workers > 0:
+        return workers
+    return os.cpu_count() or 1
+
+def gui_running():
+    """Return True inside the FreeCAD GUI, whose threads make forking unsafe."""
+    return bool(getattr(sys.modules.get("FreeCAD"), "GuiUp", False))
+
+def share(arrays):
+    """Copy arrays into shared memory blocks.
+
+    Returns the blocks, which must be released by the caller, and
+    descriptors that workers use to attach to the arrays.
+    """
+    blocks, descriptors = [], {}
+    for name, array in arrays.items():
+        array = numpy.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        numpy.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        descriptors[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, descriptors
+
+def release(blocks):
+    """Close and remove shared memory blocks."""
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+def release_owned(blocks, pid):
+    """Release shared memory blocks in the process that created them."""
+    if os.getpid() == pid:
+        release(blocks)
+
+
+class SharedArrays:
+    """Arrays kept in shared memory across map_shared calls.
+
+    Arrays are copied into shared memory on first use by worker
+    processes and released when the object is garbage collected.
+    """
+
+    def __init__(self, arrays):
+        """Keep the arrays to share."""
+        self.arrays = arrays
+        self.blocks = None
+
+    def descriptors(self):
+        """Return descriptors of the shared arrays, sharing them once."""
+        if self.blocks is None:
+            self.blocks, self.handles = share(self.arrays)
+            weakref.finalize(self, release_owned, self.blocks, os.getpid())
+        return self.handles
+
+
+def _run(function, descriptors, task):
+    """Attach to shared arrays and run a task on a worker process."""
+    blocks, arrays = [], {}
+    try:
+        for name, (block_name, shape, dtype) in descriptors.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = numpy.ndarray(shape, dtype, buffer=block.buf)
+        return function(arrays, task)
+
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+def map_shared(function, arrays, tasks, workers=0, shared=None):
+    """Run function(arrays, task) for each task in parallel.
+
+    Results are returned in task order. Arrays of an optional
+    SharedArrays object are added to the given arrays and stay shared
+    for later calls. Outside the FreeCAD GUI, arrays are shared with
+    forked worker processes. Inside the GUI, Qt and Coin threads may
+    hold locks a forked child can never release, and FreeCAD can not
+    spawn interpreters, so threads are used there instead.
+    """
+    if shared is not None:
+        arrays = dict(shared.arrays, **arrays)
+
+    workers = min(worker_count(workers), len(tasks))
+    if workers < 2:
+        return [function(arrays, task) for task in tasks]
+
+    if gui_running() or "fork" not in multiprocessing.get_all_start_methods():
+        with ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(lambda task: function(arrays, task), tasks))
+
+    kept = shared.descriptors() if shared is not None else {}
+    blocks, descriptors = share({name: array for name, array in arrays.items() if name not in kept})
+    try:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            futures = [executor.submit(_run, function, dict(kept, **descriptors), task)
+                for task in tasks]
+            return [future.result() for future in futures]
+
+    finally:
+        release(blocks)
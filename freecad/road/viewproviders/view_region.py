@@ -5,9 +5,9 @@
 import FreeCAD
 from pivy import coin
 import math
+import numpy
 from .view_geo_object import ViewProviderGeoObject
 from ..utils.label_manager import LabelManager
-from ..utils.support import  zero_referance
 
 
 class ViewProviderRegion(ViewProviderGeoObject):
@@ -120,15 +120,19 @@ class ViewProviderRegion(ViewProviderGeoObject):
             regions = vobj.Object.getParentGroup()
             alignment = regions.getParentGroup()
 
-            for station in vobj.Object.Stations:
-                # Get point and direction from alignment
-                tuple_coord, tuple_vec = alignment.Model.get_orthogonal_at_station(station, "left")
-                coord = zero_referance(alignment.Model.get_start_point(), [tuple_coord])
-                point = coord[0].add(alignment.Placement.Base)
-                dir_vec = FreeCAD.Vector(*tuple_vec)
-                
+            # Label points and directions from guideline arrays
+            guidelines = vobj.Object.Guidelines
+            valid = numpy.isfinite(guidelines).all(axis=(1, 2))
+            start = numpy.array(alignment.Model.get_start_point())
+            centers = (guidelines[valid, 1] - start) * 1000
+            directions = guidelines[valid, 0] - guidelines[valid, 1]
+            stations = numpy.array(vobj.Object.Stations, dtype=float)[valid]
+
+            for station, center, direction in zip(stations.tolist(), centers.tolist(), directions.tolist()):
+                point = FreeCAD.Vector(*center, 0).add(alignment.Placement.Base)
+
                 # Calculate angle from direction vector
-                angle = math.atan2(dir_vec.y, dir_vec.x)
+                angle = math.atan2(direction[1], direction[0])
                 
                 # Prepare placement and rotation
                 placement = FreeCAD.Placement()
@@ -178,18 +182,29 @@ class ViewProviderRegion(ViewProviderGeoObject):
     def updateData(self, obj, prop):
         """Update Object visuals when a data property changed."""
         super().updateData(obj, prop)
-        if prop == "Shape":
-            line_coords, line_index = [], []
-            for edge in obj.Shape.Edges:
-                start = len(line_coords)
-                line_coords.extend(edge.discretize(2))
-                end = len(line_coords)
-
-                line_index.extend(range(start,end))
-                line_index.append(-1)
-
-            self.line_coords.point.values = line_coords
-            self.line_lines.coordIndex.values = line_index
+        if prop == "Guidelines":
+            guidelines = obj.Guidelines
+            regions = obj.getParentGroup()
+            alignment = regions.getParentGroup() if regions else None
+            if not len(guidelines) or not alignment:
+                self.line_coords.point.values = []
+                self.line_lines.coordIndex.values = []
+                return
+
+            # Left, center and right points of each guideline as one polyline
+            guidelines = guidelines[numpy.isfinite(guidelines).all(axis=(1, 2))]
+            start = numpy.array(alignment.Model.get_start_point())
+            line_coords = numpy.zeros((len(guidelines), 3, 3))
+            line_coords[:, :, :2] = (guidelines - start) * 1000
+            line_coords += tuple(obj.Placement.Base)
+
+            line_index = numpy.arange(len(guidelines) * 4).reshape(-1, 4)
+            line_index -= numpy.arange(len(guidelines))[:, None]
+            line_index[:, 3] = -1
+
+            self.line_coords.point.values = line_coords.reshape(-1, 3).tolist()
+            self.line_lines.coordIndex.values = line_index.ravel().tolist()
+            self.onChanged(obj.ViewObject, "Labels")
 
     def claimChildren(self):
         """Provides object grouping"""
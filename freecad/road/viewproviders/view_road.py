@@ -3,6 +3,7 @@
 """Provides the viewprovider code for Shape objects."""
 
 from pivy import coin
+import numpy
 from .view_geo_object import ViewProviderGeoObject
 
 
@@ -63,17 +64,12 @@ class ViewProviderRoad(ViewProviderGeoObject):
         """Update Object visuals when a data property changed."""
         super().updateData(obj, prop)
 
-        if prop == "Shape":
-            index = 0
-            points, indexes = [], []
-            for face in obj.Shape.Faces:
-                vertices, triangles = face.tessellate(1000)
-                points.extend(vertices)
-                for tri in triangles:
-                    indexes.extend([i + index for i in tri])
-                    indexes.append(-1)
-                index += len(vertices)
-
-            #Set contour system.
-            self.face_coords.point.values = points
-            self.faces.coordIndex.values = indexes
\ No newline at end of file
+        if prop == "Mesh":
+            points, facets = obj.Mesh.Topology
+            points = numpy.array([tuple(p) for p in points], dtype=numpy.float64).reshape(-1, 3)
+            facets = numpy.array(facets, dtype=numpy.int64).reshape(-1, 3)
+            index = numpy.c_[facets, numpy.full(len(facets), -1)].ravel()
+
+            #Set corridor surface.
+            self.face_coords.point.values = (points + tuple(obj.Placement.Base)).tolist()
+            self.faces.coordIndex.values = index.tolist()
@@ -4,15 +4,24 @@
 
 import FreeCAD
 from pivy import coin
-import random
+import random, itertools
+import numpy
 from ..variables import line_patterns
 from .view_geo_object import ViewProviderGeoObject
 from ..functions.terrain_functions import (
-    wire_view, 
+    decimate,
     elevation_analysis, 
     slope_analysis, 
     direction_analysis)
 
+# Face count above which simplified display levels are built.
+LOD_FACES = 200000
+
+# Vertex reduction ratio of each simplified level.
+LOD_RATIOS = [4, 16]
+
+# Screen areas in pixels below which the next simplified level is shown.
+LOD_AREAS = [1000000, 100000]
 
 class ViewProviderTerrain(ViewProviderGeoObject):
     """This class is about Terrain Object view features."""
@@ -69,11 +78,19 @@ class ViewProviderTerrain(ViewProviderGeoObject):
         """Create Object visuals in 3D view."""
         super().attach(vobj)
 
-        # GeoCoords Node.
-        self.terrain_coords = coin.SoCoordinate3()
+        # Terrain levels of detail, from full to most simplified.
+        self.lod = coin.SoLevelOfDetail()
+        self.levels = []
+        for i in range(len(LOD_RATIOS) + 1):
+            coords = coin.SoCoordinate3()
+            triangles = coin.SoIndexedFaceSet()
+            level = coin.SoSeparator()
+            level.addChild(coords)
+            level.addChild(triangles)
+            self.lod.addChild(level)
+            self.levels.append((coords, triangles))
 
         # Terrain features.
-        self.triangles = coin.SoIndexedFaceSet()
         self.face_material = coin.SoMaterial()
         self.edge_material = coin.SoMaterial()
         self.edge_color = coin.SoBaseColor()
@@ -136,8 +153,7 @@ class ViewProviderTerrain(ViewProviderGeoObject):
         highlight.style = "EMISSIVE_DIFFUSE"
         highlight.addChild(shape_hints)
         highlight.addChild(self.mat_binding)
-        highlight.addChild(self.terrain_coords)
-        highlight.addChild(self.triangles)
+        highlight.addChild(self.lod)
         highlight.addChild(boundaries)
 
         # Face root.
@@ -238,32 +254,45 @@ class ViewProviderTerrain(ViewProviderGeoObject):
         super().updateData(obj, prop)
 
         if prop == "Mesh":
-            mesh = obj.getPropertyByName(prop)
-            self.terrain_coords.point.values = mesh.Topology[0]
-            self.triangles.coordIndex.values = [x for i in mesh.Topology[1] for x in (*i, -1)]
+            vertices, faces = obj.Proxy.mesh_arrays(obj)
+            vertices = vertices + tuple(obj.Placement.Base)
+            levels = [(vertices, faces, numpy.arange(len(faces)))]
+
+            # Simplified levels are only used for large terrains.
+            if len(faces) > LOD_FACES:
+                levels.extend(decimate(vertices, faces, ratio) for ratio in LOD_RATIOS)
+                self.lod.screenArea.setValues(0, len(LOD_AREAS), LOD_AREAS)
+            else:
+                self.lod.screenArea.setValues(0, len(LOD_AREAS), [0] * len(LOD_AREAS))
+
+            empty = (numpy.empty((0, 3)), numpy.empty((0, 3), dtype=int), numpy.empty(0, dtype=int))
+            for (coords, triangles), level in itertools.zip_longest(self.levels, levels):
+                points, indices, source = level or empty
+                index = numpy.c_[indices, numpy.full(len(indices), -1)].ravel()
+                coords.point.values = points.tolist()
+                triangles.coordIndex.values = index.tolist()
+                triangles.materialIndex.values = source.tolist()
 
         elif prop == "Contour":
-            shape = obj.getPropertyByName(prop)
+            contours = obj.getPropertyByName(prop) or {}
+            empty = (numpy.empty((0, 3)), numpy.empty(0, dtype=int))
 
-            if shape.SubShapes:
-                major = shape.SubShapes[0]
-                points, vertices = wire_view(major)
+            base = tuple(obj.Placement.Base)
 
-                self.major_coords.point.values = points
-                self.major_lines.numVertices.values = vertices
+            points, vertices = contours.get("Major", empty)
+            self.major_coords.point.values = (points + base).tolist()
+            self.major_lines.numVertices.values = vertices.tolist()
 
-                minor = shape.SubShapes[1]
-                points, vertices = wire_view(minor)
-
-                self.minor_coords.point.values = points
-                self.minor_lines.numVertices.values = vertices
+            points, vertices = contours.get("Minor", empty)
+            self.minor_coords.point.values = (points + base).tolist()
+            self.minor_lines.numVertices.values = vertices.tolist()
 
         elif prop == "Boundary":
             boundary = obj.getPropertyByName(prop)
-            points, vertices = wire_view(boundary)
+            points, vertices = boundary or (numpy.empty((0, 3)), numpy.empty(0, dtype=int))
 
-            self.boundary_coords.point.values = points
-            self.boundary_lines.numVertices.values = vertices
+            self.boundary_coords.point.values = (points + tuple(obj.Placement.Base)).tolist()
+            self.boundary_lines.numVertices.values = vertices.tolist()
         
         elif prop == "AnalysisType" or prop == "Ranges":
             analysis_type = obj.getPropertyByName("AnalysisType")
@@ -280,17 +309,33 @@ class ViewProviderTerrain(ViewProviderGeoObject):
 
                 self.mat_binding.value = coin.SoMaterialBinding.OVERALL
 
-            elif analysis_type == "Elevation":
-                colorlist = elevation_analysis(obj.Mesh, ranges)
-                self.mat_binding.value = coin.SoMaterialBinding.PER_FACE
-                self.face_material.diffuseColor.setValues(0,len(colorlist),colorlist)
+            else:
+                analysis = {
+                    "Elevation": elevation_analysis,
+                    "Slope": slope_analysis,
+                    "Direction": direction_analysis}[analysis_type]
+
+                vertices, faces = obj.Proxy.mesh_arrays(obj)
+                if not len(faces): return
+
+                colors = analysis(vertices, faces, ranges)
+                self.mat_binding.value = coin.SoMaterialBinding.PER_FACE_INDEXED
+                self.face_material.diffuseColor.setValues(0, len(colors), colors)
+
+    def picked_face(self, obj, picked_point):
+        """Return the mesh face index under a picked point, None if no face was hit.
+
+        Simplified display levels number their own faces, so points
+        picked on them are located in the full triangulation instead.
+        """
+        detail = picked_point.getDetail()
+        if not detail or not detail.isOfType(coin.SoFaceDetail.getClassTypeId()):
+            return None
 
-            elif analysis_type == "Slope":
-                colorlist = slope_analysis(obj.Mesh, ranges)
-                self.mat_binding.value = coin.SoMaterialBinding.PER_FACE
-                self.face_material.diffuseColor.setValues(0,len(colorlist),colorlist)
+        if picked_point.getPath().containsNode(self.levels[0][1]):
+            face_detail = coin.cast(detail, str(detail.getTypeId().getName()))
+            return face_detail.getFaceIndex()
 
-            elif analysis_type == "Direction":
-                colorlist = direction_analysis(obj.Mesh, ranges)
-                self.mat_binding.value = coin.SoMaterialBinding.PER_FACE
-                self.face_material.diffuseColor.setValues(0,len(colorlist),colorlist)
\ No newline at end of file
+        point = numpy.array(picked_point.getPoint().getValue()) - tuple(obj.Placement.Base)
+        _, ids = obj.Proxy.elevations_at(obj, (point[:2] + getattr(obj.Proxy, "origin", numpy.zeros(3))[:2]) / 1000)
+        return int(ids[0]) if ids[0] >= 0 else None
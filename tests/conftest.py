@@ -0,0 +1,28 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Shared fixtures of the array function tests."""
+
+import numpy
+import pytest
+
+
+def build_grid(size, height=None, spacing=1.0):
+    """Return a triangulated square grid of size x size points.
+
+    Elevations come from a function of x and y, zero without it, and
+    faces are counterclockwise, two per grid cell.
+    """
+    x, y = numpy.meshgrid(numpy.arange(size) * spacing, numpy.arange(size) * spacing)
+    x, y = x.ravel().astype(float), y.ravel().astype(float)
+    z = numpy.zeros(len(x)) if height is None else height(x, y)
+    first = (numpy.arange(size - 1)[:, None] * size + numpy.arange(size - 1)).ravel()
+    faces = numpy.r_[
+        numpy.c_[first, first + 1, first + size + 1],
+        numpy.c_[first, first + size + 1, first + size]]
+    return numpy.c_[x, y, z], faces
+
+
+@pytest.fixture
+def grid_mesh():
+    """Return the builder of triangulated grids, see build_grid."""
+    return build_grid
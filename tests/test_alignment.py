@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import numpy
+import pytest
+
+from freecad.road.geometry.alignment.alignment import Alignment
+from freecad.road.geometry.alignment.curve import Curve
+from freecad.road.geometry.alignment.line import Line
+from freecad.road.geometry.alignment.spiral import Spiral
+
+
+def elements():
+    """Line, arc and spirals in both directions and rotations."""
+    return [
+        Line({'Start': (0.0, 0.0), 'End': (60.0, 80.0)}),
+        Curve({'Start': (0.0, 0.0), 'Center': (0.0, 50.0),
+            'End': (50.0, 50.0), 'rot': 'ccw'}),
+        Curve({'Start': (0.0, 0.0), 'Center': (0.0, 50.0),
+            'End': (-50.0, 50.0), 'rot': 'cw'}),
+        Spiral({'Start': (0.0, 0.0), 'PI': (10.0, 5.0), 'End': (40.0, 20.0),
+            'length': 40, 'radiusStart': 'inf', 'radiusEnd': 120, 'rot': 'cw'}),
+        Spiral({'Start': (0.0, 0.0), 'PI': (10.0, 5.0), 'End': (40.0, 20.0),
+            'length': 40, 'radiusStart': 120, 'radiusEnd': 'inf', 'rot': 'ccw'}),
+        Spiral({'Start': (0.0, 0.0), 'PI': (10.0, 0.0), 'End': (30.0, 2.0),
+            'length': 30, 'radiusStart': 300, 'radiusEnd': 150, 'rot': 'cw'}),
+    ]
+
+
+@pytest.mark.parametrize('element', elements(), ids=lambda e: e.get_type())
+@pytest.mark.parametrize('side', ['left', 'right'])
+def test_element_orthogonals_match_scalar(element, side):
+    distances = numpy.linspace(0, element.length, 17)
+
+    points, vectors = element.get_orthogonals(distances, side)
+
+    for s, point, vector in zip(distances, points, vectors):
+        expected_point, expected_vector = element.get_orthogonal(float(s), side)
+        assert numpy.allclose(point, expected_point)
+        assert numpy.allclose(vector, expected_vector, atol=1e-6)
+
+
+def test_alignment_orthogonals_match_scalar():
+    alignment = Alignment({
+        'staStart': 100.0,
+        'coordinateSystem': {'system_type': 'local',
+            'origin': (5.0, -3.0), 'rotation': 0.3, 'swap': True},
+        'CoordGeom': [
+            {'Type': 'Line', 'Start': (0.0, 0.0), 'End': (100.0, 0.0),
+                'staStart': 100.0},
+            {'Type': 'Curve', 'Start': (100.0, 0.0), 'Center': (100.0, 200.0),
+                'End': (300.0, 200.0), 'rot': 'ccw', 'staStart': 200.0},
+        ]})
+    end = 200.0 + alignment.elements[1].length
+    stations = numpy.r_[numpy.linspace(100.0, end, 23), end + 10.0]
+
+    points, vectors = alignment.get_orthogonals_at_stations(stations, 'right')
+
+    for station, point, vector in zip(stations[:-1], points, vectors):
+        expected_point, expected_vector = alignment.get_orthogonal_at_station(
+            float(station), 'right')
+        assert numpy.allclose(point, expected_point)
+        assert numpy.allclose(vector, expected_vector)
+    assert numpy.isnan(points[-1]).all()
+
+
+def test_spiral_orthogonals_without_tangent_are_nan():
+    spiral = elements()[3]
+    distances = numpy.linspace(0, spiral.length, 17)
+    expected_points, expected_vectors = spiral.get_orthogonals(distances)
+
+    # A flat start leaves the first distances without tangent direction
+    clothoid_point = spiral._clothoid_point
+    spiral._clothoid_point = lambda s: clothoid_point(numpy.maximum(s, 5.0))
+    points, vectors = spiral.get_orthogonals(distances)
+
+    degenerate = numpy.isnan(vectors).any(axis=1)
+    assert degenerate.any() and not degenerate.all()
+    assert numpy.isnan(points[degenerate]).all()
+    assert numpy.allclose(vectors[~degenerate], expected_vectors[~degenerate])
+    assert numpy.allclose(points[~degenerate], expected_points[~degenerate])
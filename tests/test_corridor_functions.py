@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from types import SimpleNamespace
+
+import numpy
+
+from freecad.road.functions.corridor_functions import (
+    station_frames, corridor_points, template_envelope, ruled_mesh)
+from freecad.road.geometry.alignment.alignment import Alignment
+
+
+def straight_model(elevation=10.0):
+    """Alignment model running east along a line at a fixed elevation."""
+    alignment = Alignment({'CoordGeom': [
+        {'Type': 'Line', 'Start': (0.0, 0.0), 'End': (100.0, 0.0), 'staStart': 0.0}]})
+    return SimpleNamespace(
+        get_orthogonals_at_stations=alignment.get_orthogonals_at_stations,
+        get_elevation_at_station=lambda profile, station: elevation)
+
+
+def test_station_frames_return_right_normals():
+    origins, normals = station_frames(straight_model(), None, [0.0, 50.0, 150.0])
+
+    assert numpy.allclose(origins[:2], [[0, 0, 10], [50, 0, 10]])
+    assert numpy.allclose(normals[:2], [[0, -1], [0, -1]])
+    assert numpy.isnan(origins[2, :2]).all()
+
+
+def test_corridor_points_put_negative_offsets_left():
+    origins, normals = station_frames(straight_model(), None, [20.0, 40.0])
+    template = [[-3.0, 0.5], [0.0, 0.0], [2.0, -1.0]]
+
+    points = corridor_points(origins, normals, template)
+
+    # Heading east, left is north.
+    assert numpy.allclose(points[0], [[20, 3, 10.5], [20, 0, 10], [20, -2, 9]])
+    assert numpy.allclose(points[1, :, 0], 40)
+
+
+def test_template_envelope_sorts_offsets_left_to_right():
+    template = numpy.array([[[-2.0, 0.0], [0.0, 1.0], [2.0, 0.0]]])
+    edges = numpy.array([[0, 1], [1, 2]])
+
+    envelope = template_envelope(template, edges)
+
+    assert numpy.allclose(envelope[0], [[-2, 0], [0, 1], [2, 0]])
+
+
+def test_ruled_mesh_skips_unplaced_points():
+    points = numpy.zeros((3, 2, 3))
+    points[:, 1, 0] = 1
+    points[:, :, 1] = numpy.arange(3)[:, None]
+    points[2, 1] = numpy.nan
+
+    vertices, faces = ruled_mesh(points, numpy.array([[0, 1]]))
+
+    # Both triangles of the second strip touch the missing point.
+    assert len(faces) == 2
+    assert len(vertices) == 4
+    assert numpy.isfinite(vertices).all()
+
+
+def test_template_envelope_keeps_the_highest_edge():
+    # Lane with a kerb over it and a vertical kerb face.
+    template = numpy.array([[[-3.0, 0.0], [3.0, 0.0], [1.0, 0.0], [1.0, 0.2], [2.0, 0.2]]])
+    edges = numpy.array([[0, 1], [2, 3], [3, 4]])
+
+    envelope = template_envelope(template, edges)
+
+    assert numpy.allclose(envelope[0, :, 0], [-3, 1, 1, 2, 3])
+    assert numpy.allclose(envelope[0, :, 1], [0, 0.2, 0.2, 0.2, 0])
+
+
+def test_template_envelope_without_spanning_edges():
+    template = numpy.array([
+        [[-1.0, 0.0], [0.0, 1.0], [5.0, 2.0]],
+        [[-1.0, 0.0], [numpy.nan, numpy.nan], [5.0, 2.0]]])
+
+    envelope = template_envelope(template, numpy.array([[0, 1]]))
+
+    assert numpy.allclose(envelope[0, :2], [[-1, 0], [0, 1]])
+    assert numpy.isnan(envelope[0, 2, 1])
+    # Unplaced points sort last and leave their edges out.
+    assert numpy.isnan(envelope[1, 2, 0])
+    assert numpy.isnan(envelope[1, :, 1]).all()
+    assert numpy.isnan(template_envelope(template, numpy.empty((0, 2), dtype=int))[:, :, 1]).all()
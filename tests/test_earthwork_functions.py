@@ -0,0 +1,122 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import numpy
+
+from freecad.road.functions.earthwork_functions import (
+    profile_table, section_areas, area_polygons, prismoidal_volumes,
+    station_curvatures, earthwork)
+from freecad.road.geometry.alignment.alignment import Alignment
+
+
+def test_profile_table_sorts_by_station_and_offset():
+    station, offset, elevation = profile_table([[(2, 1), (-1, 3)], [], [(0, 5)]])
+
+    assert station.tolist() == [0, 0, 2]
+    assert offset.tolist() == [-1, 2, 0]
+    assert elevation.tolist() == [3, 1, 5]
+
+
+def test_section_areas_split_fill_and_cut_at_crossings():
+    # Flat top over ground sloping from 1 m below to 1 m above it.
+    tops = [[[(-2, 0), (2, 0)]]]
+    bottoms = [[[(-2, -1), (2, 1)]]]
+
+    areas = section_areas(tops, bottoms, 1)
+
+    assert numpy.allclose(areas["Fill"], [1])
+    assert numpy.allclose(areas["Cut"], [1])
+    # Fill triangle centroid at -4/3, cut at +4/3
+    assert numpy.allclose(areas["FillMoment"], [-4 / 3])
+    assert numpy.allclose(areas["CutMoment"], [4 / 3])
+    assert 0 in areas["Offset"].tolist()
+
+
+def test_section_areas_use_lowest_top_and_highest_bottom():
+    tops = [[[(-3, 2), (3, 2)], []], [[(-3, 1), (3, 1)], [(0, 0), (1, 0)]]]
+    bottoms = [[[(-1, 0), (1, 0)], [(0, -1), (1, -1)]]]
+
+    areas = section_areas(tops, bottoms, 2)
+
+    # Only the common extent of all profiles is measured.
+    assert numpy.allclose(areas["Fill"], [2, 0])
+    assert numpy.allclose(areas["Cut"], [0, 0])
+
+
+def test_section_areas_without_profiles():
+    areas = section_areas([[[]]], [[[]]], 1)
+
+    assert numpy.allclose(areas["Fill"], [0])
+    assert not len(areas["Station"])
+
+
+def test_area_polygons_close_fill_regions():
+    tops = [[[(-2, 0), (2, 0)]]]
+    bottoms = [[[(-2, -1), (2, 1)]]]
+
+    polygons = area_polygons(section_areas(tops, bottoms, 1), 1)
+
+    assert len(polygons[0]) == 1
+    polygon = polygons[0][0]
+    x, y = polygon[:, 0], polygon[:, 1]
+    area = (x * numpy.roll(y, -1) - numpy.roll(x, -1) * y).sum() / 2
+    assert numpy.isclose(abs(area), 1)
+    assert polygon[:, 0].min() == -2 and polygon[:, 0].max() == 0
+
+
+def test_prismoidal_volumes_are_exact_for_quadratic_areas():
+    stations = numpy.array([0.0, 10.0, 25.0, 30.0, 40.0])
+
+    volumes = prismoidal_volumes(stations, stations ** 2 / 4)
+
+    assert numpy.allclose(volumes, numpy.diff(stations ** 3) / 12)
+
+
+def test_prismoidal_volumes_stay_between_end_areas_at_transitions():
+    stations = numpy.array([0.0, 10.0, 20.0, 30.0])
+
+    volumes = prismoidal_volumes(stations, numpy.array([0.0, 0.0, 100.0, 100.0]))
+
+    # No volume before the cut starts and none beyond its full area after.
+    assert volumes[0] == 0
+    assert volumes[2] == 1000
+    assert 0 < volumes[1] < 1000
+
+
+def test_prismoidal_volumes_of_two_stations():
+    assert numpy.allclose(prismoidal_volumes(numpy.array([0.0, 20.0]), numpy.array([1.0, 3.0])), [40])
+
+
+def test_station_curvatures_are_positive_turning_left():
+    alignment = Alignment({'CoordGeom': [
+        {'Type': 'Line', 'Start': (0.0, 0.0), 'End': (100.0, 0.0), 'staStart': 0.0},
+        {'Type': 'Curve', 'Start': (100.0, 0.0), 'Center': (100.0, 50.0),
+            'End': (150.0, 50.0), 'rot': 'cw', 'staStart': 100.0}]})
+
+    curvatures = station_curvatures(alignment, [50.0, 120.0, 170.0])
+
+    assert numpy.allclose(curvatures, [0, 1 / 50, 1 / 50])
+
+
+def test_earthwork_accumulates_corrected_mass_haul():
+    areas = {"Cut": [10.0, 10.0, 10.0], "CutMoment": [20.0, 20.0, 20.0],
+        "Fill": [0.0, 4.0, 0.0], "FillMoment": [0.0, -8.0, 0.0]}
+
+    result = earthwork([0.0, 10.0, 20.0], areas, numpy.full(3, 0.02))
+
+    assert numpy.allclose(result["Length"], [0, 10, 10])
+    assert numpy.allclose(result["CutVolume"], [0, 100, 100])
+    assert numpy.allclose(result["FillVolume"], [0, 20, 20])
+    # Cut centred 2 m right of a left turn is on the outside of the curve.
+    assert numpy.allclose(result["CutCurvature"], [0, 4, 4])
+    assert numpy.allclose(result["FillCurvature"], [0, -0.8, -0.8])
+    corrected = result["CutPrismoidal"] + result["CutCurvature"] \
+        - result["FillPrismoidal"] - result["FillCurvature"]
+    assert numpy.allclose(result["MassHaul"], numpy.cumsum(corrected))
+
+
+def test_earthwork_of_a_single_station():
+    areas = {"Cut": [5.0], "CutMoment": [0.0], "Fill": [0.0], "FillMoment": [0.0]}
+
+    result = earthwork([0.0], areas)
+
+    assert numpy.allclose(result["MassHaul"], [0])
@@ -0,0 +1,67 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Tests of parallel array tasks."""
+
+import gc, sys, types
+import numpy
+import pytest
+from multiprocessing import shared_memory
+
+from freecad.road.utils import parallel
+from freecad.road.utils.parallel import worker_count, map_shared, SharedArrays
+
+
+def row_sum(arrays, row):
+    """Return the sum of one row of a shared array."""
+    return float(arrays["values"][row].sum())
+
+def test_worker_count():
+    assert worker_count(3) == 3
+    assert worker_count(0) >= 1
+    assert worker_count(-1) >= 1
+
+def test_results_keep_task_order():
+    values = numpy.arange(40, dtype=float).reshape(8, 5)
+    expected = values.sum(axis=1).tolist()
+    assert map_shared(row_sum, {"values": values}, list(range(8)), 1) == expected
+    assert map_shared(row_sum, {"values": values}, list(range(8)), 3) == expected
+
+def test_gui_uses_threads(monkeypatch):
+    monkeypatch.setitem(sys.modules, "FreeCAD", types.SimpleNamespace(GuiUp=1))
+    assert parallel.gui_running()
+
+    def no_processes(*args, **kwargs):
+        raise AssertionError("processes started inside the GUI")
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", no_processes)
+
+    # Threads accept local functions, which processes could not pickle.
+    values = numpy.arange(12, dtype=float).reshape(4, 3)
+    result = map_shared(lambda arrays, row: float(arrays["values"][row].sum()),
+        {"values": values}, list(range(4)), 2)
+    assert result == values.sum(axis=1).tolist()
+
+def scaled_row_sum(arrays, row):
+    """Return the sum of one row of a shared array times a shared factor."""
+    return float(arrays["values"][row].sum() * arrays["factor"][0])
+
+def test_shared_arrays_are_reused_and_released():
+    values = numpy.arange(40, dtype=float).reshape(8, 5)
+    shared = SharedArrays({"values": values})
+    expected = (values.sum(axis=1) * 2).tolist()
+
+    for factor in [2.0, 2.0]:
+        result = map_shared(scaled_row_sum, {"factor": numpy.array([factor])},
+            list(range(8)), 3, shared)
+        assert result == expected
+    assert map_shared(scaled_row_sum, {"factor": numpy.array([2.0])},
+        list(range(8)), 1, shared) == expected
+
+    blocks = shared.blocks
+    assert len(blocks) == 1
+    assert shared.descriptors() is shared.descriptors()
+
+    name = blocks[0].name
+    del shared, blocks
+    gc.collect()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
@@ -0,0 +1,100 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Tests of surface to surface volumes."""
+
+import types
+import numpy
+import pytest
+
+from freecad.road.functions import surface_volume
+from freecad.road.functions.triangle_index import TriangleIndex
+from freecad.road.functions.surface_volume import positive_volume, inside_polygon, tin_volume
+
+
+@pytest.fixture
+def terrain(grid_mesh):
+    """Return a builder of terrain stand-ins over a square of size metres.
+
+    Live arrays are kept in millimetres relative to an origin like
+    Terrain objects keep them.
+    """
+    def build(height, size=11, origin=(500000, 4000000)):
+        vertices, faces = grid_mesh(size, height)
+        points = (vertices + [origin[0], origin[1], 0]) * 1000
+        proxy = types.SimpleNamespace(triangles=faces, origin=points[0] * [1, 1, 0])
+        proxy.triangle_index = lambda: TriangleIndex(points - proxy.origin, faces)
+        return types.SimpleNamespace(Proxy=proxy)
+    return build
+
+
+def test_positive_volume_of_prisms():
+    area = 0.5
+    values = numpy.array([[1, 1, 1], [-1, -2, -3], [3, 0, 0], [1, -1, -1], [1, 1, -1]], dtype=float)
+
+    # A prism, nothing, a pyramid, a pyramid over a quarter of the
+    # triangle and the total plus the negative quarter pyramid.
+    quarter = area / 4 / 3
+    expected = [area, 0, area, quarter, area / 3 + quarter]
+    assert numpy.allclose(positive_volume(values, area), expected)
+
+def test_positive_parts_add_up_to_the_total():
+    values = numpy.random.default_rng(3).normal(size=(100, 3))
+    total = positive_volume(values, 2.0) - positive_volume(-values, 2.0)
+    assert numpy.allclose(total, 2.0 * values.mean(axis=1))
+
+def test_inside_polygon():
+    square = [[0, 0], [4, 0], [4, 4], [0, 4]]
+    points = numpy.array([[1, 1], [5, 1], [2, 3.9], [-1, 2]], dtype=float)
+    assert inside_polygon(points, square).tolist() == [True, False, True, False]
+
+def test_fill_between_parallel_planes(terrain):
+    result = tin_volume(terrain(lambda x, y: 0 * x), terrain(lambda x, y: x * 0 + 2))
+    assert numpy.isclose(result["Fill"], 200) and numpy.isclose(result["Cut"], 0)
+    assert numpy.isclose(result["Net"], 200)
+    assert len(result["Faces"]) == 200
+    assert numpy.allclose(result["Points"][:, 2], 2)
+
+def test_cut_and_fill_of_a_tilted_plane(terrain):
+    # The design plane crosses the existing one at x = 5.
+    result = tin_volume(terrain(lambda x, y: 0 * x), terrain(lambda x, y: x - 5))
+    assert numpy.isclose(result["Fill"], 125) and numpy.isclose(result["Cut"], 125)
+    assert numpy.isclose(result["Net"], 0)
+
+def test_crossing_inside_grid_cells_is_exact(terrain):
+    result = tin_volume(terrain(lambda x, y: 0 * x), terrain(lambda x, y: x - 5.5), 2.0)
+    assert numpy.isclose(result["Fill"], 4.5 ** 2 / 2 * 10)
+    assert numpy.isclose(result["Cut"], 5.5 ** 2 / 2 * 10)
+
+@pytest.mark.parametrize("spacing", [3.0, 4.0, 6.0, 7.5])
+def test_partial_cells_along_the_edges_count(terrain, spacing):
+    result = tin_volume(terrain(lambda x, y: 0 * x), terrain(lambda x, y: 0 * x + 1), spacing)
+    assert numpy.isclose(result["Fill"], 100)
+    assert numpy.allclose(result["Points"][:, :2].max(axis=0), [500010, 4000010])
+
+def test_tilted_plane_over_partial_cells(terrain):
+    result = tin_volume(terrain(lambda x, y: 0 * x), terrain(lambda x, y: x - 5.5), 3.0)
+    assert numpy.isclose(result["Fill"], 4.5 ** 2 / 2 * 10)
+    assert numpy.isclose(result["Cut"], 5.5 ** 2 / 2 * 10)
+
+def test_boundary_limits_the_area(terrain):
+    boundary = numpy.array([[0, 0], [4, 0], [4, 4], [0, 4]], dtype=float) + [500002, 4000002]
+    result = tin_volume(terrain(lambda x, y: 0 * x), terrain(lambda x, y: x * 0 + 1), 1.0, boundary)
+    assert numpy.isclose(result["Fill"], 16)
+
+def test_parallel_tiles_equal_one_tile(monkeypatch, terrain):
+    existing = terrain(lambda x, y: numpy.sin(x) + y / 4)
+    design = terrain(lambda x, y: numpy.cos(y) + 0.5)
+    serial = tin_volume(existing, design, 0.25, workers=1)
+    monkeypatch.setattr(surface_volume, "PARALLEL_CELLS", 0)
+    parallel = tin_volume(existing, design, 0.25, workers=3)
+
+    for key in ["Cut", "Fill", "Net"]:
+        assert numpy.isclose(serial[key], parallel[key])
+    assert numpy.array_equal(serial["Faces"], parallel["Faces"])
+    assert numpy.allclose(serial["Points"], parallel["Points"])
+
+def test_surfaces_without_overlap_or_triangles(terrain):
+    flat = terrain(lambda x, y: 0 * x)
+    assert tin_volume(flat, terrain(lambda x, y: x * 0, origin=(600000, 4000000))) is None
+    empty = types.SimpleNamespace(Proxy=types.SimpleNamespace(triangles=[]))
+    assert tin_volume(flat, empty) is None
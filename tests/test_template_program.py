@@ -0,0 +1,143 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+from types import SimpleNamespace
+
+import numpy
+import pytest
+
+from freecad.road.functions.template_program import (
+    displacement, compile_template, evaluate_template, station_variables, terrain_ground)
+from freecad.road.functions.triangle_index import TriangleIndex
+
+
+def point(name, kind="Delta X and Slope", start=None, terrain=None, reverse=False, **parameters):
+    """Component point stand-in with the properties the compiler reads."""
+    values = dict(DeltaX=0.0, DeltaY=0.0, Angle=0.0, Slope=0.0, Distance=0.0)
+    values.update(parameters)
+    return SimpleNamespace(Proxy=SimpleNamespace(Type="Road::ComponentPoint"),
+        Name=name, Label=name, Type=kind, Start=start, Reverse=reverse,
+        Terrain=terrain, **values)
+
+
+def line(start, end):
+    return SimpleNamespace(Proxy=SimpleNamespace(Type="Road::ComponentLine"),
+        Start=start, End=end)
+
+
+def component(side, *parts):
+    return SimpleNamespace(Side=side, Group=list(parts))
+
+
+def lane(side, width, slope):
+    """Component of a lane edge point starting at the centre line."""
+    edge = point(side + "Edge", DeltaX=width, Slope=slope)
+    centre = point(side + "Centre", kind="Delta X and Delta Y")
+    edge.Start = centre
+    return component(side, edge, centre, line(centre, edge))
+
+
+def test_displacement_kinds():
+    assert numpy.allclose(displacement("Delta X and Delta Y", 2, 3), [2, 3])
+    assert numpy.allclose(displacement("Delta X and Slope", 4, slope=-2), [4, -0.08])
+    assert numpy.allclose(displacement("Delta Y and Slope", delta_y=-1, slope=-50), [2, -1])
+    assert numpy.allclose(displacement("Delta X and Angle", 2, angle=45), [2, 2])
+    assert numpy.allclose(displacement("Delta X and Angle", 2, angle=135), [-2, 2])
+    assert numpy.allclose(displacement("Delta Y and Angle", delta_y=1, angle=45), [1, 1])
+    assert numpy.allclose(displacement("Distance and Angle", distance=2, angle=90), [0, 2])
+    assert numpy.isnan(displacement("Unknown", 1)).all()
+
+
+def test_displacement_broadcasts_station_values():
+    dx, dy = displacement("Delta X and Slope", [1, 2, 3], slope=10)
+
+    assert numpy.allclose(dx, [1, 2, 3])
+    assert numpy.allclose(dy, [0.1, 0.2, 0.3])
+
+
+def test_compile_orders_points_after_their_start():
+    structure = SimpleNamespace(Group=[lane("Left", 3.5, -2), lane("Right", 3.0, -2)])
+
+    program = compile_template(structure)
+
+    names = [step["name"] for step in program["steps"]]
+    assert names == ["LeftCentre", "LeftEdge", "RightCentre", "RightEdge"]
+    assert [step["start"] for step in program["steps"]] == [-1, 0, -1, 2]
+    assert [step["side"] for step in program["steps"]] == [-1, -1, 1, 1]
+    assert program["edges"].tolist() == [[0, 1], [2, 3]]
+
+
+def test_compile_rejects_cycles():
+    first, second = point("First"), point("Second")
+    first.Start, second.Start = second, first
+
+    with pytest.raises(ValueError):
+        compile_template(SimpleNamespace(Group=[component("Right", first, second)]))
+
+
+def test_evaluate_places_sides_and_variables():
+    structure = SimpleNamespace(Group=[lane("Left", 3.5, -2), lane("Right", 3.0, -2)])
+    program = compile_template(structure)
+
+    variables = {("RightEdge", "Slope"): numpy.array([-2.0, 4.0])}
+    template = evaluate_template(program, 2, variables)
+
+    assert template.shape == (2, 4, 2)
+    assert numpy.allclose(template[:, 1], [[-3.5, -0.07], [-3.5, -0.07]])
+    assert numpy.allclose(template[:, 3], [[3.0, -0.06], [3.0, 0.12]])
+
+
+def test_evaluate_leaves_terrain_points_without_ground_nan():
+    edge = point("Edge", DeltaX=2)
+    daylight = point("Daylight", kind="Slope to Terrain", start=edge, Slope=50)
+
+    template = evaluate_template(compile_template(
+        SimpleNamespace(Group=[component("Right", edge, daylight)])), 3)
+
+    assert numpy.isfinite(template[:, 0]).all()
+    assert numpy.isnan(template[:, 1]).all()
+
+
+@pytest.fixture
+def plane_terrain(grid_mesh):
+    """Return Terrain stand-ins over a 40 m square grid with the Terrain query API."""
+    def build(height):
+        index = TriangleIndex(*grid_mesh(41, height))
+        return SimpleNamespace(Proxy=SimpleNamespace(
+            elevations_at=lambda terrain, xy: index.elevations_at(xy),
+            line_crossings_at=lambda terrain, *args: index.line_crossings(*args)))
+    return build
+
+
+def test_terrain_points_use_the_ground_on_their_side(plane_terrain):
+    # Ground rises to the left of a road heading east along y = 20.
+    terrain = plane_terrain(lambda x, y: 10 + 0.2 * (y - 20))
+    left_edge, right_edge = point("LeftEdge", DeltaX=3, Slope=-2), point("RightEdge", DeltaX=5, Slope=-2)
+    structure = SimpleNamespace(Group=[
+        component("Left", left_edge, point("LeftDaylight", kind="Slope to Terrain",
+            start=left_edge, terrain=terrain, Slope=50)),
+        component("Right", right_edge, point("RightDaylight", kind="Slope to Terrain",
+            start=right_edge, terrain=terrain, Slope=50)),
+        component("Right", point("Marker", kind="Delta X on Terrain",
+            terrain=terrain, DeltaX=-4))])
+    program = compile_template(structure)
+    origins = numpy.array([[10.0, 20.0, 10.0], [30.0, 20.0, 10.0]])
+    normals = numpy.array([[0.0, -1.0], [0.0, -1.0]])
+
+    template = evaluate_template(program, 2, ground=terrain_ground(origins, normals))
+    points = dict(zip([step["label"] for step in program["steps"]], template[0]))
+
+    # Cut on the left meets the ground 2.2 m out, fill on the right 3 m out.
+    assert numpy.allclose(points["LeftDaylight"], [-5.2, 1.04])
+    assert numpy.allclose(points["RightDaylight"], [8.0, -1.6])
+    assert numpy.allclose(points["Marker"], [-4.0, 0.8])
+    assert numpy.allclose(template[1], template[0])
+
+
+def test_station_variables_interpolate_sorted_tables():
+    variables = station_variables({
+        "RightEdge.Slope": [(100, 4), (0, -2)],
+        "RightEdge.Unknown": [(0, 1)],
+        "NoLabel": [(0, 1)]}, numpy.array([0.0, 50.0, 200.0]))
+
+    assert list(variables) == [("RightEdge", "Slope")]
+    assert numpy.allclose(variables[("RightEdge", "Slope")], [-2, 1, 4])
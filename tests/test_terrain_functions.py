@@ -0,0 +1,308 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Tests of terrain array functions."""
+
+import numpy
+from scipy.spatial import Delaunay, cKDTree
+
+import pytest
+
+from freecad.road.functions.terrain_functions import (
+    test_triangulation as triangle_mask,
+    added_points,
+    grid_thinning,
+    merge_duplicates,
+    vertical_decimation,
+    thin_points,
+    apply_operation,
+    signed_area,
+    contour_levels,
+    contour_lines,
+    chain_segments,
+    split_contours,
+    get_contours,
+    parallel_contour_lines,
+    get_boundary,
+    color_table,
+    face_normals,
+    elevation_analysis,
+    slope_analysis,
+    direction_analysis,
+    decimate)
+from freecad.road.functions import terrain_functions
+
+
+class Tri:
+    """Triangulation stand-in with given points and simplices."""
+
+    def __init__(self, points, simplices):
+        self.points = numpy.asarray(points, dtype=float)
+        self.simplices = numpy.asarray(simplices)
+
+
+def test_mask_keeps_all_triangles_within_limits(grid_mesh):
+    tri = Delaunay(grid_mesh(3)[0][:, :2])
+    assert triangle_mask(tri, 2.0, 180).all()
+
+def test_mask_removes_long_edges():
+    tri = Tri([[0, 0, 0], [1, 0, 0], [0, 1, 0], [10, 0, 0], [10, 1, 0]],
+        [[0, 1, 2], [1, 3, 4]])
+    assert triangle_mask(tri, 2.0, 180).tolist() == [True, False]
+
+def test_mask_removes_wide_angles():
+    # The second triangle has a 150 degree angle at its apex.
+    apex = [1, numpy.tan(numpy.radians(15)), 0]
+    tri = Tri([[0, 0, 0], [2, 0, 0], apex, [0, 2, 0]], [[0, 1, 3], [0, 1, 2]])
+    assert triangle_mask(tri, 10.0, 140).tolist() == [True, False]
+    assert triangle_mask(tri, 10.0, 160).tolist() == [True, True]
+
+def test_mask_removes_degenerate_triangles():
+    tri = Tri([[0, 0, 0], [1, 0, 0], [0, 1, 0]], [[0, 1, 2], [0, 0, 1]])
+    assert triangle_mask(tri, 10.0, 180).tolist() == [True, False]
+
+def test_mask_ignores_elevations():
+    tri = Tri([[0, 0, 0], [1, 0, 100], [0, 1, -100]], [[0, 1, 2]])
+    assert triangle_mask(tri, 1.5, 180).all()
+
+def square():
+    """Return a unit square split into two counterclockwise triangles."""
+    points = numpy.array([[0, 0, 0], [1, 0, 1], [1, 1, 2], [0, 1, 1]], dtype=float)
+    faces = numpy.array([[0, 1, 2], [0, 2, 3]], dtype=numpy.int32)
+    return points, faces
+
+def test_add_point_splits_triangle():
+    points, faces = square()
+    new_points, new_faces = apply_operation(points, faces,
+        {"type": "Add Point", "index": 0, "vector": [0.7, 0.3, 5]})
+    assert new_points[-1].tolist() == [0.7, 0.3, 5]
+    assert new_faces.tolist() == [[0, 1, 4], [0, 2, 3], [1, 2, 4], [2, 0, 4]]
+    assert faces.tolist() == [[0, 1, 2], [0, 2, 3]]
+
+def test_delete_triangle():
+    points, faces = square()
+    _, new_faces = apply_operation(points, faces, {"type": "Delete Triangle", "index": 0})
+    assert new_faces.tolist() == [[0, 2, 3]]
+
+def test_swap_edge_keeps_orientation():
+    points, faces = square()
+    _, new_faces = apply_operation(points, faces, {"type": "Swap Edge", "index": 0, "other": 1})
+    assert sorted(map(sorted, new_faces.tolist())) == [[0, 1, 3], [1, 2, 3]]
+    assert (signed_area(points[new_faces][:, :, :2]) > 0).all()
+    assert faces.tolist() == [[0, 1, 2], [0, 2, 3]]
+
+def test_swap_edge_rejects_invalid_pairs():
+    points, faces = square()
+    with pytest.raises(ValueError):
+        apply_operation(points, faces, {"type": "Swap Edge", "index": 0, "other": -1})
+
+    # A concave quadrilateral can not be swapped.
+    points[2] = [0.3, 0.3, 0]
+    with pytest.raises(ValueError):
+        apply_operation(points, faces, {"type": "Swap Edge", "index": 0, "other": 1})
+
+def test_added_points_finds_new_rows():
+    old = numpy.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=float)
+    new = numpy.array([[1, 0, 0], [5, 5, 5], [0, 0, 0], [0, 1, 0]], dtype=float)
+    assert added_points(old, new).tolist() == [[5, 5, 5]]
+    assert len(added_points(old, old[::-1])) == 0
+
+def test_added_points_detects_removed_or_moved_rows():
+    old = numpy.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=float)
+    assert added_points(old, old[:2]) is None
+    assert added_points(old, old + [0, 0, 1]) is None
+
+def polygon_area(loop):
+    """Return the signed area of a closed loop, positive if counterclockwise."""
+    x, y = loop[:, 0], loop[:, 1]
+    return (x[:-1] * y[1:] - x[1:] * y[:-1]).sum() / 2
+
+def test_contour_levels():
+    assert contour_levels(0.2, 3.0, 1.0).tolist() == [1.0, 2.0, 3.0]
+    assert contour_levels(-1.5, 1.5, 1.0).tolist() == [-1.0, 0.0, 1.0]
+    assert len(contour_levels(0.0, 1.0, 0.0)) == 0
+    assert len(contour_levels(2.0, 1.0, 1.0)) == 0
+
+def test_contours_of_a_plane_are_straight_lines(grid_mesh):
+    vertices, faces = grid_mesh(6, lambda x, y: x)
+    points, counts, levels = contour_lines(vertices, faces, [1.5, 2.5, 3.5])
+
+    assert levels.tolist() == [1.5, 2.5, 3.5]
+    assert counts.sum() == len(points)
+    for line, level in zip(numpy.split(points, numpy.cumsum(counts)[:-1]), levels):
+        assert numpy.allclose(line[:, 0], level)
+        assert numpy.allclose(line[:, 2], level)
+        assert numpy.isclose(numpy.ptp(line[:, 1]), 5)
+        assert (numpy.abs(numpy.diff(line[:, 1])) > 0).all()
+
+def test_contours_follow_clockwise_faces_too(grid_mesh):
+    vertices, faces = grid_mesh(6, lambda x, y: x)
+    faces[::2] = faces[::2, ::-1]
+    _, counts, _ = contour_lines(vertices, faces, [2.5])
+    assert counts.tolist() == [11]
+
+def test_contours_around_a_peak_are_closed(grid_mesh):
+    vertices, faces = grid_mesh(7, lambda x, y: 10 - numpy.abs(x - 3) - numpy.abs(y - 3))
+    points, counts, levels = contour_lines(vertices, faces, [8.5])
+    assert len(counts) == 1 and levels.tolist() == [8.5]
+    assert numpy.array_equal(points[0], points[-1])
+    assert numpy.allclose(points[:, 2], 8.5)
+    assert numpy.allclose(numpy.abs(points[:, :2] - 3).sum(axis=1), 1.5)
+
+def test_contours_without_crossings_are_empty(grid_mesh):
+    vertices, faces = grid_mesh(3, lambda x, y: x)
+    points, counts, levels = contour_lines(vertices, faces, [10.0])
+    assert points.shape == (0, 3) and len(counts) == 0 and len(levels) == 0
+
+def test_chain_segments_orders_open_and_closed_chains():
+    # An open chain 3-1-0 given out of order and a closed triangle 4-5-6.
+    starts = numpy.array([1, 4, 3, 5, 6])
+    ends = numpy.array([0, 5, 1, 6, 4])
+    nodes, counts = chain_segments(starts, ends, 7)
+    lines = [line.tolist() for line in numpy.split(nodes, numpy.cumsum(counts)[:-1])]
+    assert sorted(lines) == [[3, 1, 0], [4, 5, 6, 4]]
+
+def test_split_contours_by_major_interval():
+    points = numpy.arange(15, dtype=float).reshape(-1, 3)
+    contours = split_contours(points, numpy.array([2, 2, 1]), numpy.array([5.0, 6.0, 10.0]), 5.0)
+    assert contours["Major"][1].tolist() == [2]
+    assert contours["Major"][0].tolist() == points[:2].tolist()
+    assert contours["Minor"][1].tolist() == [2]
+
+def test_get_contours_splits_major_and_minor_lines(grid_mesh):
+    vertices, faces = grid_mesh(6, lambda x, y: x)
+    contours = get_contours(vertices, faces, 2.0, 1.0)
+    assert contours["Major"][1].tolist() == [11, 11]
+    assert contours["Minor"][1].tolist() == [11, 11, 11]
+    assert get_contours(vertices, faces, 2.0, 0.0) == {}
+
+def test_get_contours_skips_short_lines():
+    vertices = numpy.array([[0, 0, 0], [1, 0, 1], [0, 1, 1]], dtype=float)
+    contours = get_contours(vertices, numpy.array([[0, 1, 2]]), 1.0, 0.5)
+    assert len(contours["Minor"][1]) == 0 and len(contours["Major"][1]) == 0
+
+def test_parallel_contours_equal_serial_contours(monkeypatch, grid_mesh):
+    monkeypatch.setattr(terrain_functions, "PARALLEL_CROSSINGS", 0)
+    vertices, faces = grid_mesh(12, lambda x, y: numpy.sin(x / 3) * 4 + numpy.cos(y / 2) * 3)
+    levels = contour_levels(vertices[:, 2].min(), vertices[:, 2].max(), 0.5)
+
+    serial = contour_lines(vertices, faces, levels)
+    for result in [parallel_contour_lines(vertices, faces, levels, 3),
+            parallel_contour_lines(vertices, faces, levels, 1)]:
+        for expected, actual in zip(serial, result):
+            assert numpy.array_equal(expected, actual)
+
+def test_boundary_of_a_grid_is_one_counterclockwise_loop(grid_mesh):
+    vertices, faces = grid_mesh(4, lambda x, y: x + y)
+    points, counts = get_boundary(vertices, faces)
+
+    assert counts.tolist() == [13]
+    assert numpy.array_equal(points[0], points[-1])
+    assert numpy.isclose(polygon_area(points), 9)
+    assert sorted(map(tuple, points[:-1, :2].tolist())) == sorted(
+        (x, y) for x in range(4) for y in range(4) if x in (0, 3) or y in (0, 3))
+
+def test_boundary_includes_holes(grid_mesh):
+    vertices, faces = grid_mesh(4)
+    hole = faces[:, 0] == 5
+    points, counts = get_boundary(vertices, faces[~hole])
+
+    assert sorted(counts.tolist()) == [5, 13]
+    loops = numpy.split(points, numpy.cumsum(counts)[:-1])
+    areas = sorted(polygon_area(loop) for loop in loops)
+    assert numpy.allclose(areas, [-1, 9])
+
+def test_boundary_orients_clockwise_faces(grid_mesh):
+    vertices, faces = grid_mesh(3)
+    points, counts = get_boundary(vertices, faces[:, ::-1])
+    assert counts.tolist() == [9]
+    assert numpy.isclose(polygon_area(points), 4)
+
+def test_boundary_of_no_faces_is_empty():
+    points, counts = get_boundary(numpy.zeros((3, 3)), numpy.empty((0, 3), dtype=int))
+    assert points.shape == (0, 3) and len(counts) == 0
+
+def test_color_table():
+    table = color_table(4)
+    assert table.shape == (4, 3) and table.dtype == numpy.float32
+    assert len(numpy.unique(table, axis=0)) == 4
+    assert numpy.array_equal(color_table(4, 1)[0], table[1])
+
+def test_face_normals_point_up():
+    vertices = numpy.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=float)
+    normals = face_normals(vertices, numpy.array([[0, 1, 2], [0, 2, 1]]))
+    assert normals.tolist() == [[0, 0, 1], [0, 0, 1]]
+
+def test_elevation_analysis_uses_equal_ranges(grid_mesh):
+    vertices, faces = grid_mesh(5, lambda x, y: x)
+    colors = elevation_analysis(vertices, faces, 4)
+    table = color_table(4, 1)
+    column = vertices[faces, 0].min(axis=1).astype(int)
+    for i in range(4):
+        assert (colors[column == i] == table[i]).all()
+
+def test_slope_analysis_uses_slope_angle(grid_mesh):
+    # Planes of 10, 40 and 70 degrees fall in three ranges of 30 degrees.
+    table = color_table(3, 1)
+    for angle, expected in [(10, 0), (40, 1), (70, 2)]:
+        vertices, faces = grid_mesh(3, lambda x, y: x * numpy.tan(numpy.radians(angle)))
+        assert (slope_analysis(vertices, faces, 3) == table[expected]).all()
+
+def test_direction_analysis_sectors_centred_on_x_axis(grid_mesh):
+    table = color_table(4)
+    for height, expected in [
+            (lambda x, y: -x, 0), (lambda x, y: -y, 1),
+            (lambda x, y: x, 2), (lambda x, y: y, 3), (lambda x, y: -x + 0.9 * y, 0)]:
+        vertices, faces = grid_mesh(3, height)
+        assert (direction_analysis(vertices, faces, 4) == table[expected]).all()
+
+def test_decimate_reduces_faces_and_keeps_orientation(grid_mesh):
+    vertices, faces = grid_mesh(41, lambda x, y: numpy.sin(x / 5) + y / 10)
+    points, kept, source = decimate(vertices, faces, 4)
+
+    assert len(points) < len(vertices) / 2 and 0 < len(kept) < len(faces) / 2
+    assert len(kept) == len(source)
+    assert (numpy.sign(signed_area(points[kept][:, :, :2]))
+        == numpy.sign(signed_area(vertices[faces[source]][:, :, :2]))).all()
+    assert len(numpy.unique(numpy.sort(kept, axis=1), axis=0)) == len(kept)
+
+    # Clustered points stay within the surface extent.
+    assert (points.min(axis=0) >= vertices.min(axis=0) - 1e-9).all()
+    assert (points.max(axis=0) <= vertices.max(axis=0) + 1e-9).all()
+
+def test_merge_duplicates_averages_close_points():
+    points = numpy.array([[0, 0, 1], [0.01, 0, 3], [5, 5, 0], [5, 5.02, 2], [9, 0, 7]], dtype=float)
+    merged = merge_duplicates(points, 0.05)
+    assert merged.tolist() == [[0.005, 0, 2], [5, 5.01, 1], [9, 0, 7]]
+
+def test_merge_duplicates_does_not_chain_dense_points():
+    # Points 0.4 apart would chain into one cluster with single linkage.
+    points = numpy.c_[numpy.arange(100) * 0.4, numpy.zeros(100), numpy.arange(100)]
+    merged = merge_duplicates(points, 1.0)
+    assert 25 <= len(merged) <= 40
+
+    # Every point stays within the tolerance of a merged point.
+    distance, _ = cKDTree(merged[:, :2]).query(points[:, :2])
+    assert distance.max() <= 1.0
+
+def test_grid_thinning_keeps_the_point_nearest_the_cell_centre():
+    points = numpy.array([[0.1, 0.1, 0], [0.45, 0.55, 1], [0.9, 0.9, 2], [1.5, 0.5, 3]], dtype=float)
+    assert grid_thinning(points, 1.0).tolist() == [[0.45, 0.55, 1], [1.5, 0.5, 3]]
+
+def test_vertical_decimation_removes_planar_points():
+    rng = numpy.random.default_rng(6)
+    xy = rng.random((400, 2)) * 100
+    points = numpy.c_[xy, xy[:, 0] * 0.2 + xy[:, 1] * 0.1]
+    points[0, 2] += 10
+    thinned = vertical_decimation(points, 0.01)
+
+    assert len(thinned) < len(points) / 2
+    assert any((row == points[0]).all() for row in thinned)
+    hull = Delaunay(points[:, :2]).convex_hull
+    assert len(numpy.unique(hull)) <= len(thinned)
+
+def test_thin_points_modes():
+    points = numpy.array([[0, 0, 0], [0.01, 0, 0], [5, 5, 0], [9, 0, 0], [0, 9, 0]], dtype=float)
+    assert len(thin_points(points, "None", 0.1)) == 5
+    assert len(thin_points(points, "Duplicates", 0)) == 5
+    assert len(thin_points(points, "Duplicates", 0.1)) == 4
+    assert len(thin_points(points, "Grid", 1.0)) == 4
@@ -0,0 +1,72 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Tests of binary terrain storage."""
+
+import os, types
+import numpy
+
+from freecad.road.functions.terrain_storage import (
+    content_hash, write_arrays, read_arrays, save_arrays,
+    cache_path, read_cached, save_cached, prune_cache)
+
+
+def test_content_hash_depends_on_values_dtype_and_shape():
+    points = numpy.arange(6, dtype=numpy.float64)
+    assert content_hash(points) == content_hash(points.copy())
+    assert content_hash(points) != content_hash(points + 1)
+    assert content_hash(points) != content_hash(points.astype(numpy.float32))
+    assert content_hash(points) != content_hash(points.reshape(2, 3))
+
+def test_content_hash_depends_on_array_order():
+    a, b = numpy.zeros(3), numpy.ones(3)
+    assert content_hash(a, b) != content_hash(b, a)
+
+def test_written_arrays_read_back():
+    points = numpy.random.default_rng(0).random((10, 3))
+    faces = numpy.array([[0, 1, 2], [2, 3, 4]], dtype=numpy.int32)
+    path = write_arrays("Terrain", points=points, faces=faces, source=numpy.array("key"))
+
+    data = read_arrays(path)
+    assert numpy.array_equal(data["points"], points)
+    assert data["faces"].dtype == numpy.int32
+    assert numpy.array_equal(data["faces"], faces)
+    assert str(data["source"]) == "key"
+
+def test_missing_files_read_empty(tmp_path):
+    assert read_arrays("") == {}
+    assert read_arrays(str(tmp_path / "missing.npz")) == {}
+
+def test_saved_arrays_create_folders(tmp_path):
+    path = str(tmp_path / "cache" / "result.npz")
+    save_arrays(path, values=numpy.arange(3))
+    assert os.path.isfile(path)
+    assert read_arrays(path)["values"].tolist() == [0, 1, 2]
+
+def test_cache_path_next_to_saved_documents(tmp_path):
+    document = types.SimpleNamespace(FileName=str(tmp_path / "project.FCStd"))
+    path = cache_path(document, "Terrain_Contour", "key")
+    assert os.path.dirname(path) == str(tmp_path / "project_cache")
+    assert path != cache_path(document, "Terrain_Contour", "other")
+    assert cache_path(types.SimpleNamespace(FileName=""), "Terrain_Contour", "key") == ""
+
+def test_prune_cache_removes_least_recently_used(tmp_path):
+    values = numpy.zeros(1000)
+    paths = [str(tmp_path / f"result_{i}.npz") for i in range(4)]
+    for i, path in enumerate(paths):
+        save_arrays(path, values=values)
+        os.utime(path, (i, i))
+
+    # Reading the oldest result marks it as recently used.
+    assert len(read_cached(paths[0])["values"]) == 1000
+    size = os.path.getsize(paths[0])
+    prune_cache(str(tmp_path), 2 * size)
+    assert [os.path.isfile(path) for path in paths] == [True, False, False, True]
+
+def test_saving_cached_results_keeps_the_limit(tmp_path):
+    values = numpy.zeros(1000)
+    for i in range(5):
+        save_cached(str(tmp_path / f"result_{i}.npz"), limit=3 * values.nbytes, values=values)
+    assert sorted(os.listdir(tmp_path)) == ["result_3.npz", "result_4.npz"]
+
+def test_prune_missing_cache(tmp_path):
+    prune_cache(str(tmp_path / "missing"))
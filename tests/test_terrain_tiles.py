@@ -0,0 +1,83 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Tests of the terrain tile cache."""
+
+import os
+import numpy
+import pytest
+
+from freecad.road.functions.terrain_tiles import TerrainTiles
+from freecad.road.functions.triangle_index import TriangleIndex
+from freecad.road.functions.terrain_functions import get_contours
+
+
+@pytest.fixture
+def surface(grid_mesh):
+    """Return a wavy triangulated grid with shuffled faces."""
+    vertices, faces = grid_mesh(21, lambda x, y: numpy.sin(x / 3) * 5 + y / 2)
+    return vertices, faces[numpy.random.default_rng(4).permutation(len(faces))]
+
+
+def test_tiles_answer_like_the_live_triangulation(tmp_path, surface):
+    vertices, faces = surface
+    tiles = TerrainTiles.write(str(tmp_path), vertices, faces, 5.0, "key")
+    assert tiles.key == "key" and len(tiles.table) == 16
+
+    xy = numpy.random.default_rng(5).random((300, 2)) * 22 - 1
+    z, ids = tiles.elevations_at(xy)
+    expected_z, expected_ids = TriangleIndex(vertices, faces).elevations_at(xy)
+    assert numpy.allclose(z, expected_z, equal_nan=True)
+    assert numpy.array_equal(ids, expected_ids)
+
+def test_tiled_sections_match_live_sections(tmp_path, surface):
+    vertices, faces = surface
+    tiles = TerrainTiles.write(str(tmp_path), vertices, faces, 3.0)
+    index = TriangleIndex(vertices, faces)
+    points = numpy.random.default_rng(6).random((40, 2)) * 24 - 2
+    starts, ends = points[:20], points[20:]
+
+    for result, expected in zip(tiles.sections(starts, ends), index.sections(starts, ends)):
+        assert numpy.allclose(result, expected)
+
+    heights = vertices[:, 2].mean() + numpy.linspace(-3, 3, 20)
+    for result, expected in zip(
+            tiles.line_crossings(starts, ends, heights, 1.0),
+            index.line_crossings(starts, ends, heights, 1.0)):
+        assert numpy.allclose(result, expected, equal_nan=True)
+
+def test_tiles_load_only_touched_tiles(tmp_path, surface):
+    vertices, faces = surface
+    tiles = TerrainTiles.write(str(tmp_path), vertices, faces, 5.0)
+    tiles.elevations_at([[1, 1], [2, 3]])
+    assert list(tiles.cache) == [0]
+
+def contour_length(points, counts):
+    """Return the total length of flat polylines."""
+    lengths = numpy.linalg.norm(numpy.diff(points, axis=0), axis=1)
+    return lengths[numpy.isin(numpy.arange(len(lengths)), numpy.cumsum(counts)[:-1] - 1, invert=True)].sum()
+
+@pytest.mark.parametrize("size", [2.0, 5.0, 100.0])
+def test_tiled_contours_match_live_contours(tmp_path, surface, size):
+    vertices, faces = surface
+    tiles = TerrainTiles.write(str(tmp_path), vertices, faces, size)
+    tiled = tiles.contours(5.0, 1.0)
+    live = get_contours(vertices, faces, 5.0, 1.0)
+
+    for name in ["Major", "Minor"]:
+        points, counts = tiled[name]
+        assert (counts >= 4).all()
+        assert sorted(counts.tolist()) == sorted(live[name][1].tolist())
+        assert numpy.isclose(contour_length(points, counts), contour_length(*live[name]))
+        assert numpy.array_equal(numpy.unique(points, axis=0), numpy.unique(live[name][0], axis=0))
+
+def test_tiles_reopen_from_folder(tmp_path, surface):
+    vertices, faces = surface
+    TerrainTiles.write(str(tmp_path), vertices, faces, 5.0, "key")
+    tiles = TerrainTiles(str(tmp_path))
+    assert tiles.key == "key"
+    expected, _ = TriangleIndex(vertices, faces).elevations_at([[4.5, 4.2]])
+    assert numpy.allclose(tiles.elevations_at([[4.5, 4.2]])[0], expected)
+
+    # Folders written without the face order are not reused.
+    os.remove(os.path.join(str(tmp_path), "order.npy"))
+    assert TerrainTiles(str(tmp_path)).key == ""
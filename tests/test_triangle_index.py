@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Tests of the triangle spatial index."""
+
+import numpy
+import pytest
+
+from freecad.road.functions import triangle_index
+from freecad.road.functions.triangle_index import TriangleIndex, CELLS_PER_TRIANGLE
+
+
+@pytest.fixture
+def plane(grid_mesh):
+    """Return a builder of triangulated grids on the plane z = x + 2y."""
+    return lambda size=10, spacing=1.0: grid_mesh(size, lambda x, y: x + 2 * y, spacing)
+
+
+def test_elevations_interpolate_the_triangles(plane):
+    index = TriangleIndex(*plane())
+    xy = numpy.random.default_rng(1).random((200, 2)) * 9
+    z, ids = index.elevations_at(xy)
+    assert numpy.allclose(z, xy[:, 0] + 2 * xy[:, 1])
+    assert (ids >= 0).all()
+
+    # Each point lies inside the triangle it was found in.
+    corners = index.vertices[index.faces[ids], :2]
+    low, high = corners.min(axis=1), corners.max(axis=1)
+    assert ((xy >= low - 1e-9) & (xy <= high + 1e-9)).all()
+
+def test_points_outside_are_nan(plane):
+    index = TriangleIndex(*plane())
+    z, ids = index.elevations_at([[-1, 5], [5, 9.5], [20, 20]])
+    assert numpy.isnan(z).all() and (ids == -1).all()
+
+def test_empty_index():
+    index = TriangleIndex(numpy.empty((0, 3)), numpy.empty((0, 3), dtype=int))
+    z, ids = index.elevations_at([[0, 0]])
+    assert numpy.isnan(z).all() and ids.tolist() == [-1]
+    segment, t, z = index.sections([[0, 0]], [[1, 1]])
+    assert len(segment) == len(t) == len(z) == 0
+
+def test_sections_cross_every_edge(plane):
+    index = TriangleIndex(*plane())
+    segment, t, z = index.sections([[0.5, 0.25], [-2, 4.5]], [[8.5, 0.25], [11, 4.5]])
+
+    assert numpy.all(numpy.diff(segment) >= 0)
+    first = segment == 0
+    x = 0.5 + 8 * t[first]
+    assert numpy.allclose(z[first], x + 0.5)
+    assert numpy.isclose(t[first][0], 0) and numpy.isclose(t[first][-1], 1)
+
+    # The second segment starts and ends outside the grid.
+    second = segment == 1
+    x = -2 + 13 * t[second]
+    assert numpy.allclose(x[[0, -1]], [0, 9])
+    assert numpy.allclose(z[second], x + 9)
+
+def test_sections_missing_the_triangulation_are_empty(plane):
+    index = TriangleIndex(*plane())
+    segment, t, z = index.sections([[20, 20]], [[30, 20]])
+    assert len(segment) == len(t) == len(z) == 0
+
+def test_line_crossings_find_the_first_crossing(plane):
+    index = TriangleIndex(*plane())
+
+    # A level line at height 6 over y = 1 meets z = x + 2 at x = 4.
+    t, z = index.line_crossings([[0, 1]], [[8, 1]], [6.0], [0.0])
+    assert numpy.allclose(t, 0.5) and numpy.allclose(z, 6)
+
+    # Rising lines parallel to the surface never meet it.
+    t, z = index.line_crossings([[0, 1]], [[8, 1]], [6.0], [8.0])
+    assert numpy.isnan(t).all() and numpy.isnan(z).all()
+
+def test_slivers_do_not_fill_the_grid(plane):
+    # A fine grid and one long sliver along the diagonal of a large box.
+    vertices, faces = plane(20, 0.1)
+    far = len(vertices)
+    vertices = numpy.r_[vertices, [[0, 0, 0], [10000, 10000, 0], [10000, 10001, 0]]]
+    faces = numpy.r_[faces, [[far, far + 1, far + 2]]]
+    index = TriangleIndex(vertices, faces)
+
+    assert len(index.items) <= CELLS_PER_TRIANGLE * len(faces)
+    assert len(index.cells) == len(index.starts) - 1
+    z, ids = index.elevations_at([[1.05, 0.55], [5000, 5000.4]])
+    assert numpy.isclose(z[0], 2.15) and ids[1] == len(faces) - 1
+
+def test_index_from_arrays_answers_the_same(plane):
+    index = TriangleIndex(*plane())
+    copy = TriangleIndex.from_arrays(index.arrays())
+    xy = numpy.random.default_rng(2).random((50, 2)) * 9
+    assert numpy.array_equal(index.elevations_at(xy)[0], copy.elevations_at(xy)[0])
+
+def test_parallel_sections_equal_sections(monkeypatch, plane):
+    monkeypatch.setattr(triangle_index, "PARALLEL_SEGMENTS", 1)
+    index = TriangleIndex(*plane())
+    y = numpy.linspace(0.1, 8.9, 40)
+    starts, ends = numpy.c_[numpy.full(40, -1.0), y], numpy.c_[numpy.full(40, 10.0), y[::-1]]
+
+    expected = index.sections(starts, ends)
+    for actual in [index.parallel_sections(starts, ends, 3), index.parallel_sections(starts, ends, 1)]:
+        for a, b in zip(expected, actual):
+            assert numpy.array_equal(a, b)
+
+    # The index is shared with worker processes once.
+    shared = index.shared()
+    index.parallel_sections(starts, ends, 3)
+    assert index.shared() is shared and len(shared.blocks) == len(index.arrays())